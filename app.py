@@ -10,13 +10,6 @@ import streamlit as st
 # Local shared modules (already in your repo)
 from shared import state, history  # type: ignore
 
-# Optional dataset helpers (present as shared/datasets.py in your repo)
-try:
-    from shared.datasets import load_csv, ensure_sample_dataset  # type: ignore
-    HAS_DATASET_HELPERS = True
-except Exception:
-    HAS_DATASET_HELPERS = False
-
 
 # -----------------------------------------------------------------------------
 # Page config
@@ -68,21 +61,27 @@ st.divider()
 # -----------------------------------------------------------------------------
 # Sample Data Preview (optional)
 # -----------------------------------------------------------------------------
+# Off by default: the dataset helpers pull in pandas/pyarrow, which the home
+# page otherwise never needs. They are imported only once the preview is on.
 with st.sidebar:
-    st.markdown("**Sample Data Preview**")
-    if HAS_DATASET_HELPERS:
+    if st.toggle("Sample data preview", value=False):
         try:
-            ensure_sample_dataset()
-            df = load_csv("data/sample_dataset.csv")
-            n = st.number_input("Preview rows", 1, 25, 5, step=1)
-            if df is not None:
-                st.dataframe(df.head(int(n)), use_container_width=True, height=220)
-            else:
-                st.caption("No sample dataset found.")
+            from shared.datasets import load_csv, ensure_sample_dataset  # type: ignore
         except Exception:
-            st.caption("Dataset helpers present but preview failed.")
-    else:
-        st.caption("Dataset helpers not available.")
+            load_csv = None
+        if load_csv is None:
+            st.caption("Dataset helpers not available.")
+        else:
+            try:
+                ensure_sample_dataset()
+                df = load_csv("data/sample_dataset.csv")
+                n = st.number_input("Preview rows", 1, 25, 5, step=1)
+                if df is not None:
+                    st.dataframe(df.head(int(n)), use_container_width=True, height=220)
+                else:
+                    st.caption("No sample dataset found.")
+            except Exception:
+                st.caption("Dataset helpers present but preview failed.")
 
 # -----------------------------------------------------------------------------
 # Main tiles (copy) — simple overview
@@ -120,6 +119,7 @@ st.page_link("pages/07_PR_Intelligence.py",  label="PR Intelligence (v1) →",
 st.page_link("pages/08_Creator_Intelligence.py", label="Creator Intelligence (v1) →", icon="🎬")
 st.page_link("pages/09_Media_Monitor.py", label="Open Media Monitor →", icon="📺")
 st.page_link("pages/10_Campaign_Brief.py",   label="Open Campaign Brief →",     icon="🗂️")
+st.page_link("pages/11_Performance_Analytics.py", label="Performance Analytics →",  icon="📈")
 
 # New Phase-3.4/3.5 pages
 st.page_link("pages/07_PR_Intelligence.py",    label="PR Intelligence (v1) →",      icon="🛰️")
@@ -146,7 +146,7 @@ def _fmt_ts(ts: Any) -> str:
     return "—"
 
 def _print_entry(it: Dict[str, Any]) -> None:
-    etype = it.get("type", "item")
+    etype = it.get("kind") or it.get("type") or "item"
     ts = _fmt_ts(it.get("ts") or it.get("time"))
     tags = it.get("tags") or []
     with st.container():
@@ -165,7 +165,7 @@ def _print_entry(it: Dict[str, Any]) -> None:
             with st.expander("Input", expanded=False):
                 st.code(payload)
         # output
-        out = it.get("output") or it.get("result")
+        out = it.get("content") or it.get("output") or it.get("result")
         if out:
             with st.expander("Output", expanded=True):
                 if isinstance(out, (dict, list)):
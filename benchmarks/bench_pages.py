@@ -0,0 +1,120 @@
+# benchmarks/bench_pages.py
+"""
+Cold-start and rerun wall time for every page, run headless with Streamlit's
+AppTest. Each page runs in a fresh interpreter so the cold number includes
+the page's own imports (Streamlit itself is imported first, as on a server).
+
+    python benchmarks/bench_pages.py                     # table
+    python benchmarks/bench_pages.py --json out.json     # save results
+    python benchmarks/bench_pages.py --baseline out.json # exit 1 on regressions
+
+Pages that call the LLM only do so behind buttons, so no key is needed.
+"""
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+ROOT = Path(__file__).resolve().parent.parent
+HEAVY = ("pandas", "pyarrow", "numpy", "fpdf", "docx", "openai", "feedparser")
+
+# Runs inside the child interpreter; prints one JSON line.
+_CHILD = r"""
+import json, os, statistics, sys, time
+sys.path.insert(0, {root!r})
+os.chdir({root!r})
+from streamlit.testing.v1 import AppTest
+before = set(sys.modules)
+t0 = time.perf_counter()
+at = AppTest.from_file({script!r}, default_timeout=120)
+at.secrets["OPENAI_API_KEY"] = ""
+at.run()
+cold = time.perf_counter() - t0
+reruns = []
+for _ in range({reruns}):
+    t0 = time.perf_counter()
+    at.run()
+    reruns.append(time.perf_counter() - t0)
+loaded = set(sys.modules) - before
+print(json.dumps({{
+    "cold_s": cold,
+    "rerun_s": statistics.median(reruns) if reruns else None,
+    "modules": len(loaded),
+    "heavy": sorted(m for m in {heavy!r} if m in loaded),
+    "error": str(at.exception[0].message) if at.exception else None,
+}}))
+"""
+
+
+def pages() -> List[Path]:
+    return [ROOT / "app.py"] + sorted((ROOT / "pages").glob("[0-9]*.py"))
+
+
+def bench_page(script: Path, reruns: int) -> Dict[str, Any]:
+    code = _CHILD.format(root=str(ROOT), script=str(script), reruns=reruns, heavy=HEAVY)
+    proc = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                          env={**os.environ, "PYTHONWARNINGS": "ignore"})
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    return {"cold_s": None, "rerun_s": None, "modules": 0, "heavy": [],
+            "error": (proc.stderr.strip().splitlines() or ["no output"])[-1]}
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]],
+            tolerance: float, floor_s: float) -> List[str]:
+    """Regressions: slower than baseline by more than `tolerance` and by at least `floor_s`."""
+    out = []
+    for page, r in results.items():
+        b = baseline.get(page)
+        if not b:
+            continue
+        for key in ("cold_s", "rerun_s"):
+            new, old = r.get(key), b.get(key)
+            if new is None or old is None:
+                continue
+            if new > old * (1 + tolerance) and new - old > floor_s:
+                out.append(f"{page}: {key} {old * 1000:.0f} ms -> {new * 1000:.0f} ms")
+    return out
+
+
+def main(argv: List[str] | None = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--reruns", type=int, default=5)
+    ap.add_argument("--only", nargs="*", help="substring filter on page file names")
+    ap.add_argument("--json", help="write results to this file")
+    ap.add_argument("--baseline", help="compare against a previous --json file")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown (default 25%%)")
+    ap.add_argument("--floor-ms", type=float, default=20.0, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    print(f"{'page':34} {'cold ms':>9} {'rerun ms':>9} {'mods':>5}  heavy imports")
+    for script in pages():
+        name = str(script.relative_to(ROOT))
+        if args.only and not any(s in name for s in args.only):
+            continue
+        r = bench_page(script, args.reruns)
+        results[name] = r
+        fmt = lambda v: f"{v * 1000:9.0f}" if v is not None else f"{'—':>9}"
+        line = f"{name:34} {fmt(r['cold_s'])} {fmt(r['rerun_s'])} {r['modules']:5d}  {', '.join(r['heavy']) or '—'}"
+        print(line + (f"  [error: {r['error']}]" if r.get("error") else ""))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2), encoding="utf-8")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding="utf-8"))
+        regressions = compare(results, baseline, args.tolerance, args.floor_ms / 1000)
+        for r in regressions:
+            print("REGRESSION", r)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
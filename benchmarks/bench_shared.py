@@ -0,0 +1,310 @@
+# benchmarks/bench_shared.py
+"""
+Micro-benchmarks for the shared/ hot paths, on fixed synthetic fixtures.
+Runs offline (no API key, no network: llm_copy talks to an in-process stub).
+
+    python benchmarks/bench_shared.py                  # run, compare to baseline.json
+    python benchmarks/bench_shared.py --save           # record a new baseline
+    python benchmarks/bench_shared.py --only pdf csv   # substring filter
+    python benchmarks/bench_shared.py --quick          # skip the 100-page / 100k cases
+
+Exit status is 1 when a case is slower than its baseline by more than
+--tolerance (relative) and --floor-ms (absolute). Baselines are machine
+specific: re-record with --save after hardware or dependency changes.
+"""
+from __future__ import annotations
+import argparse
+import json
+import logging
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+BASELINE = Path(__file__).with_name("baseline.json")
+
+# name -> (setup() -> state, fn(state), heavy)
+CASES: Dict[str, Tuple[Callable[[], Any], Callable[[Any], Any], bool]] = {}
+
+
+def case(name: str, setup: Callable[[], Any] = lambda: None, heavy: bool = False):
+    def deco(fn: Callable[[Any], Any]):
+        CASES[name] = (setup, fn, heavy)
+        return fn
+    return deco
+
+
+# ---------------------------------------------------------------- fixtures --
+
+_WORDS = ("launch", "robotics", "pipeline", "customers", "faster", "secure", "platform", "teams", "results",
+          "partners", "growth", "automation", "insight", "market", "brand", "story", "audience", "value")
+
+
+def lorem(lines: int, seed: int = 7) -> str:
+    """Deterministic copy; ~45 lines of ~80 chars fill one PDF page."""
+    rnd = random.Random(seed)
+    out = []
+    for i in range(lines):
+        out.append("" if i % 9 == 8 else " ".join(rnd.choice(_WORDS) for _ in range(11)).capitalize() + ".")
+    return "\n".join(out)
+
+
+PAGE_LINES = 45
+TMP = Path(tempfile.mkdtemp(prefix="presence-bench-"))
+
+
+def write_csv(rows: int, name: str) -> Path:
+    p = TMP / name
+    if p.exists():
+        return p
+    rnd = random.Random(rows)
+    channels = ("LinkedIn", "Email", "Instagram", "X", "Blog")
+    with open(p, "w", encoding="utf-8") as fh:
+        fh.write("date,channel,post_type,headline,copy,clicks,impressions,engagement_rate\n")
+        for i in range(rows):
+            fh.write(f"2025-{1 + i % 12:02d}-{1 + i % 28:02d},{channels[i % 5]},post,"
+                     f"Headline {i},{rnd.choice(_WORDS)} {rnd.choice(_WORDS)},{rnd.randint(0, 500)},"
+                     f"{rnd.randint(500, 50000)},{rnd.random():.4f}\n")
+    return p
+
+
+PROFILE = {"name": "Acme Robotics", "industry": "Industrial automation", "size": "200-500",
+           "goals": "Grow pipeline 30%; launch RoboHub 2.0", "audience": "Ops leaders at manufacturers",
+           "brand_voice": "Clear, confident", "brand_rules": "Banned: revolutionary, game-changing\nMust include: SOC 2",
+           "website": "acme.example"}
+
+
+class _StubClient:
+    """Quacks like openai.OpenAI for chat.completions.create; returns instantly."""
+
+    def __init__(self) -> None:
+        msg = SimpleNamespace(content=lorem(12))
+        resp = SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=lambda **kw: resp))
+
+
+# ------------------------------------------------------------------- cases --
+
+for _pages in (1, 10, 100):
+    _text = lorem(PAGE_LINES * _pages)
+
+    @case(f"exports.pdf[{_pages}p]", heavy=_pages == 100)
+    def _pdf(_, text=_text):
+        from shared.exports import text_to_pdf_bytes
+        text_to_pdf_bytes(text, title="Bench")
+
+    @case(f"exports.docx[{_pages}p]", heavy=_pages == 100)
+    def _docx(_, text=_text):
+        from shared.exports import text_to_docx_bytes
+        text_to_docx_bytes(text, title="Bench")
+
+
+_variants = [lorem(20, seed=s) for s in range(3)]
+
+
+@case("exports.join_variants[3x20l]")
+def _join(_):
+    from shared.exports import join_variants
+    join_variants(_variants)
+
+
+def _history_with(n: int):
+    def setup():
+        from shared import history
+        history.clear()
+        for i in range(n):
+            history.add("content", f"Item {i} " + _variants[i % 3][:200], meta={"i": i}, tags=["bench"])
+        return history
+    return setup
+
+
+for _n, _heavy in ((1_000, False), (100_000, True)):
+    @case(f"history.add[x{_n // 1000}k]", setup=_history_with(0), heavy=_heavy)
+    def _hadd(history, n=_n):
+        history.clear()
+        for i in range(n):
+            history.add("content", "x", meta={"i": i}, tags=["bench"])
+
+    @case(f"history.get[@{_n // 1000}k]", setup=_history_with(_n), heavy=_heavy)
+    def _hget(history):
+        history.get()
+
+    @case(f"history.export_json[@{_n // 1000}k]", setup=_history_with(_n), heavy=_heavy)
+    def _hexport(history):
+        history.export_json()
+
+    @case(f"history.export_parquet[@{_n // 1000}k]", setup=_history_with(_n), heavy=_heavy)
+    def _hparquet(history):
+        import io
+        from shared import history_export
+        history_export.write_parquet(history.get(), io.BytesIO())
+
+
+def _csv_setup(rows: int, name: str, sidecar: bool, warm: bool):
+    def setup():
+        from shared import datasets
+        p = write_csv(rows, name)
+        datasets.sidecar_path(p).unlink(missing_ok=True)
+        datasets.clear_cache()
+        if warm:
+            datasets.load_csv(str(p), use_sidecar=sidecar)
+        return datasets, p, sidecar, warm
+    return setup
+
+
+def _load(state):
+    datasets, p, sidecar, warm = state
+    if not warm:
+        datasets.clear_cache()
+    elif sidecar:
+        datasets.clear_cache()  # measure the memory-mapped sidecar path, not the in-process cache
+    datasets.load_csv(str(p), use_sidecar=sidecar)
+
+
+for _rows, _label, _heavy in ((1_000, "small", False), (200_000, "large", True)):
+    case(f"datasets.load_csv[{_label},parse]", setup=_csv_setup(_rows, f"{_label}.csv", False, False), heavy=_heavy)(_load)
+    case(f"datasets.load_csv[{_label},sidecar]", setup=_csv_setup(_rows, f"{_label}.csv", True, True), heavy=_heavy)(_load)
+
+
+@case("datasets.load_csv[small,cached]", setup=_csv_setup(1_000, "small.csv", False, True))
+def _load_cached(state):
+    datasets, p, _, _ = state
+    datasets.load_csv(str(p), use_sidecar=False)
+
+
+@case("prompts.build[all tasks]")
+def _prompts(_):
+    from shared import prompts
+    for task in prompts.TASKS:
+        prompts.build(task, PROFILE, tone="Bold", length="Short", timing="This quarter", niche="ops", n_hooks=10)
+
+
+@case("profiles.derive[uncached]")
+def _derive(_):
+    from shared import profiles
+    profiles._derive.cache_clear()
+    profiles.derive(PROFILE)
+
+
+def _stub_llm():
+    from shared import llm, router, semantic
+    llm._client = lambda: (_StubClient(), True)
+    router._router = router.Router(log_path="")  # keep the audit log out of the timings
+    semantic.get_cache().clear()
+    return llm
+
+
+@case("llm.llm_copy[stub,no cache]", setup=_stub_llm)
+def _llm_nocache(llm):
+    llm.llm_copy("Write a launch post for RoboHub 2.0 aimed at plant managers.", use_cache=False, context="")
+
+
+@case("llm.llm_copy[stub,cache hit]", setup=_stub_llm)
+def _llm_cached(llm):
+    llm.llm_copy("Write a launch post for RoboHub 2.0 aimed at plant managers.", context="")
+
+
+def _tagger_setup():
+    from shared import tagging
+    rnd = random.Random(11)
+    heads = ("wins award for", "hit by data breach at", "not a great quarter for", "launches", "recall spreads at")
+    entries = [{"title": f"{rnd.choice(('Acme', 'Globex', 'Initech'))} {rnd.choice(heads)} {rnd.choice(_WORDS)}",
+                "summary": f"<p>{lorem(2, seed=i)}</p>"} for i in range(5_000)]
+    return tagging.get_tagger(tagging.entities_for(PROFILE, "Globex | Globex Corp, Initech")), entries
+
+
+@case("tagging.tag_entries[5k items]", setup=_tagger_setup)
+def _tag(state):
+    tagger, entries = state
+    tagger.tag_entries(entries)
+
+
+# ------------------------------------------------------------------ runner --
+
+def measure(setup: Callable[[], Any], fn: Callable[[Any], Any], repeat: int, budget_s: float) -> Dict[str, float]:
+    """Per-call seconds: loops are calibrated so one repeat takes ~budget_s / repeat."""
+    state = setup()
+    t0 = time.perf_counter()
+    fn(state)  # warm-up and calibration
+    one = max(time.perf_counter() - t0, 1e-7)
+    loops = max(1, int(budget_s / repeat / one))
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(loops):
+            fn(state)
+        samples.append((time.perf_counter() - t0) / loops)
+    return {"median_s": statistics.median(samples), "min_s": min(samples), "loops": loops}
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Any],
+            tolerance: float, floor_s: float) -> List[str]:
+    out = []
+    for name, r in results.items():
+        b = baseline.get("cases", {}).get(name)
+        if not b:
+            continue
+        new, old = r["median_s"], b["median_s"]
+        if new > old * (1 + tolerance) and new - old > floor_s:
+            out.append(f"{name}: {old * 1000:.3f} ms -> {new * 1000:.3f} ms (+{(new / old - 1) * 100:.0f}%)")
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--only", nargs="*", help="substring filter on case names")
+    ap.add_argument("--quick", action="store_true", help="skip the heavy cases")
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--budget", type=float, default=1.0, help="seconds per case (approx.)")
+    ap.add_argument("--save", action="store_true", help=f"write results to {BASELINE.name}")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--tolerance", type=float, default=0.30, help="allowed relative slowdown (default 30%%)")
+    ap.add_argument("--floor-ms", type=float, default=0.05, help="ignore slowdowns smaller than this")
+    args = ap.parse_args(argv)
+
+    # history uses st.session_state, which works in bare mode but warns on every access.
+    import streamlit.logger
+    streamlit.logger.set_log_level("error")
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    from shared import tracing
+    tracing._tracer = tracing.Tracer(path="")  # spans stay in memory; no trace file writes in the timings
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8")) if args.baseline.exists() else {}
+    results: Dict[str, Dict[str, float]] = {}
+    print(f"{'case':38} {'median':>12} {'min':>12} {'baseline':>12}")
+    for name, (setup, fn, heavy) in CASES.items():
+        if args.only and not any(s in name for s in args.only):
+            continue
+        if heavy and args.quick:
+            continue
+        r = results[name] = measure(setup, fn, args.repeat, args.budget)
+        b = baseline.get("cases", {}).get(name, {}).get("median_s")
+        ms = lambda v: f"{v * 1000:9.3f} ms" if v is not None else f"{'—':>12}"
+        print(f"{name:38} {ms(r['median_s'])} {ms(r['min_s'])} {ms(b)}")
+
+    if args.save:
+        merged = {**baseline.get("cases", {}), **results}
+        args.baseline.write_text(json.dumps({
+            "machine": f"{platform.system()} {platform.machine()} / Python {platform.python_version()}",
+            "recorded": time.strftime("%Y-%m-%d"),
+            "cases": {k: {"median_s": round(v["median_s"], 9)} for k, v in merged.items()},
+        }, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline written to {args.baseline}")
+        return 0
+    regressions = compare(results, baseline, args.tolerance, args.floor_ms / 1000)
+    for r in regressions:
+        print("REGRESSION", r)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
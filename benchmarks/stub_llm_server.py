@@ -0,0 +1,98 @@
+# benchmarks/stub_llm_server.py
+"""
+Local OpenAI-compatible stub for offline throughput runs: answers
+POST /v1/chat/completions with canned copy after a simulated latency.
+
+    python benchmarks/stub_llm_server.py --port 8765 --latency-ms 400 --jitter-ms 150
+    OPENAI_API_KEY=stub python -m shared.batch clients.csv --out runs/stub \\
+        --base-url http://127.0.0.1:8765/v1
+
+--error-rate injects 500s so retries and checkpoint/resume can be exercised.
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_counter = 0
+_counter_lock = threading.Lock()
+
+
+def _completion(body: dict, words: int) -> dict:
+    global _counter
+    with _counter_lock:
+        _counter += 1
+        n = _counter
+    prompt = "\n".join(str(m.get("content", "")) for m in body.get("messages", []))
+    seed = hashlib.sha1(prompt.encode("utf-8")).hexdigest()[:8]
+    text = f"Stub copy {seed}.\n\n" + " ".join(f"word{i}" for i in range(words))
+    return {
+        "id": f"chatcmpl-stub-{n}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": body.get("model", "stub"),
+        "choices": [{"index": 0, "finish_reason": "stop",
+                     "message": {"role": "assistant", "content": text}}],
+        "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": words,
+                  "total_tokens": len(prompt.split()) + words},
+    }
+
+
+def make_handler(args: argparse.Namespace):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *a) -> None:  # quiet
+            pass
+
+        def _send(self, code: int, payload: dict) -> None:
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            try:
+                body = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError:
+                return self._send(400, {"error": {"message": "bad json"}})
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                return self._send(404, {"error": {"message": f"no route {self.path}"}})
+            delay = max(0.0, random.gauss(args.latency_ms, args.jitter_ms) / 1000.0)
+            time.sleep(delay)
+            if random.random() < args.error_rate:
+                return self._send(500, {"error": {"message": "injected failure", "type": "server_error"}})
+            words = min(int(body.get("max_tokens") or args.words), args.words)
+            self._send(200, _completion(body, words))
+
+    return Handler
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=400.0)
+    ap.add_argument("--jitter-ms", type=float, default=100.0)
+    ap.add_argument("--error-rate", type=float, default=0.0)
+    ap.add_argument("--words", type=int, default=120)
+    args = ap.parse_args()
+    srv = ThreadingHTTPServer((args.host, args.port), make_handler(args))
+    srv.daemon_threads = True
+    print(f"stub LLM on http://{args.host}:{args.port}/v1 "
+          f"(latency {args.latency_ms:.0f}±{args.jitter_ms:.0f} ms, errors {args.error_rate:.0%})", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
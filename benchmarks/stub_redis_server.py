@@ -0,0 +1,162 @@
+# benchmarks/stub_redis_server.py
+"""
+Local Redis stand-in for multi-replica runs without a Redis install: an
+in-memory RESP2 server with the commands shared/backend.py uses.
+
+    python benchmarks/stub_redis_server.py --port 6390
+    PRESENCE_STATE_URL=redis://127.0.0.1:6390/0 streamlit run app.py --server.port 8501
+    PRESENCE_STATE_URL=redis://127.0.0.1:6390/0 streamlit run app.py --server.port 8502
+
+Supports PING, ECHO, SELECT, AUTH, GET, SET, MSET, MGET, DEL, EXISTS, RPUSH,
+LRANGE, LLEN, FLUSHDB, DBSIZE and MULTI/EXEC/DISCARD; data is lost when it
+stops.
+"""
+from __future__ import annotations
+import argparse
+import socketserver
+import threading
+from typing import Dict, List, Optional
+
+_dbs: Dict[int, Dict[str, object]] = {}
+_lock = threading.Lock()
+
+
+def _bulk(v: Optional[str]) -> bytes:
+    if v is None:
+        return b"$-1\r\n"
+    b = v.encode("utf-8")
+    return b"$%d\r\n%s\r\n" % (len(b), b)
+
+
+def _array(vals: List[Optional[str]]) -> bytes:
+    return b"*%d\r\n" % len(vals) + b"".join(_bulk(v) for v in vals)
+
+
+def _int(n: int) -> bytes:
+    return b":%d\r\n" % n
+
+
+def _err(msg: str) -> bytes:
+    return f"-{msg}\r\n".encode("utf-8")
+
+
+OK = b"+OK\r\n"
+WRONGTYPE = _err("WRONGTYPE Operation against a key holding the wrong kind of value")
+
+
+def execute(db: Dict[str, object], cmd: str, args: List[str]) -> bytes:
+    if cmd == "PING":
+        return _bulk(args[0]) if args else b"+PONG\r\n"
+    if cmd == "ECHO":
+        return _bulk(args[0])
+    if cmd == "AUTH":
+        return OK
+    if cmd == "GET":
+        v = db.get(args[0])
+        return WRONGTYPE if isinstance(v, list) else _bulk(v)
+    if cmd == "MGET":
+        return _array([v if isinstance(v := db.get(k), str) else None for k in args])
+    if cmd == "SET":
+        db[args[0]] = args[1]
+        return OK
+    if cmd == "MSET":
+        if not args or len(args) % 2:
+            return _err("ERR wrong number of arguments for 'mset' command")
+        for k, v in zip(args[::2], args[1::2]):
+            db[k] = v
+        return OK
+    if cmd == "DEL":
+        return _int(sum(db.pop(k, None) is not None for k in args))
+    if cmd == "EXISTS":
+        return _int(sum(k in db for k in args))
+    if cmd == "RPUSH":
+        lst = db.setdefault(args[0], [])
+        if not isinstance(lst, list):
+            return WRONGTYPE
+        lst.extend(args[1:])
+        return _int(len(lst))
+    if cmd == "LLEN":
+        lst = db.get(args[0], [])
+        return WRONGTYPE if not isinstance(lst, list) else _int(len(lst))
+    if cmd == "LRANGE":
+        lst = db.get(args[0], [])
+        if not isinstance(lst, list):
+            return WRONGTYPE
+        n, start, stop = len(lst), int(args[1]), int(args[2])
+        start = max(0, n + start if start < 0 else start)
+        stop = n + stop if stop < 0 else min(stop, n - 1)
+        return _array(lst[start:stop + 1])
+    if cmd == "FLUSHDB":
+        db.clear()
+        return OK
+    if cmd == "DBSIZE":
+        return _int(len(db))
+    return _err(f"ERR unknown command '{cmd.lower()}'")
+
+
+class Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        db_index = 0
+        queued: Optional[List[List[str]]] = None  # inside MULTI
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            if not line.startswith(b"*"):
+                continue  # inline commands are not supported
+            args = []
+            for _ in range(int(line[1:-2])):
+                n = int(self.rfile.readline()[1:-2])
+                args.append(self.rfile.read(n + 2)[:-2].decode("utf-8"))
+            if not args:
+                continue
+            cmd = args[0].upper()
+            if cmd == "MULTI":
+                queued = []
+                self.wfile.write(OK)
+                continue
+            if cmd == "DISCARD":
+                queued = None
+                self.wfile.write(OK)
+                continue
+            if cmd == "EXEC":
+                if queued is None:
+                    self.wfile.write(_err("ERR EXEC without MULTI"))
+                    continue
+                # Atomic: the whole transaction runs under the lock.
+                with _lock:
+                    db = _dbs.setdefault(db_index, {})
+                    replies = [execute(db, q[0].upper(), q[1:]) for q in queued]
+                queued = None
+                self.wfile.write(b"*%d\r\n" % len(replies) + b"".join(replies))
+                continue
+            if queued is not None:
+                queued.append(args)
+                self.wfile.write(b"+QUEUED\r\n")
+                continue
+            if cmd == "SELECT":
+                db_index = int(args[1])
+                self.wfile.write(OK)
+                continue
+            with _lock:
+                reply = execute(_dbs.setdefault(db_index, {}), cmd, args[1:])
+            self.wfile.write(reply)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=6390)
+    args = ap.parse_args()
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    srv = socketserver.ThreadingTCPServer((args.host, args.port), Handler)
+    srv.daemon_threads = True
+    print(f"stub Redis on redis://{args.host}:{args.port}/0", flush=True)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
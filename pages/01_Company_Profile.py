@@ -1,11 +1,12 @@
 # pages/01_Company_Profile.py
 from __future__ import annotations
 
+import time
 import streamlit as st
 from typing import Any, Dict
 
 # --- shared state (works with the state module we've been using) ---
-from shared import state
+from shared import state, history, compliance, tracing, prefetch
 
 st.set_page_config(page_title="Company Profile", page_icon="🏢", layout="wide")
 st.title("🏢 Company Profile")
@@ -13,6 +14,22 @@ st.caption("Set your name, industry, size, goals, audience & brand voice. All to
 
 # --- safety: init state and fetch current company profile ---
 state.init()  # safe no-op if already initialized
+
+# --- client switcher (profiles persist in data/profiles.json) ---
+_NEW = "➕ New client"
+saved = state.list_companies()
+active_id = getattr(state.get_company(), "id", "")
+ids = [_NEW] + [p.id for p in saved]
+names = {p.id: p.name for p in saved}
+pick = st.selectbox("Client", ids, index=ids.index(active_id) if active_id in ids else 0,
+                    format_func=lambda i: names.get(i, i))
+if pick != _NEW and pick != active_id:
+    state.switch_company(pick)
+    st.rerun()
+if pick == _NEW and active_id:
+    state.set_company({})  # start a blank, unsaved profile
+    st.rerun()
+
 co_raw = state.get_company()  # may be dict / object / None
 
 def getv(obj: Any, key: str, default: str = "") -> str:
@@ -72,6 +89,12 @@ brand_rules = st.text_area(
 website = st.text_input("Website (optional)", value=website, placeholder="https://acme.com")
 
 # --- Save / Reset ---
+st.session_state["prefetch_enabled"] = st.checkbox(
+    "⚡ Pre-generate Strategy Ideas & PR Intelligence when I save",
+    value=prefetch.enabled(),
+    help="Runs those pages' default generations in the background right after saving, so your first "
+         f"click there is instant. Capped at ${prefetch.BUDGET_USD:.2f}/day of estimated spend.",
+)
 col_a, col_b = st.columns([1, 1])
 with col_a:
     if st.button("💾 Save Profile", use_container_width=True):
@@ -85,16 +108,30 @@ with col_a:
             "brand_rules": brand_rules.strip(),
             "website": website.strip(),
         }
-        state.set_company(new_profile)  # single place to persist
-        st.success("Company profile saved. All tools will use this.")
-        st.rerun()
+        try:
+            pv = state.save_company(new_profile)  # single place to persist
+        except ValueError as e:
+            st.error(str(e))
+        else:
+            st.success(f"Saved {pv.name} (v{pv.version}). All tools will use this.")
+            st.rerun()
 
 with col_b:
-    if st.button("🗑️ Clear Profile", use_container_width=True):
+    if active_id and st.button("🗑️ Delete client", use_container_width=True):
+        from shared import profiles
+        profiles.get_store().delete(active_id)
+        state.set_company({})
+        st.success("Client deleted.")
+        st.rerun()
+    elif not active_id and st.button("🗑️ Clear Profile", use_container_width=True):
         state.set_company({})  # clear to empty profile
         st.success("Company profile cleared.")
         st.rerun()
 
+pre = prefetch.status()
+if pre:
+    st.caption("⚡ Pre-generated for this profile: " + " · ".join(f"{r['page']} — {r['status']}" for r in pre))
+
 # --- Preview ---
 st.subheader("Preview")
 st.markdown(
@@ -113,3 +150,31 @@ st.markdown(
 **Website:** {website or "—"}
 """
 )
+
+# --- Brand-rules compliance ---
+st.subheader("Brand-rules check")
+rules = state.company_version().rules if brand_rules == getv(co_raw, "brand_rules") else compliance.parse_rules(brand_rules)
+if rules.empty:
+    st.caption("No banned or required terms detected in the brand rules. "
+               "Quote terms (e.g. avoid 'revolutionary') or use `Banned: a, b` / `Must include: x` lines.")
+else:
+    st.caption(
+        "Banned: " + (", ".join(f"“{t}”" for t in rules.banned) or "—")
+        + " · Required: " + (", ".join(f"“{t}”" for t in rules.required) or "—")
+        + " — new generations are flagged inline."
+    )
+    if st.button("🔎 Audit history against brand rules"):
+        items = history.get()
+        with tracing.span("page.brand_audit", items=len(items)):
+            flagged = compliance.audit(items, rules)
+        if not flagged:
+            st.success(f"No banned terms in {len(items)} history item(s).")
+        else:
+            st.warning(f"{len(flagged)} of {len(items)} history item(s) use banned terms.")
+            st.dataframe(
+                [{"#": i, "kind": it.get("kind", ""), "time": time.strftime("%Y-%m-%d %H:%M", time.localtime(it.get("ts", 0))),
+                  "terms": ", ".join(f"{v.term} ×{v.count}" for v in rep.violations),
+                  "snippet": rep.violations[0].snippet} for i, it, rep in flagged],
+                use_container_width=True,
+                hide_index=True,
+            )
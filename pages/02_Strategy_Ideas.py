@@ -1,7 +1,7 @@
 # pages/02_Strategy_Ideas.py
 from __future__ import annotations
 import streamlit as st
-from shared import ui, state, history
+from shared import ui, state, history, prompts
 from shared.llm import llm_copy
 from shared.exports import text_to_docx_bytes, text_to_pdf_bytes
 
@@ -18,20 +18,25 @@ with col2:
     tone = st.selectbox("Tone", ["Professional","Friendly","Bold","Neutral"], index=0)
     length = st.selectbox("Length", ["Short","Medium","Long"], index=1)
 
-if st.button("Generate Strategy Idea", type="primary"):
-    prompt = f"""Propose a practical PR/Marketing initiative for {co.name} ({co.industry}, size: {co.size}).
-Goals: {goals}.
-Output a concise plan: headline, rationale, primary channel, 4–6 bullets, clear success metrics."""
-    out = llm_copy(prompt, temperature=0.55, max_tokens=450)
+ui.similar_past(goals, kinds=["strategy"], label="Similar strategy ideas you already generated")
+
+b1, b2 = st.columns([1, 1])
+run = b1.button("Generate Strategy Idea", type="primary", use_container_width=True)
+# Same inputs hit the cache; this asks the model for a fresh idea instead.
+fresh = b2.button("🔄 Regenerate (new idea)", use_container_width=True)
+
+if run or fresh:
+    prompt = prompts.strategy(co, goals)
+    out = llm_copy(prompt, temperature=0.55, cache_scope=f"strategy|{tone}|{length}", task="strategy",
+                   use_cache=not fresh)
     st.success("Generated")
     st.markdown(out)
 
     history.add(
-        kind="strategy",
-        text=out,
-        payload={"tone": tone, "length": length, "goals": goals, "company": state.get_company_as_dict()},
+        "strategy",
+        out,
+        meta={"company": co.name, "tone": tone, "length": length, "goals": goals},
         tags=["strategy", tone, length, co.size],
-        meta={"company": co.name}
     )
 
     c1, c2 = st.columns(2)
@@ -2,8 +2,8 @@
 from __future__ import annotations
 import streamlit as st
 
-from shared import state, history
-from shared.llm import llm_copy
+from shared import state, ui, prompts, jobs, structured
+from shared.llm import OFFLINE_DRAFT, check_brand, llm_json
 from shared.exports import text_to_pdf_bytes, text_to_docx_bytes, join_variants
 
 st.set_page_config(page_title="Content Engine", page_icon="📰", layout="wide")
@@ -23,48 +23,58 @@ with cols[1]:
 with cols[2]:
     length = st.selectbox("Length", ["Short", "Medium", "Long"], index=1)
 
-if st.button("Generate A/B/C Variants", use_container_width=True):
-    company_name = co.get("name") if isinstance(co, dict) else getattr(co, "name", "")
-    industry = co.get("industry") if isinstance(co, dict) else getattr(co, "industry", "")
-    audience = co.get("audience") if isinstance(co, dict) else getattr(co, "audience", "")
-    topic = co.get("topic") if isinstance(co, dict) else getattr(co, "topic", "New Launch")
+_topic = co.get("topic") if isinstance(co, dict) else getattr(co, "topic", "New Launch")
+ui.similar_past(f"{content_type} {tone} {length} {_topic}", kinds=["content"],
+                label="Similar content you already generated")
+
+
+
+def _generate(job, prompt: str, scope: str, meta: dict, tags: list, context: str = "") -> dict:
+    # Runs on a worker thread: no st.* calls in here.
+    job.progress(0.1, "Generating variants…")
+
+    def _arrived(i: int, item: dict) -> None:
+        job.emit(item)  # shown by the panel while the rest streams in
+        job.progress(0.1 + 0.2 * (i + 1), f"Variant {i + 1} of 3 ready…")
+
+    try:
+        items = llm_json(prompt, structured.variants(3), cache_scope=scope, context=context,
+                         task="content", on_item=_arrived).items
+    except Exception:
+        items = []
+    if not items:
+        items = [{"title": "Draft", "body": OFFLINE_DRAFT}]
+    variants = [it["body"] or it["title"] for it in items]
+
+    job.progress(0.8, "Building exports…")
+    joined = join_variants(f"{it['title']}\n\n{v}" if it["title"] else v for it, v in zip(items, variants))
+    result = {
+        "items": items,
+        "variants": variants,
+        "joined": joined,
+        "docx": text_to_docx_bytes(joined, title="Content Engine — A/B/C"),
+        "pdf": text_to_pdf_bytes(joined, title="Content Engine — A/B/C"),
+    }
+    job.record("content", joined, meta=meta, tags=tags)
+    return result
+
 
-    prompt = f"""
-You are a senior PR/marketing copywriter.
-Create three distinct {content_type} variants for:
-- Company: {company_name} ({industry})
-- Audience: {audience}
-- Topic/Offer: {topic}
-Tone: {tone}. Length: {length}.
-Return only the copy for each variant, separated with a clear title line.
-    """.strip()
-
-    with st.spinner("Generating variants..."):
-        try:
-            raw = llm_copy(prompt)
-        except Exception:
-            raw = ""
-
-    # Very light parser for 3 variants (fallback if model returns one block)
-    parts = [p.strip() for p in raw.split("\n\n") if p.strip()]
-    if len(parts) < 3:
-        variants = [raw.strip() or "Draft:\n• Opening line tailored to the audience.\n• Benefit/feature #1\n• Benefit/feature #2\n• Clear CTA"]
-    else:
-        # keep the top 3 chunks as variants
-        variants = parts[:3]
-
-    # Show and export
-    for i, v in enumerate(variants, 1):
-        st.subheader(f"Variant {i}")
-        st.write(v)
-
-    joined = join_variants(variants)
+def _show_variants(items: list) -> None:
+    for i, it in enumerate(items, 1):
+        st.subheader(f"Variant {i}" + (f" — {it['title']}" if it.get("title") else ""))
+        st.write(it.get("body") or "")
+
+
+def _render(job) -> None:
+    res = job.result
+    _show_variants(res["items"])
+    check_brand(res["joined"])
 
     c1, c2, c3 = st.columns(3)
     with c1:
         st.download_button(
             "Download A/B/C (.txt)",
-            data=joined.encode("utf-8"),
+            data=res["joined"].encode("utf-8"),
             file_name="content_engine_variants.txt",
             mime="text/plain",
             use_container_width=True,
@@ -72,7 +82,7 @@ Return only the copy for each variant, separated with a clear title line.
     with c2:
         st.download_button(
             "Download A/B/C (.docx)",
-            data=text_to_docx_bytes(joined, title="Content Engine — A/B/C"),
+            data=res["docx"],
             file_name="content_engine_variants.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             use_container_width=True,
@@ -80,20 +90,27 @@ Return only the copy for each variant, separated with a clear title line.
     with c3:
         st.download_button(
             "Download A/B/C (.pdf)",
-            data=text_to_pdf_bytes(joined, title="Content Engine — A/B/C"),
+            data=res["pdf"],
             file_name="content_engine_variants.pdf",
             mime="application/pdf",
             use_container_width=True,
         )
 
-    # Log to history
-    try:
-        history.add(
-            kind="content",
-            title=f"{content_type} — {tone}/{length}",
-            payload={"variants": variants, "joined": joined},
-            meta={"company": company_name, "type": content_type, "tone": tone, "length": length},
-            tags=["content", content_type.lower(), tone.lower(), length.lower()],
-        )
-    except Exception:
-        pass
+
+if st.button("Generate A/B/C Variants", use_container_width=True):
+    company_name = co.get("name") if isinstance(co, dict) else getattr(co, "name", "")
+    topic = co.get("topic") if isinstance(co, dict) else getattr(co, "topic", "New Launch")
+
+    # Returns immediately; the result reaches history even if the user navigates away.
+    jobs.submit(
+        "content",
+        _generate,
+        prompts.content(co, content_type, tone, length, topic),
+        f"content|{content_type}|{tone}|{length}",
+        {"company": company_name, "type": content_type, "tone": tone, "length": length},
+        ["content", content_type.lower(), tone.lower(), length.lower()],
+        context=state.company_version().context,
+        label=f"{content_type} — {tone}/{length}",
+    )
+
+ui.job_panel("content", _render, render_partial=_show_variants)
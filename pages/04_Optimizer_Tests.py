@@ -1,8 +1,9 @@
 # pages/04_Optimizer_Tests.py
 from __future__ import annotations
 import streamlit as st
-from shared import ui, state, history
-from shared.llm import llm_copy
+from shared import ui, state, history, structured
+from shared.llm import llm_json
+from shared.scoring import GOALS, rank_variants
 
 state.init()
 ui.page_title("Optimizer Tests (A/B scoring)", "Try small variations and get heuristic scores.")
@@ -11,24 +12,73 @@ co = state.get_company()
 
 text = st.text_area("Base copy", height=140, value="Meet RoboHub 2.0 — faster setup, SOC 2 Type II, and 30% lower cost.")
 tone = st.selectbox("Tone", ["Professional","Friendly","Bold","Neutral"], index=0)
-goal = st.selectbox("Goal", ["Awareness","Clicks","Signups","Demo Requests"], index=3)
+goal = st.selectbox("Goal", list(GOALS), index=3)
 lang = st.selectbox("Language", ["English","Spanish","French","German"], index=0)
+extra = st.text_area("Your own variants (optional, one per line)", height=90,
+                     help="Scored locally alongside the base copy — no LLM call needed.")
 
-if st.button("Generate & Score Variants", type="primary"):
-    prompt = f"""Create 3 short variants (A/B/C) of this copy in {lang}, tone {tone}, optimized for {goal}.
-Return in the format:
-A) <one paragraph up to 2 lines>
-B) ...
-C) ...
-After that, rate each A/B/C from 1–10 for {goal} with a brief reason."""
-    out = llm_copy(prompt, temperature=0.6, max_tokens=800)
-    st.success("Generated")
-    st.markdown(out)
+
+def _show_ranking(variants: dict) -> list:
+    ranked = rank_variants(variants, goal, lang)
+    st.dataframe(
+        [{"variant": r.label, "score": r.score, "why": ", ".join(r.reasons), "copy": r.text} for r in ranked],
+        use_container_width=True,
+        hide_index=True,
+    )
+    return ranked
+
+
+def _manual_variants() -> dict:
+    out = {"Base": text.strip()}
+    for i, line in enumerate([l.strip() for l in extra.splitlines() if l.strip()], start=1):
+        out[f"Mine {i}"] = line
+    return out
+
+
+c1, c2 = st.columns(2)
+with c1:
+    run_llm = st.button("Generate & Score Variants", type="primary", use_container_width=True)
+with c2:
+    run_local = st.button("Score only (instant, local)", use_container_width=True)
+
+if run_local:
+    ranked = _show_ranking(_manual_variants())
+    history.add(
+        "optimizer",
+        "\n".join(f"{r.label}: {r.score} — {r.text}" for r in ranked),
+        meta={"company": co.name, "goal": goal, "tone": tone, "language": lang, "base": text, "mode": "local"},
+        tags=["optimizer", goal, tone, lang],
+    )
+
+if run_llm:
+    # The LLM only writes the variants; scoring is local, instant and repeatable.
+    prompt = f"""Create 3 short variants of this copy in {lang}, tone {tone}, optimized for {goal}.
+Each variant is one paragraph of up to 2 lines; its title is a 2-4 word name for the angle it takes.
+
+Copy:
+{text}"""
+    live = st.empty()  # a placeholder, so .empty() below removes the streamed preview
+    stream = live.container()
+
+    def _arrived(i: int, item: dict) -> None:
+        stream.markdown(f"**{chr(65 + i)})** {item['body']}")  # show each variant as it closes
+
+    res = llm_json(prompt, structured.variants(3), temperature=0.6, task="optimizer",
+                   cache_scope=f"optimizer|{lang}|{tone}|{goal}", on_item=_arrived)
+    live.empty()
+    parsed = {} if res.source == "offline" else {chr(65 + i): it["body"] for i, it in enumerate(res.items) if it["body"]}
+    if res.source == "offline":
+        st.info("No API key configured; scoring your own copy only.")
+    elif parsed:
+        st.success("Generated" + (" (repaired a malformed response)" if res.repaired else ""))
+    else:
+        st.warning("The model returned no usable variants; scoring your own copy only.")
+    ranked = _show_ranking({**_manual_variants(), **parsed})
 
     history.add(
-        kind="optimizer",
-        text=out,
-        payload={"goal": goal, "tone": tone, "language": lang, "base": text},
+        "optimizer",
+        "\n".join(f"{k}) {v}" for k, v in parsed.items()),
+        meta={"company": co.name, "goal": goal, "tone": tone, "language": lang, "base": text,
+              "scores": {r.label: r.score for r in ranked}},
         tags=["optimizer", goal, tone, lang],
-        meta={"company": co.name}
     )
@@ -1,34 +1,46 @@
 # pages/05_History_Insights.py
 from __future__ import annotations
+import json
+from datetime import datetime
 import streamlit as st
-import pandas as pd
-from shared import ui, history
+from shared import ui, history, state, tracing
 
 ui.page_title("History & Insights", "Browse, filter, export/import your work.")
+state.init()  # also pulls items other replicas / background jobs added
 
 data = history.get_history()
 if not data:
     st.info("No history yet. Generate something in Strategy or Content Engine.")
     st.stop()
 
-df = pd.DataFrame(data)
-df["ts"] = pd.to_datetime(df["ts"])
-
-kinds = sorted(df["kind"].unique().tolist())
+# Plain rows for st.dataframe: no pandas needed just to tabulate the session log.
+kinds = sorted({str(it.get("kind", "")) for it in data})
 sel_kinds = st.multiselect("Filter by kind", kinds, default=kinds)
-show = df[df["kind"].isin(sel_kinds)].copy()
 
-def preview_payload(p):
+def _ts(v) -> str:
     try:
-        if isinstance(p, dict):
-            keys = ", ".join(list(p.keys())[:4])
-            return f"{{{keys}...}}"
-        return ""
-    except Exception:
-        return ""
+        return datetime.fromtimestamp(float(v)).strftime("%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return str(v or "")
+
+def _preview(v, n: int = 160) -> str:
+    if isinstance(v, (dict, list)):
+        v = json.dumps(v, ensure_ascii=False)
+    v = str(v or "")
+    return v if len(v) <= n else v[: n - 1] + "…"
 
-show = show[["ts","kind","text","payload","tags","meta"]].copy()
-show["payload"] = show["payload"].apply(preview_payload)
+with tracing.span("page.table", items=len(data)):
+    show = [
+        {
+            "ts": _ts(it.get("ts")),
+            "kind": it.get("kind", ""),
+            "content": _preview(it.get("content") or it.get("text")),
+            "tags": ", ".join(str(t) for t in it.get("tags") or []),
+            "meta": _preview(it.get("meta") or {}),
+        }
+        for it in data
+        if str(it.get("kind", "")) in sel_kinds
+    ]
 
 st.dataframe(show, use_container_width=True)
 
@@ -38,10 +50,40 @@ with c1:
                        file_name="history.json", mime="application/json")
 with c2:
     uploaded = st.file_uploader("Import JSON", type=["json"])
-    if uploaded is not None:
+    # The uploader keeps its file across reruns; import each upload once.
+    if uploaded is not None and st.session_state.get("_history_import") != getattr(uploaded, "file_id", uploaded.name):
         history.import_json_str(uploaded.getvalue().decode("utf-8"))
+        st.session_state["_history_import"] = getattr(uploaded, "file_id", uploaded.name)
         st.success("Imported — reload page to see updates.")
 with c3:
     if st.button("Clear history", type="primary"):
-        st.session_state["history"] = []
+        history.clear()
         st.success("Cleared — reload page.")
+
+# Columnar export for the data team's warehouse loads (built on demand, not every rerun).
+with st.expander("Export for analytics (Parquet)"):
+    from shared import history_export
+
+    if not history_export.available():
+        st.info("Parquet export needs the 'pyarrow' package.")
+    else:
+        last = history_export.last_export()
+        if last:
+            st.caption(f"Last incremental export: {last.get('rows', 0)} items up to {_ts(last.get('ts'))} "
+                       f"(exported {_ts(last.get('at'))}).")
+        incremental = st.checkbox("Only items newer than the last incremental export", value=bool(last))
+        if st.button("Build Parquet"):
+            with st.spinner("Writing Parquet…"):
+                st.session_state["_history_parquet"] = history_export.export_bytes(incremental=incremental)
+        built = st.session_state.get("_history_parquet")
+        if built:
+            blob, result = built
+            st.caption(f"{result.rows} items · {len(blob) / 1024:,.1f} KB"
+                       + (f" · since {_ts(result.since)}" if result.since else ""))
+            st.download_button(
+                "Download Parquet", data=blob, mime="application/vnd.apache.parquet",
+                file_name=f"history_{datetime.now():%Y%m%d_%H%M%S}.parquet",
+                disabled=not result.rows,
+                # The watermark only moves once the file was actually taken.
+                on_click=history_export.commit, args=(result,),
+            )
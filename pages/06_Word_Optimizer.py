@@ -1,8 +1,10 @@
 # pages/06_Word_Optimizer.py
 from __future__ import annotations
+import hashlib
 import streamlit as st
 from shared import ui, state, history
 from shared.llm import llm_copy
+from shared import phrases
 
 state.init()
 ui.page_title("Word Optimizer", "Rewrite + suggest stronger wording (Grammarly++ vibe).")
@@ -13,33 +15,63 @@ tone = st.selectbox("Tone", ["Professional","Friendly","Bold","Neutral"], index=
 lang = st.selectbox("Language", ["English","Spanish","French","German"], index=0)
 
 src = st.text_area("Paste your copy", height=180, value="Acme RoboHub 2.0 speeds onboarding and lowers costs for modern teams.")
-c1, c2, c3 = st.columns(3)
+c1, c2, c3, c4 = st.columns(4)
 with c1:
-    do_rewrite = st.button("Rewrite")
-with c2:
     do_suggest = st.button("Suggest better words")
+with c2:
+    do_rewrite = st.button("Rewrite (LLM)")
 with c3:
+    do_deep = st.button("Deeper suggestions (LLM)")
+with c4:
     clear = st.button("Clear output")
 
 if "wo_out" not in st.session_state:
     st.session_state["wo_out"] = ""
 
+# Every input in the cache key: a cached rewrite is only reused for this exact copy and these options.
+scope = f"{lang}|{tone}|{goal}|{hashlib.sha1(src.encode('utf-8')).hexdigest()[:12]}"
+
 if do_rewrite:
     prompt = f"Rewrite the following in {lang}, tone {tone}, optimized for {goal}. Keep it concise.\n\nText:\n{src}"
-    out = llm_copy(prompt, temperature=0.55, max_tokens=400)
+    out = llm_copy(prompt, temperature=0.55, task="rewrite", cache_scope=f"rewrite|{scope}")
     st.session_state["wo_out"] = out
-    history.add("optimizer", out, {"mode":"rewrite","src":src,"tone":tone,"goal":goal,"lang":lang},
-                tags=["optimizer","rewrite", goal, tone, lang], meta={"company": co.name})
+    history.add("optimizer", out, meta={"company": co.name, "mode":"rewrite","src":src,"tone":tone,"goal":goal,"lang":lang},
+                tags=["optimizer","rewrite", goal, tone, lang])
 
 if do_suggest:
+    # Local dictionary scan: instant, no LLM round trip.
+    found = phrases.suggest(src, goal, lang)
+    if found:
+        out = "\n".join(f"- **{s.phrase}** → {' / '.join(s.replacements)}" for s in found)
+    else:
+        out = "_No dictionary matches. Try **Deeper suggestions (LLM)**._"
+    st.session_state["wo_out"] = out
+    history.add("optimizer", out, meta={"company": co.name, "mode":"suggest-local","src":src,"tone":tone,"goal":goal,"lang":lang},
+                tags=["optimizer","suggestions", goal, lang])
+
+if do_deep:
     prompt = f"Suggest 10 stronger word/phrase replacements (term → replacement) in {lang}, tone {tone}, for this text:\n{src}"
-    out = llm_copy(prompt, temperature=0.5, max_tokens=400)
+    out = llm_copy(prompt, temperature=0.5, task="phrases", cache_scope=f"phrases|{scope}")
     st.session_state["wo_out"] = out
-    history.add("optimizer", out, {"mode":"suggest","src":src,"tone":tone,"goal":goal,"lang":lang},
-                tags=["optimizer","suggestions", tone, lang], meta={"company": co.name})
+    history.add("optimizer", out, meta={"company": co.name, "mode":"suggest","src":src,"tone":tone,"goal":goal,"lang":lang},
+                tags=["optimizer","suggestions", tone, lang])
 
 if clear:
     st.session_state["wo_out"] = ""
 
 st.markdown("### Output")
 st.markdown(st.session_state["wo_out"])
+
+with st.expander("Phrase dictionary"):
+    st.caption(f"{phrases.get_trie(lang, goal).size} phrases for {lang} / {goal}. "
+               f"Team additions are saved to `{phrases.USER_PATH}`.")
+    d1, d2, d3 = st.columns([2, 3, 1])
+    with d1:
+        weak = st.text_input("Weak phrase", key="wo_dict_weak")
+    with d2:
+        strong = st.text_input("Replacements (comma-separated)", key="wo_dict_strong")
+    with d3:
+        st.write("")
+        if st.button("Add", use_container_width=True) and weak.strip() and strong.strip():
+            phrases.save_user_entries(lang, goal, {weak.strip().lower(): [r.strip() for r in strong.split(",") if r.strip()]})
+            st.success(f"Added “{weak.strip()}”.")
@@ -1,7 +1,7 @@
 # pages/07_PR_Intelligence.py
 from __future__ import annotations
 import streamlit as st
-from shared import state, history
+from shared import state, history, prompts
 from shared.llm import llm_copy
 from shared.exports import text_to_pdf_bytes, text_to_docx_bytes
 
@@ -23,27 +23,22 @@ industry = co.get("industry", "") if isinstance(co, dict) else getattr(co, "indu
 audience = co.get("audience", "") if isinstance(co, dict) else getattr(co, "audience", "")
 st.write(f"**Context** — Company: {company} | Industry: {industry} | Audience: {audience}")
 
-colA, colB = st.columns([1,1])
+colA, colB, colC = st.columns([1,1,1])
 run = colA.button("Generate PR Insights", use_container_width=True)
-clear = colB.button("Clear Output", use_container_width=True)
+fresh = colB.button("🔄 Regenerate (new angles)", use_container_width=True)  # skip the cached answer
+clear = colC.button("Clear Output", use_container_width=True)
 
 if clear:
-    st.experimental_rerun()
+    st.rerun()
 
-if run:
-    prompt = f"""
-Act as a PR strategist. Using the context below, propose 3–5 press-worthy story angles,
-recommended journalist beats, suggested timing windows ({timing}), and a one-line pitch for each.
-
-Context:
-- Company: {company}
-- Industry: {industry}
-- Audience: {audience}
-    """.strip()
+if run or fresh:
+    prompt = prompts.pr_angles(co, timing)
 
     with st.spinner("Thinking like a PR desk…"):
         try:
-            out = llm_copy(prompt)
+            # Template prompt built only from the profile and the timing pick: near-identical reuse is safe.
+            out = llm_copy(prompt, task="pr_angles", cache_scope=f"pr_angles|{timing}", semantic=True,
+                           use_cache=not fresh)
         except Exception:
             out = "Could not generate insights right now. Try again."
 
@@ -69,13 +64,9 @@ Context:
         )
 
     # History
-    try:
-        history.add(
-            kind="pr_intel",
-            title=f"PR Insights — {timing}",
-            payload={"insights": out},
-            meta={"company": company, "timing": timing},
-            tags=["pr", "intel", timing],
-        )
-    except Exception:
-        pass
+    history.add(
+        "pr_intel",
+        out,
+        meta={"company": company, "timing": timing, "title": f"PR Insights — {timing}"},
+        tags=["pr", "intel", timing],
+    )
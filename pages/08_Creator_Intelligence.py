@@ -1,8 +1,8 @@
 # pages/08_Creator_Intelligence.py
 from __future__ import annotations
 import streamlit as st
-from shared import state, history
-from shared.llm import llm_copy
+from shared import state, prompts, jobs, ui, structured
+from shared.llm import check_brand, llm_json
 from shared.exports import text_to_pdf_bytes, text_to_docx_bytes
 
 st.set_page_config(page_title="Creator Intelligence", page_icon="🎬", layout="wide")
@@ -24,33 +24,55 @@ run = colA.button("Generate Hook Ideas", use_container_width=True)
 clear = colB.button("Clear Output", use_container_width=True)
 
 if clear:
-    st.experimental_rerun()
+    ui.hide_job("creator")
+
+
+def _hook_md(i: int, h: dict) -> str:
+    lines = [f"{i}. **{h['hook']}**"]
+    lines += [f"   - {label}: {h[k]}" for k, label in (("format", "Format"), ("visual", "Visual beat"), ("cta", "CTA"))
+              if h.get(k)]
+    return "\n".join(lines)
+
+
+def _generate(job, prompt: str, n_hooks: int, meta: dict, tags: list, context: str = "") -> dict:
+    # Runs on a worker thread: no st.* calls in here.
+    job.progress(0.1, "Brainstorming scroll-stoppers…")
+
+    def _arrived(i: int, item: dict) -> None:
+        job.emit(item)
+        job.progress(0.1 + 0.7 * (i + 1) / n_hooks, f"{i + 1} of {n_hooks} hooks ready…")
+
+    try:
+        # ~80 tokens per hook: more than the copy class default for long lists.
+        hooks = llm_json(prompt, structured.hooks(n_hooks), context=context, task="creator_hooks",
+                         max_tokens=max(800, 80 * n_hooks), on_item=_arrived).items
+    except Exception:
+        hooks = []
+    out = "\n".join(_hook_md(i, h) for i, h in enumerate(hooks, 1)) or "Could not generate hooks right now."
+    job.progress(0.8, "Building exports…")
+    result = {
+        "hooks": hooks,
+        "out": out,
+        "docx": text_to_docx_bytes(out, title="Creator Intelligence — Hooks"),
+        "pdf": text_to_pdf_bytes(out, title="Creator Intelligence — Hooks"),
+    }
+    job.record("creator", out, meta=meta, tags=tags)
+    return result
 
-if run:
-    prompt = f"""
-You are a social content strategist.
-Generate {n_hooks} high-performing short-video hooks for {platform} in the niche "{niche}".
-Each hook should include:
-- Hook line
-- Suggested format (e.g., talking head, street vox-pop, B-roll with captions)
-- Visual beat (what appears on screen)
-- Ending CTA line (target CTA: {cta})
-Return numbered items.
-    """.strip()
-
-    with st.spinner("Brainstorming scroll-stoppers…"):
-        try:
-            out = llm_copy(prompt)
-        except Exception:
-            out = "Could not generate hooks right now."
-
-    st.markdown(out)
 
+def _show_hooks(hooks: list) -> None:
+    st.markdown("\n".join(_hook_md(i, h) for i, h in enumerate(hooks, 1)))
+
+
+def _render(job) -> None:
+    res = job.result
+    st.markdown(res["out"])
+    check_brand(res["out"])
     c1, c2 = st.columns(2)
     with c1:
         st.download_button(
             "Download (.docx)",
-            data=text_to_docx_bytes(out, title="Creator Intelligence — Hooks"),
+            data=res["docx"],
             file_name="creator_intelligence_hooks.docx",
             mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
             use_container_width=True,
@@ -58,19 +80,25 @@ Return numbered items.
     with c2:
         st.download_button(
             "Download (.pdf)",
-            data=text_to_pdf_bytes(out, title="Creator Intelligence — Hooks"),
+            data=res["pdf"],
             file_name="creator_intelligence_hooks.pdf",
             mime="application/pdf",
             use_container_width=True,
         )
 
-    try:
-        history.add(
-            kind="creator",
-            title=f"{platform} hooks x{n_hooks}",
-            payload={"hooks": out},
-            meta={"platform": platform, "niche": niche, "cta": cta},
-            tags=["creator", platform.lower(), niche],
-        )
-    except Exception:
-        pass
+
+if run:
+    # Returns immediately; the job keeps running if the user leaves the page
+    # and its result is added to history either way.
+    jobs.submit(
+        "creator",
+        _generate,
+        prompts.creator_hooks(co, platform, niche, cta, n_hooks),
+        n_hooks,
+        {"platform": platform, "niche": niche, "cta": cta},
+        ["creator", platform.lower(), niche],
+        context=state.company_version().context,
+        label=f"{platform} hooks x{n_hooks}",
+    )
+
+ui.job_panel("creator", _render, render_partial=_show_hooks)
@@ -1,47 +1,301 @@
 # pages/09_Media_Monitor.py
 from __future__ import annotations
+import time
+from datetime import date, datetime, timedelta
 import streamlit as st
-from shared import state, history
+from shared import state, history, tagging, tracing
+from shared.matcher import compile_keywords, DEFAULT_FIELDS
+from shared.dedupe import cluster_stories
+from shared.media_store import get_store, DEFAULT_INTERVAL_S, ORDERS
+from shared.feed_poller import ensure_poller
+from shared import media_trends
 
 st.set_page_config(page_title="Media Monitor", page_icon="📰", layout="wide")
 st.title("📰 Media Monitor (v1)")
-st.caption("Paste RSS/Atom feed URLs; filter by keywords. (Lightweight local demo.)")
+st.caption("Feeds are polled in the background; this page only reads the local item store and archive.")
 
 state.init()
+store = get_store()
+poller = ensure_poller(store)
 
-urls = st.text_area(
-    "Feed URLs (one per line)",
-    value="https://news.google.com/rss",
-    height=100,
-)
-keywords = st.text_input("Filter keywords (comma-separated)", value="")
-limit = st.slider("Max items per feed", 1, 50, 10)
+# Entity tags follow the last saved profile plus the competitor list below. The
+# store is shared by every session, so the archive is only re-tagged on an
+# explicit save here or on Company Profile, never on a page load.
+competitors = store.get_meta("competitors", "") or ""
+profile = state.company_version().data
+entity_dict = store.entity_dict()  # what stored items are actually tagged with
+tagged_for = entity_dict.names(tagging.COMPANY)
+if profile.get("name") and tagged_for != [profile["name"]]:
+    c1, c2 = st.columns([3, 1])
+    c1.info(f"Company tags are for {', '.join(tagged_for) or 'no company'}, not {profile['name']}.")
+    if c2.button(f"Tag for {profile['name']}", use_container_width=True):
+        with tracing.span("media.retag"):
+            retagged = store.retag_for(profile, competitors)
+        st.toast(f"Re-tagged {retagged:,} stored items for {profile['name']}.")
+        st.rerun()
 
-if st.button("Fetch", use_container_width=True):
-    try:
-        import feedparser  # optional, local only
-    except Exception:
-        st.warning("Install `feedparser` in requirements.txt for live parsing. Showing placeholder.")
-        st.write("- Example Item 1: Placeholder because `feedparser` not installed.")
-        st.write("- Example Item 2: Placeholder because `feedparser` not installed.")
+# "New since last visit": the mark is per workspace (`?ws=`), or per session when
+# state is session-only. Read once per session so reruns keep the same "new" set;
+# it only advances after the new view has actually been shown (end of Live tab).
+_VISIT_KEY = f"last_visit:{state.workspace_id()}" if state.workspace_id() else ""
+if "mm_last_visit" not in st.session_state:
+    st.session_state["mm_last_visit"] = float(store.get_meta(_VISIT_KEY, "0") or 0) if _VISIT_KEY else 0.0
+
+
+def _fmt_ts(ts: float | None) -> str:
+    if not ts:
+        return "—"
+    return datetime.fromtimestamp(float(ts)).strftime("%Y-%m-%d %H:%M")
+
+
+# -----------------------------------------------------------------------------
+# Feed configuration (persisted; the poller picks changes up on wake)
+# -----------------------------------------------------------------------------
+feeds = store.feeds()
+with st.expander("Monitored feeds", expanded=not feeds):
+    urls = st.text_area(
+        "Feed URLs (one per line)",
+        value="\n".join(f["url"] for f in feeds) or "https://news.google.com/rss",
+        height=100,
+    )
+    monitor_kws = st.text_input(
+        "Monitored keywords (comma-separated; tagged on ingest)",
+        value=(feeds[0]["keywords"] if feeds else ""),
+        help='Use "quoted phrases" for multi-word terms and a leading - to exclude (e.g. -layoffs).',
+    )
+    competitors_in = st.text_input(
+        "Competitors (comma-separated; tagged on ingest)",
+        value=competitors,
+        help="Use | for aliases of one competitor, e.g. Globex | Globex Corp, Initech. "
+             "Your company is taken from the active profile.",
+    )
+    interval_min = st.number_input(
+        "Poll every (minutes)", 1, 24 * 60,
+        int((feeds[0]["interval_s"] if feeds else DEFAULT_INTERVAL_S) // 60),
+    )
+    a, b = st.columns(2)
+    with a:
+        if st.button("💾 Save feeds", use_container_width=True):
+            wanted = [u.strip() for u in urls.splitlines() if u.strip()]
+            for f in feeds:
+                if f["url"] not in wanted:
+                    store.remove_feed(f["url"])
+            for u in wanted:
+                store.upsert_feed(u, interval_s=int(interval_min) * 60, keywords=monitor_kws)
+            store.set_meta("competitors", competitors_in.strip())
+            with tracing.span("media.retag"):
+                retagged = store.retag_for(profile, competitors_in.strip())
+            if retagged:
+                st.toast(f"Re-tagged {retagged:,} stored items for the current company and competitors.")
+            store.request_poll()
+            poller.wake()
+            history.add(
+                "media_monitor",
+                "\n".join(wanted),
+                meta={"keywords": monitor_kws, "competitors": competitors_in.strip(), "interval_min": int(interval_min)},
+                tags=["media-monitor"],
+            )
+            st.success("Feeds saved — polling in the background.")
+            st.rerun()
+    with b:
+        if st.button("🔄 Refresh now", use_container_width=True, disabled=not feeds):
+            store.request_poll()
+            poller.wake()
+            st.toast("Refresh queued.")
+
+    for f in feeds:
+        err = f" · ⚠️ {f['last_error']}" if f.get("last_error") else ""
+        st.caption(f"{f['url']} — last polled {_fmt_ts(f['last_polled'])}, next {_fmt_ts(f['next_due'])}{err}")
+    if not entity_dict.empty:
+        st.caption("Tagging mentions of: " + "; ".join(
+            f"{e.name} ({e.kind}: {', '.join(e.aliases)})" for e in entity_dict.entities))
+
+tab_live, tab_trends, tab_archive = st.tabs(["Live", "Trends", "Archive search"])
+
+
+_MOOD = {tagging.POSITIVE: "🟢", tagging.NEUTRAL: "⚪", tagging.NEGATIVE: "🔴"}
+
+
+def _line(r, extra: str = "", hits=None) -> str:
+    hits = hits or r.get("keywords") or []
+    suffix = f"  \n  _matched: {', '.join(hits)}_" if hits else ""
+    if r.get("entities"):
+        suffix += f"  \n  _mentions: {', '.join(name for name, _ in r['entities'])}_"
+    title = f"[{r['title']}]({r['link']})" if r.get("link") else r["title"]
+    mood = f"{_MOOD[r['label']]} " if r.get("label") in _MOOD else ""
+    return f"- {mood}**{title}** · {_fmt_ts(r['published'])}{extra}{suffix}"
+
+
+# -----------------------------------------------------------------------------
+# Live view (store queries only — no network I/O here)
+# -----------------------------------------------------------------------------
+with tab_live:
+    c1, c2, c3 = st.columns([1, 1, 1])
+    with c1:
+        view = st.radio("Show", ["All", "New since last visit"])
+    with c2:
+        window = st.selectbox("Published", ["Last 24h", "Last 7 days", "Last 30 days", "Any time"], index=1)
+    with c3:
+        limit = st.slider("Max items", 10, 500, 100, step=10)
+
+    stored_kws = store.keywords()
+    k1, k2 = st.columns([1, 2])
+    with k1:
+        kw_pick = st.selectbox("Monitored keyword", ["(any)"] + stored_kws)
+    with k2:
+        keywords = st.text_input(
+            "Refine (comma-separated)",
+            value="",
+            help='Use "quoted phrases" for multi-word terms and a leading - to exclude (e.g. -layoffs).',
+        )
+    mentions = {"(any)": {}, "Our company": {"mention": tagging.COMPANY},
+                "Any competitor": {"mention": tagging.COMPETITOR}}
+    mentions.update({name: {"entity": name} for name in entity_dict.names(tagging.COMPETITOR)})
+    s1, s2, s3 = st.columns(3)
+    with s1:
+        mention_pick = st.selectbox("Mentions", list(mentions))
+    with s2:
+        mood_pick = st.selectbox("Sentiment", ["(any)", *tagging.LABELS], format_func=str.capitalize)
+    with s3:
+        order = st.selectbox("Sort by", list(ORDERS), format_func=str.capitalize)
+    d1, d2, d3 = st.columns([1, 2, 1])
+    with d1:
+        whole_words = st.checkbox("Whole words only", value=True)
+    with d2:
+        fields = st.multiselect("Match in", list(DEFAULT_FIELDS[:2]), default=list(DEFAULT_FIELDS[:2]))
+    with d3:
+        group = st.checkbox("Group duplicate stories", value=True)
+
+    windows = {"Last 24h": 86400, "Last 7 days": 7 * 86400, "Last 30 days": 30 * 86400}
+    queried_at = time.time()
+    since = queried_at - windows[window] if window in windows else None
+    with tracing.span("media.feed_query", limit=int(limit)) as sp:
+        rows = store.query(
+            since=since,
+            keyword=None if kw_pick == "(any)" else kw_pick,
+            fetched_since=st.session_state["mm_last_visit"] if view == "New since last visit" else None,
+            matched_only=any(f["keywords"].strip() for f in feeds),
+            sentiment=None if mood_pick == "(any)" else mood_pick,
+            order=order,
+            limit=int(limit),
+            **mentions[mention_pick],
+        )
+
+        matcher = compile_keywords(keywords, whole_words=whole_words, fields=fields or DEFAULT_FIELDS[:2])
+        hits_by_key = {}
+        if not matcher.empty:
+            kept = []
+            for r in rows:
+                hits = matcher.match(r)
+                if hits is not None:
+                    hits_by_key[r["key"]] = hits
+                    kept.append(r)
+            rows = kept
+        sp.set(rows=len(rows))
+
+    mix = " · ".join(f"{_MOOD[lb]} {sum(r.get('label') == lb for r in rows)}" for lb in tagging.LABELS)
+    st.caption(f"{store.count()} items stored · last poll cycle {_fmt_ts(poller.last_cycle)}"
+               + (f" · this view: {mix}" if rows else ""))
+    if not rows:
+        st.info("No items yet for this view. Add feeds above; new items appear as the poller ingests them.")
+    elif group:
+        with tracing.span("media.cluster", rows=len(rows)):
+            clusters = cluster_stories(rows, source_of=lambda r: r.get("source") or r.get("feed", ""))
+        st.caption(f"{len(rows)} items → {len(clusters)} stories")
+        for c in clusters:
+            extra = f" · {c.source_count} sources ({', '.join(c.sources[:5])})" if c.source_count > 1 else ""
+            st.markdown(_line(c.entry, extra, hits_by_key.get(c.entry["key"])))
+    else:
+        for r in rows:
+            st.markdown(_line(r, f" · {r.get('source') or r['feed']}", hits_by_key.get(r["key"])))
+    if view == "New since last visit" and _VISIT_KEY:
+        # Rendered: the next session's "new" starts from this query, never moving backwards.
+        if queried_at > float(store.get_meta(_VISIT_KEY, "0") or 0):
+            store.set_meta(_VISIT_KEY, str(queried_at))
+
+# -----------------------------------------------------------------------------
+# Trends (reads the precomputed hourly/daily buckets maintained on ingest)
+# -----------------------------------------------------------------------------
+with tab_trends:
+    t1, t2, t3 = st.columns(3)
+    with t1:
+        res = st.radio("Resolution", ["hour", "day"], horizontal=True, format_func=str.capitalize)
+    with t2:
+        dim = st.radio("By", [media_trends.DIM_KEYWORD, media_trends.DIM_OUTLET], horizontal=True,
+                       format_func=lambda d: d.capitalize() + "s")
+    with t3:
+        span = st.slider("Buckets shown", 12, 120, 48 if res == "hour" else 30)
+
+    now = time.time()
+    last_b = media_trends.bucket_of(now, res)
+    baseline = media_trends.DEFAULT_BASELINE[res]
+    first_b = last_b - max(span, baseline + 1) + 1
+    with tracing.span("media.trend_series", res=res, dim=dim):
+        series = store.trend_series(dim, res, first_b)
+    if not series:
+        st.info("No counts yet. Trends fill in as the poller ingests items.")
     else:
-        kws = [k.strip().lower() for k in keywords.split(",") if k.strip()]
-        for u in [u.strip() for u in urls.splitlines() if u.strip()]:
-            d = feedparser.parse(u)
-            st.subheader(u)
-            shown = 0
-            for e in d.entries:
-                title = e.get("title","")
-                if kws and not any(k in title.lower() for k in kws):
-                    continue
-                st.markdown(f"- **{title}**")
-                shown += 1
-                if shown >= limit:
-                    break
-    history.add(
-        tool="Media Monitor",
-        payload={"urls": urls, "keywords": keywords, "limit": limit},
-        output="ok",
-        tags=["media-monitor"],
-        meta={},
+        import pandas as pd
+
+        with tracing.span("dataframe.trend_table", series=len(series)):
+            table = pd.DataFrame(media_trends.series_table(series, res, last_b - span + 1, last_b))
+            table["bucket"] = pd.to_datetime(table["bucket"], unit="s")
+        st.line_chart(table.set_index("bucket"))
+
+        st.markdown(f"**Spike score** — current {res} vs. the previous {baseline}")
+        st.dataframe(
+            [
+                {dim: sp.key, "current": sp.current, "baseline avg": round(sp.baseline_mean, 1), "z-score": sp.score}
+                for sp in media_trends.spikes(series, res, now, baseline=baseline)
+            ],
+            use_container_width=True,
+            hide_index=True,
+        )
+
+# -----------------------------------------------------------------------------
+# Archive search (FTS5 over everything ever ingested)
+# -----------------------------------------------------------------------------
+with tab_archive:
+    q = st.text_input(
+        "Search archived coverage",
+        value="",
+        placeholder='acme "robohub 2.0" launch*',
+        help='Words are AND-ed; use "quotes" for phrases, OR between terms, and word* for prefixes.',
     )
+    today = date.today()
+    a1, a2, a3 = st.columns([2, 1, 1])
+    with a1:
+        rng = st.date_input("Published between", value=(today - timedelta(days=90), today))
+    with a2:
+        outlet = st.selectbox("Outlet", ["(all)"] + store.sources())
+    with a3:
+        n_results = st.slider("Results", 10, 200, 50, step=10)
+
+    start, end = (rng if isinstance(rng, (list, tuple)) and len(rng) == 2 else (rng, rng))
+    a_since = datetime.combine(start, datetime.min.time()).timestamp() if start else None
+    a_until = datetime.combine(end + timedelta(days=1), datetime.min.time()).timestamp() if end else None
+    a_source = None if outlet == "(all)" else outlet
+
+    try:
+        with tracing.span("media.search", limit=int(n_results)):
+            total = store.count_matches(q, since=a_since, until=a_until, source=a_source)
+            results = store.search(q, since=a_since, until=a_until, source=a_source, limit=int(n_results))
+            by_source = store.counts_by_source(q, since=a_since, until=a_until)
+            by_day = store.counts_by_day(q, since=a_since, until=a_until)
+    except Exception as e:
+        st.error(f"Search failed: {e}")
+        total, results, by_source, by_day = 0, [], [], []
+
+    st.metric("Matching items", f"{total:,}")
+    m1, m2 = st.columns(2)
+    with m1:
+        st.markdown("**By outlet**")
+        if by_source:
+            st.bar_chart({r["source"] or "—": r["items"] for r in by_source})
+    with m2:
+        st.markdown("**By day**")
+        if by_day:
+            st.bar_chart({r["day"]: r["items"] for r in by_day})
+
+    for r in results:
+        st.markdown(_line(r, f" · {r.get('source') or r['feed']}"))
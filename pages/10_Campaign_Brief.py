@@ -14,6 +14,8 @@ except Exception:  # pragma: no cover
     state = None  # fallback later
 
 st.set_page_config(page_title="Campaign Brief", page_icon="🗂️", layout="wide")
+if state is not None:
+    state.init()
 
 # ---------- Lightweight helpers (no patches to other files) ------------------
 
@@ -0,0 +1,76 @@
+# pages/11_Performance_Analytics.py
+from __future__ import annotations
+from datetime import timedelta
+from pathlib import Path
+import streamlit as st
+from shared import state
+from shared.analytics import get_engine, RESOLUTIONS
+
+st.set_page_config(page_title="Performance Analytics", page_icon="📈", layout="wide")
+st.title("📈 Performance Analytics")
+st.caption("CTR, engagement and trends by channel, post type and period — from incremental rollups of your dataset.")
+
+state.init()
+
+# Datasets: the sample plus anything saved via Admin Settings → Dataset tools.
+candidates = [Path("data/sample_dataset.csv")] + sorted(Path("data/uploads").glob("*.csv"))
+candidates = [p for p in candidates if p.exists()]
+if not candidates:
+    st.info("No dataset found. Upload one in **Admin Settings → Dataset tools**.")
+    st.stop()
+
+path = st.selectbox("Dataset", candidates, format_func=lambda p: str(p))
+with st.spinner("Updating rollups…"):
+    eng = get_engine(path)
+st.caption(f"{eng.rows:,} rows rolled up into {len(eng.rollup):,} daily buckets.")
+
+if eng.rollup.empty:
+    st.info("Dataset has no dated rows yet.")
+    st.stop()
+
+first_day = eng.rollup["day"].min().date()
+last_day = eng.rollup["day"].max().date()
+c1, c2, c3 = st.columns([2, 1, 1])
+with c1:
+    rng = st.date_input("Period", value=(first_day, last_day), min_value=first_day, max_value=last_day)
+with c2:
+    res = st.selectbox("Time bucket", list(RESOLUTIONS), index=1, format_func=str.capitalize)
+with c3:
+    metric = st.selectbox("Trend metric", ["ctr", "engagement_rate", "clicks", "impressions"],
+                          format_func=lambda m: {"ctr": "CTR", "engagement_rate": "Engagement rate"}.get(m, m.capitalize()))
+
+start, end = (rng if isinstance(rng, (list, tuple)) and len(rng) == 2 else (rng, rng))
+since, until = start, (end or last_day) + timedelta(days=1)
+
+total = eng.summary(by=(), since=since, until=until).iloc[0]
+m1, m2, m3, m4 = st.columns(4)
+m1.metric("Posts", f"{int(total['posts']):,}")
+m2.metric("Impressions", f"{int(total['impressions']):,}")
+m3.metric("CTR", f"{total['ctr']:.2%}")
+m4.metric("Engagement rate", f"{total['engagement_rate']:.2%}")
+
+st.subheader("By channel")
+by_channel = eng.summary(by=("channel",), since=since, until=until)
+st.dataframe(
+    by_channel,
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "ctr": st.column_config.NumberColumn("CTR", format="percent"),
+        "engagement_rate": st.column_config.NumberColumn("Engagement rate", format="percent"),
+    },
+)
+
+st.subheader(f"Trend by channel ({res})")
+st.line_chart(eng.trend(by="channel", res=res, metric=metric, since=since, until=until))
+
+st.subheader("By channel × post type")
+st.dataframe(
+    eng.summary(by=("channel", "post_type"), since=since, until=until),
+    use_container_width=True,
+    hide_index=True,
+    column_config={
+        "ctr": st.column_config.NumberColumn("CTR", format="percent"),
+        "engagement_rate": st.column_config.NumberColumn("Engagement rate", format="percent"),
+    },
+)
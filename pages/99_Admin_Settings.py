@@ -1,8 +1,10 @@
 # pages/99_Admin_Settings.py
 from __future__ import annotations
 import streamlit as st
-import io, pandas as pd
-from shared import ui, state, history
+import shutil
+import time
+from pathlib import Path
+from shared import ui, state, history, memprof, jobs, router, tracing, prefetch
 
 ui.page_title("Admin & Settings", "Keys, dataset utilities, and maintenance.")
 state.init()
@@ -12,16 +14,74 @@ st.subheader("OpenAI")
 st.write(f"Connected: {'✅' if state.has_openai() else '❌ (offline templates)'}")
 st.caption("Keys live in Streamlit secrets, not in code.")
 
+# Model routing
+st.subheader("Model routing")
+rt = router.get_router()
+st.dataframe(
+    [{"class": tc.name, "models (preferred first)": " → ".join(tc.models), "max_tokens": tc.max_tokens,
+      "SLO p95 (s)": tc.slo, "routes to now": (r := rt.route("", tc.name)).model, "why": r.reason}
+     for tc in router.CLASSES.values()],
+    use_container_width=True,
+    hide_index=True,
+)
+usage = rt.summary()
+if usage:
+    st.caption(f"Last {len(rt.recent)} calls · spend ${sum(u['cost_usd'] for u in usage):.4f} "
+               f"(list prices) · audit log: `{rt.log_path or 'off'}`")
+    st.dataframe(usage, use_container_width=True, hide_index=True)
+    with st.expander("Recent routing decisions"):
+        st.dataframe(
+            [{k: d.get(k) for k in ("task", "task_class", "model", "reason", "latency_s", "completion_tokens",
+                                    "cost_usd", "error")} for d in reversed(list(rt.recent)[-50:])],
+            use_container_width=True,
+            hide_index=True,
+        )
+else:
+    st.caption("No routed calls recorded yet. SLOs: PRESENCE_LLM_SLO_<CLASS> (seconds).")
+
 # Dataset tools (optional; safe no-ops if not present)
 st.subheader("Dataset tools (optional)")
 with st.expander("Upload a CSV to preview (session only)"):
     uploaded = st.file_uploader("CSV", type=["csv"])
     if uploaded:
+        from shared import datasets  # pandas/pyarrow load only once a file is uploaded
+
         try:
-            df = pd.read_csv(io.BytesIO(uploaded.getvalue()))
-            st.dataframe(df.head(50), use_container_width=True)
+            # Parse only the rows the preview shows; the full file is never loaded at once.
+            st.dataframe(datasets.preview_csv(uploaded, n=50), use_container_width=True)
+            schema = datasets.infer_schema(uploaded)
+            st.caption("Schema (known columns + sample inference): "
+                       + ", ".join(f"`{c}`: {t}" for c, t in schema.items()))
         except Exception as e:
             st.error(f"Failed: {e}")
+            schema = None
+
+        c1, c2 = st.columns(2)
+        with c1:
+            if schema and st.button("Scan full file (rows & column stats)", use_container_width=True):
+                with st.spinner("Scanning in chunks…"):
+                    stats = datasets.scan_csv_stats(uploaded, schema=schema)
+                st.write(f"Rows: **{stats['rows']:,}**")
+                st.dataframe(
+                    [
+                        {"column": c, **{k: (str(v) if k in ("min", "max") else v) for k, v in info.items()}}
+                        for c, info in stats["columns"].items()
+                    ],
+                    use_container_width=True,
+                    hide_index=True,
+                )
+        with c2:
+            dest = Path("data") / "uploads" / Path(uploaded.name).name
+            if schema and st.button("Save to data/uploads + convert to Arrow (background)", use_container_width=True):
+                dest.parent.mkdir(parents=True, exist_ok=True)
+                uploaded.seek(0)
+                with open(dest, "wb") as fh:
+                    shutil.copyfileobj(uploaded, fh, length=1 << 20)
+                datasets.convert_in_background(dest)
+            job = datasets.conversion_status(dest)
+            if job:
+                msg = {"running": "Converting…", "done": f"Ready: `{datasets.sidecar_path(dest)}`"}
+                st.caption(msg.get(job["status"], f"Conversion failed: {job['error']}"))
 
 # History maintenance
 st.subheader("History maintenance")
@@ -30,7 +90,107 @@ with c1:
     st.write(f"Items in history: **{len(history.get_history())}**")
 with c2:
     if st.button("Clear history", type="primary"):
-        st.session_state["history"] = []
+        history.clear()
         st.success("History cleared.")
 
+# Shared state backend
+st.subheader("State backend")
+buf = state.buffer()
+if buf is None:
+    st.caption("Session-only (PRESENCE_STATE_URL=none): state lives in this server process.")
+else:
+    reachable = buf.backend.ping()
+    st.write(f"`{buf.backend.url}` · {'✅ reachable' if reachable else '❌ unreachable'} · "
+             f"workspace `{state.workspace_id() or '—'}`")
+    st.caption(f"Batched flushes: {buf.flushes} · failed: {buf.errors}"
+               + (f" · last error: {buf.last_error}" if buf.last_error else "")
+               + " · set PRESENCE_STATE_URL to sqlite:///…, redis://… or none.")
+
+# Tracing & profiling
+st.subheader("Tracing & profiling")
+tr = tracing.get_tracer()
+st.caption(f"Spans go to `{tr.path or 'memory only'}` (PRESENCE_TRACE_PATH), one JSON object per span; "
+           "spans of one rerun share a `trace` id.")
+reruns = tr.reruns()
+if reruns:
+    st.dataframe(reruns, use_container_width=True, hide_index=True)
+    with st.expander("Stages across recent spans"):
+        st.dataframe(tr.summary(), use_container_width=True, hide_index=True)
+else:
+    st.caption("No reruns traced yet.")
+
+prof = tracing.get_profiler()
+page_names = ["app"] + sorted(p.stem for p in Path(__file__).parent.glob("*.py"))
+p1, p2, p3 = st.columns([2, 1, 1])
+with p1:
+    target = st.selectbox("Profile page", page_names)
+with p2:
+    n_runs = st.number_input("Next N reruns", min_value=1, max_value=20, value=3)
+with p3:
+    if st.button("Capture with cProfile", use_container_width=True):
+        prof.request(target, int(n_runs))
+if prof.pending:
+    st.caption("Waiting for: " + ", ".join(f"`{p}` ×{n}" for p, n in prof.pending.items())
+               + " — open the page (any session) to capture.")
+for cap in reversed(prof.captures):
+    with st.expander(f"{cap['page']} · {time.strftime('%H:%M:%S', time.localtime(cap['ts']))} · {cap['ms']:.0f} ms"):
+        st.dataframe(cap["top"], use_container_width=True, hide_index=True)
+        d1, d2 = st.columns(2)
+        for col, kind, hint in ((d1, "prof", "snakeviz / pstats"), (d2, "folded", "flamegraph.pl / speedscope")):
+            f = Path(cap[kind])
+            if f.exists():
+                col.download_button(f".{kind} ({hint})", data=f.read_bytes(), file_name=f.name,
+                                    key=f"dl_{f.name}", use_container_width=True)
+
+# Background jobs
+st.subheader("Background jobs")
+js = jobs.get_manager().stats()
+st.caption(f"Workers: {jobs.MAX_WORKERS} (PRESENCE_JOB_WORKERS) · "
+           + " · ".join(f"{k}: {v}" for k, v in js.items()))
+pb = prefetch.get_budget()
+st.caption(f"Profile-save prefetch: ${pb.spent:.4f} of ${pb.limit:.2f} estimated spend today "
+           f"(PRESENCE_PREFETCH_BUDGET_USD) · on by default: {'yes' if prefetch.ENABLED_DEFAULT else 'no'} "
+           "(PRESENCE_PREFETCH=1).")
+
+# Session memory
+st.subheader("Session memory")
+reg = memprof.get_registry()
+mine = memprof.sample(force=True)
+sessions = reg.sessions()
+m1, m2, m3 = st.columns(3)
+m1.metric("This session", memprof.fmt_bytes(mine.total))
+m2.metric("Live sessions", len(sessions))
+m3.metric("All sessions", memprof.fmt_bytes(sum(s.total for s in sessions)))
+
+heavy = reg.over_threshold()
+if heavy:
+    st.warning(
+        f"{len(heavy)} session(s) above {memprof.fmt_bytes(memprof.ALERT_BYTES)}: "
+        + ", ".join(f"`{s.session[:8]}` {memprof.fmt_bytes(s.total)}" for s in heavy[:5])
+    )
+
+t1, t2, t3 = st.tabs(["This session", "Top keys (all sessions)", "Trend"])
+with t1:
+    st.dataframe(
+        [{"key": k, "size": memprof.fmt_bytes(n), "bytes": n}
+         for k, n in sorted(mine.sizes.items(), key=lambda kv: kv[1], reverse=True)],
+        use_container_width=True,
+        hide_index=True,
+    )
+with t2:
+    st.dataframe(
+        [{"key": a["key"], "total": memprof.fmt_bytes(a["total_bytes"]), "max/session": memprof.fmt_bytes(a["max_bytes"]),
+          "sessions": a["sessions"]} for a in reg.by_key()[:25]],
+        use_container_width=True,
+        hide_index=True,
+    )
+    st.caption(f"Sessions are re-measured at most every {memprof.SAMPLE_INTERVAL_S:.0f}s when they run a page; "
+               f"idle ones drop out after {memprof.SESSION_TTL_S // 3600}h.")
+with t3:
+    trend = reg.trend()
+    if len(trend) < 2:
+        st.caption("Not enough samples yet (one point per minute).")
+    else:
+        st.line_chart({"MB": [b / (1024 * 1024) for _, b, _ in trend]})
+
 st.caption("Presence — multi-page prototype (Phase 3 Stabilize Pack)")
@@ -0,0 +1,264 @@
+# shared/analytics.py
+from __future__ import annotations
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import pandas as pd
+
+from .datasets import DEFAULT_CHUNKSIZE, iter_csv_chunks
+from .tracing import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except Exception:  # rollups stay in memory only
+    pa = None
+    pa_ipc = None
+
+DIMENSIONS = ("channel", "post_type")
+MEASURES = ("posts", "clicks", "impressions", "engagements")
+# Query-time time buckets, derived from the stored daily rollup.
+RESOLUTIONS: Dict[str, str] = {"day": "D", "week": "W-MON", "month": "MS"}
+
+ROLLUP_SUFFIX = ".rollup.arrow"
+_HEAD_BYTES = 4096  # size of the consumed-prefix fingerprints: first block and last block
+
+
+def rollup_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Reduce raw rows to the daily grain: one row per (day, channel, post_type)
+    with summed posts/clicks/impressions/engagements. Engagements are
+    reconstructed as engagement_rate * impressions so rates can be re-derived
+    exactly at any coarser grain.
+    """
+    if df.empty or "date" not in df.columns:
+        return _empty_rollup()
+    impressions = _num(df, "impressions")
+    rate = _num(df, "engagement_rate")
+    frame = pd.DataFrame({
+        "day": pd.to_datetime(df["date"], errors="coerce").dt.floor("D"),
+        "channel": _dim(df, "channel"),
+        "post_type": _dim(df, "post_type"),
+        "posts": 1,
+        "clicks": _num(df, "clicks"),
+        "impressions": impressions,
+        "engagements": rate * impressions,
+    })
+    frame = frame.dropna(subset=["day"])
+    return frame.groupby(["day", *DIMENSIONS], observed=True, sort=False).sum().reset_index()
+
+
+def _num(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series(0.0, index=df.index)
+    return pd.to_numeric(df[col], errors="coerce").astype("float64").fillna(0.0)
+
+
+def _dim(df: pd.DataFrame, col: str) -> pd.Series:
+    if col not in df.columns:
+        return pd.Series("—", index=df.index, dtype="string")
+    return df[col].astype("string").fillna("—")
+
+
+def _empty_rollup() -> pd.DataFrame:
+    return pd.DataFrame({
+        "day": pd.Series(dtype="datetime64[ns]"),
+        "channel": pd.Series(dtype="string"),
+        "post_type": pd.Series(dtype="string"),
+        **{m: pd.Series(dtype="float64") for m in MEASURES},
+    })
+
+
+def merge_rollups(a: pd.DataFrame, b: pd.DataFrame) -> pd.DataFrame:
+    """Fold rollup `b` into `a` (both at the daily grain)."""
+    if a.empty:
+        return b.reset_index(drop=True)
+    if b.empty:
+        return a
+    both = pd.concat([a, b], ignore_index=True)
+    return both.groupby(["day", *DIMENSIONS], observed=True, sort=False).sum().reset_index()
+
+
+def with_rates(df: pd.DataFrame) -> pd.DataFrame:
+    """Add CTR and engagement rate (impression-weighted) to summed measures."""
+    df = df.copy()
+    imp = df["impressions"].where(df["impressions"] > 0)
+    df["ctr"] = (df["clicks"] / imp).fillna(0.0)
+    df["engagement_rate"] = (df["engagements"] / imp).fillna(0.0)
+    return df
+
+
+class PerformanceEngine:
+    """
+    Incremental channel-performance rollups over one dataset CSV.
+
+    The CSV is scanned once in chunks into a daily rollup; afterwards `refresh()`
+    reads only the bytes appended since the last pass. The rollup is persisted
+    next to the CSV (`<file>.rollup.arrow`) with the byte offset it covers, so a
+    restarted process resumes instead of rescanning. Queries aggregate the
+    rollup, not the raw rows, so they stay interactive at any file size.
+    """
+
+    def __init__(self, path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE):
+        self.path = Path(path).resolve()
+        self.chunksize = chunksize
+        self.rollup = _empty_rollup()
+        self.offset = 0
+        self.rows = 0
+        self._head = ""
+        self._tail = ""
+        self._names: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._load_persisted()
+
+    # ---- ingestion -----------------------------------------------------------
+
+    def _head_hash(self, n: int) -> str:
+        # Fingerprint of the already-consumed prefix; appends never change it.
+        with open(self.path, "rb") as fh:
+            return hashlib.sha1(fh.read(min(n, _HEAD_BYTES))).hexdigest()
+
+    def _tail_hash(self, n: int) -> str:
+        # The block just before offset `n`: a regenerated export that keeps the
+        # header and first rows but changes later ones differs here.
+        with open(self.path, "rb") as fh:
+            fh.seek(max(0, n - _HEAD_BYTES))
+            return hashlib.sha1(fh.read(min(n, _HEAD_BYTES))).hexdigest()
+
+    def _rewritten(self, size: int) -> bool:
+        if size < self.offset:
+            return True
+        if self._head and self._head_hash(self.offset) != self._head:
+            return True
+        return bool(self._tail) and self._tail_hash(self.offset) != self._tail
+
+    @traced("dataframe.rollup_refresh")
+    def refresh(self) -> int:
+        """Fold in rows appended since the last pass (full rebuild if the file was rewritten)."""
+        with self._lock:
+            size = self.path.stat().st_size
+            if self._rewritten(size):
+                self.rollup, self.offset, self.rows, self._names = _empty_rollup(), 0, 0, None
+            if size == self.offset:
+                return 0
+            with open(self.path, "rb") as fh:
+                if self.offset:
+                    fh.seek(size - 1)
+                    if fh.read(1) != b"\n":
+                        return 0  # an appender is mid-line; pick it up next time
+                fh.seek(self.offset)
+                if self.offset == 0:
+                    chunks = iter_csv_chunks(fh, chunksize=self.chunksize)
+                else:
+                    chunks = iter_csv_chunks(fh, chunksize=self.chunksize, names=self._names)
+                added = 0
+                for chunk in chunks:
+                    if self._names is None:
+                        self._names = list(chunk.columns)
+                    added += len(chunk)
+                    self.rollup = merge_rollups(self.rollup, rollup_frame(chunk))
+            self.offset, self.rows = size, self.rows + added
+            self._head, self._tail = self._head_hash(size), self._tail_hash(size)
+            self._persist()
+            return added
+
+    def append(self, df: pd.DataFrame) -> None:
+        """Fold in-memory rows (e.g. a fresh upload) without touching the file."""
+        with self._lock:
+            self.rollup = merge_rollups(self.rollup, rollup_frame(df))
+            self.rows += len(df)
+
+    # ---- persistence ---------------------------------------------------------
+
+    def _rollup_path(self) -> Path:
+        return self.path.with_name(self.path.name + ROLLUP_SUFFIX)
+
+    def _persist(self) -> None:
+        if pa_ipc is None:
+            return
+        try:
+            table = pa.Table.from_pandas(self.rollup, preserve_index=False)
+            meta = {
+                b"offset": str(self.offset).encode(),
+                b"rows": str(self.rows).encode(),
+                b"head": self._head.encode(),
+                b"tail": self._tail.encode(),
+                b"names": ",".join(self._names or []).encode(),
+            }
+            table = table.replace_schema_metadata({**(table.schema.metadata or {}), **meta})
+            side = self._rollup_path()
+            tmp = side.with_name(side.name + ".tmp")
+            with pa.OSFile(str(tmp), "wb") as sink, pa_ipc.new_file(sink, table.schema) as w:
+                w.write_table(table)
+            tmp.replace(side)
+        except Exception:
+            pass
+
+    def _load_persisted(self) -> None:
+        side = self._rollup_path()
+        if pa_ipc is None or not side.exists():
+            return
+        try:
+            with pa.memory_map(str(side), "r") as src:
+                table = pa_ipc.open_file(src).read_all()
+            meta = table.schema.metadata or {}
+            self.rollup = table.to_pandas()
+            self.offset = int(meta.get(b"offset", b"0"))
+            self.rows = int(meta.get(b"rows", b"0"))
+            self._head = meta.get(b"head", b"").decode()
+            self._tail = meta.get(b"tail", b"").decode()
+            names = meta.get(b"names", b"").decode()
+            self._names = names.split(",") if names else None
+        except Exception:
+            self.rollup, self.offset, self.rows = _empty_rollup(), 0, 0
+
+    # ---- queries -------------------------------------------------------------
+
+    def _window(self, since=None, until=None) -> pd.DataFrame:
+        r = self.rollup
+        if since is not None:
+            r = r[r["day"] >= pd.Timestamp(since)]
+        if until is not None:
+            r = r[r["day"] < pd.Timestamp(until)]
+        return r
+
+    @traced("dataframe.summary")
+    def summary(self, by: Sequence[str] = ("channel",), since=None, until=None) -> pd.DataFrame:
+        """Totals + CTR / engagement rate per `by` group, largest impressions first."""
+        r = self._window(since, until)
+        by = [b for b in by if b in DIMENSIONS]
+        if not by:
+            out = r[list(MEASURES)].sum().to_frame().T
+        else:
+            out = r.groupby(by, observed=True)[list(MEASURES)].sum().reset_index()
+        return with_rates(out).sort_values("impressions", ascending=False, ignore_index=True)
+
+    @traced("dataframe.trend")
+    def trend(self, by: str = "channel", res: str = "week", metric: str = "ctr",
+              since=None, until=None) -> pd.DataFrame:
+        """Wide table: one row per time bucket, one column per `by` value, cell = `metric`."""
+        r = self._window(since, until)
+        if r.empty:
+            return pd.DataFrame()
+        keys = [pd.Grouper(key="day", freq=RESOLUTIONS[res])] + ([by] if by in DIMENSIONS else [])
+        g = with_rates(r.groupby(keys, observed=True)[list(MEASURES)].sum().reset_index())
+        if by not in DIMENSIONS:
+            return g.set_index("day")[[metric]]
+        return g.pivot(index="day", columns=by, values=metric).sort_index()
+
+
+_engines: Dict[str, PerformanceEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(path: str | Path) -> PerformanceEngine:
+    """Process-wide engine per dataset, refreshed (incrementally) on every call."""
+    key = str(Path(path).resolve())
+    with _engines_lock:
+        eng = _engines.get(key)
+        if eng is None:
+            eng = _engines[key] = PerformanceEngine(key)
+    eng.refresh()
+    return eng
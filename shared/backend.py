@@ -0,0 +1,500 @@
+# shared/backend.py
+"""
+Storage behind shared/state.py and shared/history.py, so any replica can
+serve any session and a restart loses nothing. Chosen by PRESENCE_STATE_URL:
+
+    sqlite:///data/state.sqlite   local file (default; fine for replicas on one host)
+    redis://127.0.0.1:6379/0      any Redis-protocol server (benchmarks/stub_redis_server.py
+                                  is a local stand-in)
+    memory://                     this process only
+    none                          st.session_state only, nothing persisted
+
+Backends speak a Redis-shaped subset (strings and append-only lists).
+Writes go through a process-wide WriteBuffer and are flushed in batches by
+one background thread.
+"""
+from __future__ import annotations
+import atexit
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+
+DEFAULT_URL = "sqlite:///" + (Path("data") / "state.sqlite").as_posix()
+FLUSH_INTERVAL_S = 0.25   # max delay before a buffered write reaches the backend
+FLUSH_MAX_OPS = 500       # flush early once this many writes are buffered
+
+
+class Backend(ABC):
+    """Redis-shaped subset the app needs; values are str (JSON encoded by the callers)."""
+
+    url = ""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]: ...
+
+    @abstractmethod
+    def set_many(self, items: Dict[str, str]) -> None: ...
+
+    @abstractmethod
+    def rpush_many(self, items: Dict[str, List[str]]) -> None: ...
+
+    @abstractmethod
+    def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[str]: ...
+
+    @abstractmethod
+    def llen(self, key: str) -> int: ...
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None: ...
+
+    def ping(self) -> bool:
+        return True
+
+    def write(self, sets: Dict[str, str], pushes: Dict[str, List[str]], token: str) -> None:
+        """
+        Apply one WriteBuffer batch. Backends that can lose the reply to an
+        applied write (network ones) apply it atomically and record `token`,
+        so `applied(token)` can tell afterwards whether it landed.
+        """
+        if sets:
+            self.set_many(sets)
+        if pushes:
+            self.rpush_many(pushes)
+
+    def applied(self, token: str) -> bool:
+        return False
+
+
+class WriteUncertain(ConnectionError):
+    """The connection dropped after a write was sent: it may or may not have been applied."""
+
+
+def _bounds(n: int, start: int, stop: int) -> Tuple[int, int]:
+    """Redis LRANGE indexes (inclusive, negatives from the end) as a Python slice."""
+    start = max(0, n + start if start < 0 else start)
+    stop = n + stop if stop < 0 else min(stop, n - 1)
+    return start, stop + 1
+
+
+class MemoryBackend(Backend):
+    url = "memory://"
+
+    def __init__(self) -> None:
+        self._kv: Dict[str, str] = {}
+        self._lists: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        return self._kv.get(key)
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        with self._lock:
+            self._kv.update(items)
+
+    def rpush_many(self, items: Dict[str, List[str]]) -> None:
+        with self._lock:
+            for k, vals in items.items():
+                self._lists.setdefault(k, []).extend(vals)
+
+    def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[str]:
+        with self._lock:
+            vals = self._lists.get(key, [])
+            a, b = _bounds(len(vals), start, stop)
+            return vals[a:b]
+
+    def llen(self, key: str) -> int:
+        return len(self._lists.get(key, ()))
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for k in keys:
+                self._kv.pop(k, None)
+                self._lists.pop(k, None)
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS kv (
+    key   TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS list_items (
+    key   TEXT NOT NULL,
+    idx   INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    PRIMARY KEY (key, idx)
+);
+"""
+
+
+class SQLiteBackend(Backend):
+    """
+    One SQLite file (WAL). Each call opens its own short-lived connection, like
+    MediaStore; several processes on one host can share the file.
+    """
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.url = "sqlite:///" + self.path.as_posix()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as c:
+            c.execute("PRAGMA journal_mode=WAL")
+            c.executescript(_SCHEMA)
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        c = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield c
+            c.commit()
+        finally:
+            c.close()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._conn() as c:
+            row = c.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        with self._conn() as c:
+            c.executemany("INSERT INTO kv(key, value) VALUES (?, ?) "
+                          "ON CONFLICT(key) DO UPDATE SET value = excluded.value", items.items())
+
+    def rpush_many(self, items: Dict[str, List[str]]) -> None:
+        with self._conn() as c:
+            c.execute("BEGIN IMMEDIATE")  # other processes append to the same lists
+            for k, vals in items.items():
+                n = c.execute("SELECT COALESCE(MAX(idx) + 1, 0) FROM list_items WHERE key = ?", (k,)).fetchone()[0]
+                c.executemany("INSERT INTO list_items(key, idx, value) VALUES (?, ?, ?)",
+                              ((k, n + i, v) for i, v in enumerate(vals)))
+
+    def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[str]:
+        with self._conn() as c:
+            if start < 0 or stop < 0:
+                n = c.execute("SELECT COUNT(*) FROM list_items WHERE key = ?", (key,)).fetchone()[0]
+                start, end = _bounds(n, start, stop)
+                stop = end - 1
+            rows = c.execute("SELECT value FROM list_items WHERE key = ? AND idx BETWEEN ? AND ? ORDER BY idx",
+                             (key, start, stop))
+            return [r[0] for r in rows]
+
+    def llen(self, key: str) -> int:
+        with self._conn() as c:
+            return c.execute("SELECT COUNT(*) FROM list_items WHERE key = ?", (key,)).fetchone()[0]
+
+    def delete(self, *keys: str) -> None:
+        with self._conn() as c:
+            for k in keys:
+                c.execute("DELETE FROM kv WHERE key = ?", (k,))
+                c.execute("DELETE FROM list_items WHERE key = ?", (k,))
+
+
+class RedisError(Exception):
+    pass
+
+
+# Per-WriteBuffer key holding the sequence number of its last applied batch.
+_FLUSH_MARK = "presence:_flush:"
+
+
+class RedisBackend(Backend):
+    """
+    Minimal RESP2 client on plain sockets (no redis package needed): one
+    connection per thread, batched writes sent as a single pipeline.
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0) -> None:
+        u = urlparse(url)
+        self.url = url
+        self.host, self.port = u.hostname or "127.0.0.1", u.port or 6379
+        self.db = int((u.path or "/0").lstrip("/") or 0)
+        self.password = u.password
+        self.timeout = timeout
+        self._local = threading.local()
+
+    # ---- wire ----------------------------------------------------------------
+
+    @staticmethod
+    def _encode(*args: object) -> bytes:
+        out = [b"*%d\r\n" % len(args)]
+        for a in args:
+            b = a if isinstance(a, bytes) else str(a).encode("utf-8")
+            out.append(b"$%d\r\n%s\r\n" % (len(b), b))
+        return b"".join(out)
+
+    def _sock(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            s = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = self._local.conn = (s, s.makefile("rb"))
+            setup = []
+            if self.password:
+                setup.append(("AUTH", self.password))
+            if self.db:
+                setup.append(("SELECT", self.db))
+            if setup:
+                self._roundtrip(setup)
+        return conn
+
+    def _read(self, fh):
+        line = fh.readline()
+        if not line:
+            raise ConnectionError("connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode("utf-8")
+        if kind == b"-":
+            return RedisError(body.decode("utf-8"))
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            n = int(body)
+            if n < 0:
+                return None
+            data = fh.read(n + 2)
+            return data[:-2].decode("utf-8")
+        if kind == b"*":
+            n = int(body)
+            return None if n < 0 else [self._read(fh) for _ in range(n)]
+        raise RedisError(f"unexpected reply {line!r}")
+
+    def _roundtrip(self, commands: List[Tuple[object, ...]], atomic: bool = False) -> list:
+        """
+        Send `commands` as one pipeline (wrapped in MULTI/EXEC when `atomic`).
+        A dropped connection is retried once, except after an atomic batch was
+        fully sent: re-sending could apply it twice, so that raises WriteUncertain.
+        """
+        if atomic:
+            commands = [("MULTI",), *commands, ("EXEC",)]
+        payload = b"".join(self._encode(*cmd) for cmd in commands)
+        for attempt in (0, 1):
+            sent = False
+            try:
+                s, fh = self._sock()
+                s.sendall(payload)
+                sent = True
+                replies = [self._read(fh) for _ in commands]
+                break
+            except (OSError, ConnectionError):
+                self._close()
+                if atomic and sent:
+                    raise WriteUncertain("connection dropped after the batch was sent")
+                if attempt:
+                    raise
+        for r in replies:
+            if isinstance(r, RedisError):
+                raise r
+        if atomic:
+            replies = replies[-1]  # EXEC: one reply per queued command
+            if replies is None:
+                raise RedisError("transaction aborted")
+            for r in replies:
+                if isinstance(r, RedisError):
+                    raise r
+        return replies
+
+    def _close(self) -> None:
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn:
+            try:
+                conn[0].close()
+            except OSError:
+                pass
+
+    # ---- commands ------------------------------------------------------------
+
+    def get(self, key: str) -> Optional[str]:
+        return self._roundtrip([("GET", key)])[0]
+
+    @staticmethod
+    def _writes(sets: Dict[str, str], pushes: Dict[str, List[str]]) -> List[Tuple[object, ...]]:
+        cmds: List[Tuple[object, ...]] = [("MSET", *[x for kv in sets.items() for x in kv])] if sets else []
+        return cmds + [("RPUSH", k, *vals) for k, vals in pushes.items() if vals]
+
+    def set_many(self, items: Dict[str, str]) -> None:
+        if items:
+            self._roundtrip(self._writes(items, {}), atomic=True)
+
+    def rpush_many(self, items: Dict[str, List[str]]) -> None:
+        cmds = self._writes({}, items)
+        if cmds:
+            self._roundtrip(cmds, atomic=True)
+
+    def write(self, sets: Dict[str, str], pushes: Dict[str, List[str]], token: str) -> None:
+        cmds = self._writes(sets, pushes)
+        if cmds:
+            owner, seq = token.rsplit(":", 1)
+            self._roundtrip([*cmds, ("SET", _FLUSH_MARK + owner, seq)], atomic=True)
+
+    def applied(self, token: str) -> bool:
+        owner, seq = token.rsplit(":", 1)
+        return self.get(_FLUSH_MARK + owner) == seq
+
+    def lrange(self, key: str, start: int = 0, stop: int = -1) -> List[str]:
+        return self._roundtrip([("LRANGE", key, start, stop)])[0] or []
+
+    def llen(self, key: str) -> int:
+        return self._roundtrip([("LLEN", key)])[0]
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self._roundtrip([("DEL", *keys)])
+
+    def ping(self) -> bool:
+        try:
+            return self._roundtrip([("PING",)])[0] == "PONG"
+        except (OSError, RedisError):
+            return False
+
+
+def from_url(url: str) -> Optional[Backend]:
+    """Backend for `url`; None for "none" (session-only state)."""
+    url = (url or "").strip()
+    if url.lower() in ("", "none", "session"):
+        return None
+    scheme = urlparse(url).scheme
+    if scheme == "memory":
+        return MemoryBackend()
+    if scheme == "sqlite":
+        # sqlite:///relative/path and sqlite:////absolute/path, as in SQLAlchemy URLs
+        return SQLiteBackend(url[len("sqlite:///"):] if url.startswith("sqlite:///") else url[len("sqlite:"):])
+    if scheme in ("redis", "rediss"):
+        if scheme == "rediss":
+            raise ValueError("TLS (rediss://) is not supported by the built-in client; use a local TLS proxy.")
+        return RedisBackend(url)
+    raise ValueError(f"Unknown PRESENCE_STATE_URL scheme {scheme!r}")
+
+
+class WriteBuffer:
+    """
+    Coalesces writes from every session of this process: `set` keeps the last
+    value per key, `rpush` appends; a daemon thread flushes every
+    FLUSH_INTERVAL_S (or at FLUSH_MAX_OPS) in one batch per backend call.
+    """
+
+    def __init__(self, backend: Backend) -> None:
+        self.backend = backend
+        self._sets: Dict[str, str] = {}
+        self._pushes: Dict[str, List[str]] = {}
+        self._ops = 0
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()  # one flush at a time keeps list order
+        self._id = uuid.uuid4().hex[:12]
+        self._seq = 0
+        # A batch whose reply was lost: (sets, pushes, token), resolved before anything newer.
+        self._unconfirmed: Optional[Tuple[Dict[str, str], Dict[str, List[str]], str]] = None
+        self.flushes = 0
+        self.errors = 0
+        self.failing = 0          # consecutive failed flushes
+        self.last_error = ""
+        self._thread = threading.Thread(target=self._loop, name="presence-state-flush", daemon=True)
+        self._thread.start()
+        atexit.register(self.flush)
+
+    def set(self, key: str, value: str) -> None:
+        with self._cond:
+            self._sets[key] = value
+            self._bump()
+
+    def rpush(self, key: str, *values: str) -> None:
+        with self._cond:
+            self._pushes.setdefault(key, []).extend(values)
+            self._bump(len(values))
+
+    def _bump(self, n: int = 1) -> None:
+        self._ops += n
+        if self._ops >= FLUSH_MAX_OPS:
+            self._cond.notify()
+
+    def discard(self, key: str) -> None:
+        """Drop buffered writes for `key` (it is being deleted)."""
+        with self._cond:
+            self._sets.pop(key, None)
+            self._pushes.pop(key, None)
+            if self._unconfirmed is not None:
+                self._unconfirmed[0].pop(key, None)
+                self._unconfirmed[1].pop(key, None)
+
+    def pending(self, key: str) -> int:
+        with self._cond:
+            n = len(self._unconfirmed[1].get(key, ())) if self._unconfirmed is not None else 0
+            return n + len(self._pushes.get(key, ()))
+
+    def _failed(self, e: Exception) -> None:
+        self.errors += 1
+        self.failing += 1
+        self.last_error = f"{type(e).__name__}: {e}"
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            if self._unconfirmed is not None:
+                # Re-send only if the batch provably did not land (RPUSH is not idempotent).
+                sets, pushes, token = self._unconfirmed
+                try:
+                    if not self.backend.applied(token):
+                        self.backend.write(sets, pushes, token)
+                    self._unconfirmed = None
+                except Exception as e:
+                    self._failed(e)
+                    return
+            with self._cond:
+                sets, pushes = self._sets, self._pushes
+                self._sets, self._pushes, self._ops = {}, {}, 0
+            if not sets and not pushes:
+                return
+            self._seq += 1
+            token = f"{self._id}:{self._seq}"
+            try:
+                self.backend.write(sets, pushes, token)
+                self.flushes += 1
+                self.failing = 0
+            except WriteUncertain as e:
+                self._failed(e)
+                self._unconfirmed = (sets, pushes, token)
+            except Exception as e:
+                # Not applied: keep the batch for the next flush (ahead of anything newer).
+                self._failed(e)
+                with self._cond:
+                    self._sets = {**sets, **self._sets}
+                    for k, vals in self._pushes.items():
+                        pushes.setdefault(k, []).extend(vals)
+                    self._pushes = pushes
+                    self._ops += sum(map(len, pushes.values())) + len(sets)
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait(FLUSH_INTERVAL_S)
+            self.flush()
+            if self.failing:
+                time.sleep(min(5.0, FLUSH_INTERVAL_S * 2 ** min(self.failing, 5)))  # backend down
+
+
+_buffer: Optional[WriteBuffer] = None
+_configured = False
+_lock = threading.Lock()
+
+
+def get_buffer() -> Optional[WriteBuffer]:
+    """The process-wide write buffer for PRESENCE_STATE_URL (None when state is session-only)."""
+    global _buffer, _configured
+    with _lock:
+        if not _configured:
+            _configured = True
+            backend = from_url(os.environ.get("PRESENCE_STATE_URL", DEFAULT_URL))
+            _buffer = WriteBuffer(backend) if backend is not None else None
+        return _buffer
+
+
+def get_backend() -> Optional[Backend]:
+    buf = get_buffer()
+    return buf.backend if buf is not None else None
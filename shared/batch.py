@@ -0,0 +1,295 @@
+# shared/batch.py
+"""
+Headless batch generation: the same prompt builders and `llm_copy` the pages
+use, run over a CSV/JSONL of company profiles with bounded concurrency.
+
+    python -m shared.batch clients.csv --out runs/nightly --tasks press_release,pr_angles \\
+        --concurrency 8 --exports docx,pdf
+
+Each input row is a profile (name, industry, size, goals, audience,
+brand_voice, brand_rules, website) plus optional task options (tone, length,
+topic, timing, platform, niche, cta, n_hooks). A `task` / `tasks` column
+overrides --tasks for that row.
+
+Output directory:
+  results.jsonl  one line per finished job; doubles as the checkpoint, so
+                 re-running the same command resumes and retries failures
+  history.json   successful jobs as history items (History & Insights → Import)
+  exports/       optional .txt/.docx/.pdf per job
+
+Set OPENAI_BASE_URL (or --base-url) to benchmark against
+benchmarks/stub_llm_server.py instead of the real API.
+"""
+from __future__ import annotations
+import argparse
+import csv
+import hashlib
+import json
+import os
+import re
+import statistics
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set
+
+from . import prompts
+
+PROFILE_FIELDS = ("name", "industry", "size", "goals", "audience", "brand_voice", "brand_rules", "website")
+OPTION_FIELDS = ("tone", "length", "topic", "content_type", "timing", "platform", "niche", "cta", "n_hooks", "goals")
+EXPORT_FORMATS = ("txt", "docx", "pdf")
+
+
+@dataclass
+class Job:
+    id: str
+    row: int
+    task: str
+    profile: Dict[str, str]
+    options: Dict[str, Any]
+
+
+@dataclass
+class JobResult:
+    id: str
+    row: int
+    task: str
+    company: str
+    status: str                      # "ok" | "error"
+    output: str = ""
+    error: str = ""
+    latency_s: float = 0.0
+    attempts: int = 0
+    violations: List[str] = field(default_factory=list)
+    exports: List[str] = field(default_factory=list)
+    ts: float = 0.0
+
+
+def read_rows(path: Path) -> Iterator[Dict[str, Any]]:
+    """Rows of a .csv or .jsonl/.ndjson file (blank lines skipped)."""
+    if path.suffix.lower() in (".jsonl", ".ndjson", ".json"):
+        with open(path, encoding="utf-8") as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as fh:
+            yield from csv.DictReader(fh)
+
+
+def plan_jobs(rows: Iterator[Dict[str, Any]], default_tasks: List[str]) -> Iterator[Job]:
+    for i, row in enumerate(rows):
+        profile = {k: str(row.get(k) or "").strip() for k in PROFILE_FIELDS}
+        opts = {k: row[k] for k in OPTION_FIELDS if row.get(k) not in (None, "")}
+        if "n_hooks" in opts:
+            opts["n_hooks"] = int(opts["n_hooks"])
+        raw = row.get("tasks") or row.get("task")
+        tasks = [t.strip() for t in str(raw).split(",") if t.strip()] if raw else default_tasks
+        for task in tasks:
+            if task not in prompts.TASKS:
+                raise SystemExit(f"row {i + 1}: unknown task {task!r} (known: {', '.join(prompts.TASKS)})")
+            ident = json.dumps([task, profile, opts], sort_keys=True, ensure_ascii=False)
+            yield Job(id=hashlib.sha1(ident.encode("utf-8")).hexdigest()[:16], row=i, task=task,
+                      profile=profile, options=opts)
+
+
+def load_checkpoint(path: Path) -> Set[str]:
+    """Ids of jobs already finished successfully (a torn last line is ignored)."""
+    done: Set[str] = set()
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("status") == "ok":
+                done.add(rec["id"])
+    return done
+
+
+def _slug(s: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", s.lower()).strip("-")[:60] or "company"
+
+
+def _export(job: Job, text: str, out_dir: Path, formats: List[str]) -> List[str]:
+    from .exports import text_to_docx_bytes, text_to_pdf_bytes
+
+    base = out_dir / "exports" / _slug(job.profile["name"])
+    base.mkdir(parents=True, exist_ok=True)
+    title = f"{job.profile['name']} — {job.task.replace('_', ' ').title()}"
+    written = []
+    for fmt in formats:
+        p = base / f"{job.task}-{job.id[:8]}.{fmt}"
+        if fmt == "txt":
+            p.write_text(text, encoding="utf-8")
+        elif fmt == "docx":
+            p.write_bytes(text_to_docx_bytes(text, title=title))
+        elif fmt == "pdf":
+            p.write_bytes(text_to_pdf_bytes(text, title=title))
+        written.append(str(p.relative_to(out_dir)))
+    return written
+
+
+def run_job(job: Job, args: argparse.Namespace, out_dir: Path) -> JobResult:
+    from . import compliance, profiles
+    from .llm import llm_copy
+
+    pv = profiles.derive(job.profile)  # context block + brand matchers, built once per distinct profile
+    prompt = prompts.build(job.task, job.profile, **job.options)
+    # Company and options in the scope: prompts for different clients are
+    # near-identical templates and must never be served from each other's cache.
+    scope = json.dumps([job.task, job.profile["name"], job.options], sort_keys=True)
+    res = JobResult(id=job.id, row=job.row, task=job.task, company=job.profile["name"], status="error")
+    for attempt in range(1, args.retries + 2):
+        res.attempts = attempt
+        t0 = time.perf_counter()
+        try:
+            out = llm_copy(prompt, model=args.model or None, temperature=args.temperature,
+                           max_tokens=args.max_tokens or None, use_cache=not args.no_cache, cache_scope=scope,
+                           context=pv.context, task=job.task)
+            res.latency_s = time.perf_counter() - t0
+            res.output, res.status, res.error = out, "ok", ""
+            break
+        except Exception as e:  # network / rate limit: back off and retry
+            res.latency_s = time.perf_counter() - t0
+            res.error = f"{type(e).__name__}: {e}"
+            if attempt <= args.retries:
+                time.sleep(min(30.0, args.backoff * 2 ** (attempt - 1)))
+    if res.status == "ok":
+        if not pv.rules.empty:
+            res.violations = [v.term for v in compliance.check_text(res.output, pv.rules).violations]
+        if args.exports:
+            res.exports = _export(job, res.output, out_dir, args.exports)
+    res.ts = time.time()
+    return res
+
+
+def history_item(rec: Dict[str, Any]) -> Dict[str, Any]:
+    """A results.jsonl record in the shape `history.add` stores."""
+    kind = prompts.TASKS.get(rec["task"], (None, rec["task"]))[1]
+    return {
+        "ts": rec.get("ts") or time.time(),
+        "kind": kind,
+        "content": rec.get("output", ""),
+        "meta": {"company": rec.get("company", ""), "task": rec["task"], "batch_id": rec["id"],
+                 "brand_violations": rec.get("violations", [])},
+        "tags": ["batch", rec["task"]],
+    }
+
+
+def write_history(results_path: Path, out_path: Path) -> int:
+    latest: Dict[str, Dict[str, Any]] = {}
+    with open(results_path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("status") == "ok":
+                latest[rec["id"]] = rec
+    items = [history_item(r) for r in sorted(latest.values(), key=lambda r: (r["row"], r["task"]))]
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    tmp.write_text(json.dumps(items, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(out_path)
+    return len(items)
+
+
+def run(args: argparse.Namespace) -> int:
+    from . import llm
+
+    if args.base_url:
+        os.environ["OPENAI_BASE_URL"] = args.base_url
+    if not llm.available() and not args.allow_offline:
+        print("No OPENAI_API_KEY configured; refusing to write offline templates (use --allow-offline).",
+              file=sys.stderr)
+        return 2
+
+    out_dir = Path(args.out)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    results_path = out_dir / "results.jsonl"
+    done = load_checkpoint(results_path)
+    jobs = [j for j in plan_jobs(read_rows(Path(args.input)), args.tasks) if j.id not in done]
+    if args.limit:
+        jobs = jobs[: args.limit]
+    print(f"{len(jobs)} job(s) to run, {len(done)} already done; concurrency {args.concurrency}", file=sys.stderr)
+
+    latencies: List[float] = []
+    ok = failed = 0
+    t_start = time.perf_counter()
+    with open(results_path, "a", encoding="utf-8") as sink, ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        pending: Set[Future] = set()
+        queue = iter(jobs)
+
+        def _fill() -> None:
+            # Keep at most 2x concurrency jobs in flight so huge inputs stay bounded in memory.
+            for job in queue:
+                pending.add(pool.submit(run_job, job, args, out_dir))
+                if len(pending) >= args.concurrency * 2:
+                    break
+
+        _fill()
+        while pending:
+            finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in finished:
+                pending.discard(fut)
+                res = fut.result()
+                sink.write(json.dumps(asdict(res), ensure_ascii=False) + "\n")
+                sink.flush()  # checkpoint: a crash loses at most in-flight jobs
+                if res.status == "ok":
+                    ok += 1
+                    latencies.append(res.latency_s)
+                else:
+                    failed += 1
+                    print(f"  failed {res.company} / {res.task}: {res.error}", file=sys.stderr)
+                if not args.quiet and (ok + failed) % max(1, args.progress_every) == 0:
+                    print(f"  {ok + failed}/{len(jobs)} done", file=sys.stderr)
+            _fill()
+
+    wall = time.perf_counter() - t_start
+    n_hist = write_history(results_path, out_dir / "history.json") if results_path.exists() else 0
+    summary = {
+        "ok": ok, "failed": failed, "skipped": len(done), "wall_s": round(wall, 3),
+        "jobs_per_s": round(ok / wall, 2) if wall > 0 else None,
+        "p50_s": round(statistics.median(latencies), 3) if latencies else None,
+        "p95_s": round(statistics.quantiles(latencies, n=20)[-1], 3) if len(latencies) >= 2 else None,
+        "history_items": n_hist,
+    }
+    print(json.dumps(summary))
+    return 1 if failed else 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(prog="python -m shared.batch", description=__doc__.split("\n\n")[0],
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("input", help="CSV or JSONL of company profiles")
+    ap.add_argument("--out", required=True, help="output directory (also the checkpoint)")
+    ap.add_argument("--tasks", default="press_release,pr_angles",
+                    help=f"comma-separated, from: {', '.join(prompts.TASKS)}")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--retries", type=int, default=2)
+    ap.add_argument("--backoff", type=float, default=1.0, help="seconds before the first retry (doubles)")
+    ap.add_argument("--model", default="", help="pin one model (default: routed per task, see shared/router.py)")
+    ap.add_argument("--temperature", type=float, default=0.6)
+    ap.add_argument("--max-tokens", type=int, default=0, help="default: the task class's budget")
+    ap.add_argument("--exports", default="", help=f"comma-separated, from: {', '.join(EXPORT_FORMATS)}")
+    ap.add_argument("--base-url", default="", help="OpenAI-compatible endpoint (e.g. the local stub)")
+    ap.add_argument("--no-cache", action="store_true", help="bypass the semantic cache")
+    ap.add_argument("--allow-offline", action="store_true", help="run without an API key (template output)")
+    ap.add_argument("--limit", type=int, default=0, help="run at most N pending jobs")
+    ap.add_argument("--progress-every", type=int, default=25)
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args(argv)
+    args.tasks = [t.strip() for t in args.tasks.split(",") if t.strip()]
+    args.exports = [f.strip() for f in args.exports.split(",") if f.strip()]
+    bad = [f for f in args.exports if f not in EXPORT_FORMATS]
+    if bad:
+        ap.error(f"unknown export format(s): {', '.join(bad)}")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+# shared/compliance.py
+from __future__ import annotations
+import hashlib
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .matcher import KeywordMatcher, compile_keywords
+
+# Clause openers that make the terms after them banned / required.
+_NEG = re.compile(r"\b(?:don'?t|do not|avoid|never|no|banned?|forbidden|not allowed|exclude)\b", re.I)
+_REQ = re.compile(r"\b(?:must (?:include|mention|use)|always (?:include|mention|use)|required?|include)\b", re.I)
+# Quote chars must not touch a word char on the outside, so "don't" isn't an opening quote.
+_QUOTED = re.compile(r"(?<!\w)[\"'‘’“”]([^\"'‘’“”]{2,60})[\"'‘’“”](?!\w)")
+# "Banned: a, b, c" / "Required phrases: x; y" list lines.
+_LIST_LINE = re.compile(r"^\s*(banned(?: words| terms)?|avoid|never say|required(?: phrases| terms)?|must include|always include)\s*:\s*(.+)$",
+                        re.I | re.M)
+
+
+@dataclass(frozen=True)
+class BrandRules:
+    banned: Tuple[str, ...]
+    required: Tuple[str, ...]
+    version: str  # hash of the source text; matchers are cached per version
+
+    @property
+    def empty(self) -> bool:
+        return not self.banned and not self.required
+
+
+@dataclass
+class Violation:
+    term: str
+    count: int
+    snippet: str
+
+
+@dataclass
+class ComplianceReport:
+    violations: List[Violation] = field(default_factory=list)
+    missing: List[str] = field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations and not self.missing
+
+
+def _split_terms(s: str) -> List[str]:
+    quoted = _QUOTED.findall(s)
+    if quoted:
+        return quoted
+    return [t.strip(" .;'\"") for t in re.split(r"[,;/]|\bor\b|\band\b", s) if t.strip(" .;'\"")]
+
+
+@lru_cache(maxsize=128)
+def parse_rules(text: str) -> BrandRules:
+    """
+    Pull banned terms and required phrases out of free-text brand rules.
+      - list lines: `Banned: revolutionary, game-changing` / `Must include: SOC 2`
+      - quoted terms inside a clause led by don't / avoid / never / no -> banned
+      - quoted terms inside a clause led by must/always include|use -> required
+    Cached per text, so callers can parse on every rerun.
+    """
+    banned: Dict[str, None] = {}
+    required: Dict[str, None] = {}
+    body = text or ""
+    for m in _LIST_LINE.finditer(body):
+        target = required if m.group(1).lower().startswith(("required", "must", "always")) else banned
+        for t in _split_terms(m.group(2)):
+            target.setdefault(t.lower(), None)
+    body = _LIST_LINE.sub("", body)
+    for clause in re.split(r"[.;\n]|(?=\bdo:)|(?=\bdon'?t:)", body, flags=re.I):
+        quoted = _QUOTED.findall(clause)
+        if not quoted:
+            continue
+        neg, req = _NEG.search(clause), _REQ.search(clause)
+        if neg and (not req or neg.start() <= req.start()):
+            target = banned
+        elif req:
+            target = required
+        else:
+            continue
+        for t in quoted:
+            target.setdefault(t.strip().lower(), None)
+    version = hashlib.sha1((text or "").encode("utf-8")).hexdigest()[:12]
+    return BrandRules(banned=tuple(banned), required=tuple(t for t in required if t not in banned), version=version)
+
+
+def _spec(terms: Iterable[str]) -> str:
+    return ", ".join(f'"{t}"' for t in terms)
+
+
+def matchers(rules: BrandRules) -> Tuple[Optional[KeywordMatcher], Optional[KeywordMatcher]]:
+    """(banned, required) matchers; compiled once per rules version via the keyword-matcher cache."""
+    b = compile_keywords(_spec(rules.banned), fields=("text",)) if rules.banned else None
+    r = compile_keywords(_spec(rules.required), fields=("text",)) if rules.required else None
+    return b, r
+
+
+def check_text(text: str, rules: BrandRules | str) -> ComplianceReport:
+    """Banned terms present in `text` (with counts and a snippet) and required phrases missing."""
+    if isinstance(rules, str):
+        rules = parse_rules(rules)
+    report = ComplianceReport()
+    if rules.empty or not text:
+        return report
+    banned_m, required_m = matchers(rules)
+    if banned_m is not None:
+        counts: Dict[str, List[Tuple[int, int]]] = {}
+        for term, s, e in banned_m.spans(text):
+            counts.setdefault(term, []).append((s, e))
+        for term, ms in counts.items():
+            s, e = ms[0]
+            snippet = ("…" if s > 30 else "") + text[max(0, s - 30):s] + f"**{text[s:e]}**" + text[e:e + 30] + ("…" if e + 30 < len(text) else "")
+            report.violations.append(Violation(term=term, count=len(ms), snippet=snippet.replace("\n", " ")))
+    if required_m is not None:
+        found = set(required_m.hits(text))
+        report.missing = [t for t in rules.required if t not in found]
+    return report
+
+
+def item_text(item: Dict[str, Any]) -> str:
+    """Best-effort generated text of a history item (history.add items and legacy shapes)."""
+    for key in ("content", "text", "output", "result"):
+        v = item.get(key)
+        if isinstance(v, str) and v.strip():
+            return v
+    payload = item.get("payload")
+    if isinstance(payload, dict):
+        return "\n".join(str(v) for v in payload.values() if isinstance(v, str))
+    return ""
+
+
+def audit(items: Iterable[Dict[str, Any]], rules: BrandRules | str) -> List[Tuple[int, Dict[str, Any], ComplianceReport]]:
+    """
+    Batch-check many history items against one rule set (matchers compiled
+    once). Returns (index, item, report) for every item using a banned term;
+    required phrases aren't enforced here since not every output is a full piece.
+    """
+    if isinstance(rules, str):
+        rules = parse_rules(rules)
+    out = []
+    if rules.empty:
+        return out
+    for i, it in enumerate(items):
+        rep = check_text(item_text(it), rules)
+        if rep.violations:
+            out.append((i, it, rep))
+    return out
@@ -1,8 +1,40 @@
 from __future__ import annotations
 from pathlib import Path
 import io
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
 import pandas as pd
 
+from .tracing import span, traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+except Exception:  # pyarrow not installed: in-memory cache only, no sidecar
+    pa = None
+    pa_ipc = None
+
+# Known columns of channel exports (see data/sample_dataset.csv). Columns not
+# listed here are left to pandas' inference; missing ones are simply skipped.
+SCHEMA: Dict[str, str] = {
+    "date": "datetime64[ns]",
+    "channel": "category",
+    "post_type": "category",
+    "headline": "string",
+    "copy": "string",
+    "clicks": "Int64",
+    "impressions": "Int64",
+    "engagement_rate": "float64",
+}
+
+SIDECAR_SUFFIX = ".arrow"
+_META_KEY = b"presence_source"
+
+# abs path -> ((mtime_ns, size), frame)
+_cache: Dict[str, Tuple[Tuple[int, int], pd.DataFrame]] = {}
+_cache_lock = threading.Lock()
+
+
 def ensure_sample_dataset():
     p = Path("data")
     p.mkdir(exist_ok=True)
@@ -10,8 +42,299 @@ def ensure_sample_dataset():
     if not csv.exists():
         csv.write_text("date,channel\n2025-08-01,LinkedIn\n2025-08-03,Email\n2025-08-05,Instagram\n", encoding="utf-8")
 
-def load_csv(path: str):
+
+def sidecar_path(path: str | Path) -> Path:
+    p = Path(path)
+    return p.with_name(p.name + SIDECAR_SUFFIX)
+
+
+def _signature(p: Path) -> Tuple[int, int]:
+    st_ = p.stat()
+    return st_.st_mtime_ns, st_.st_size
+
+
+def _sig_bytes(sig: Tuple[int, int]) -> bytes:
+    return f"{sig[0]}:{sig[1]}".encode("ascii")
+
+
+def _coerce(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tolerant path for messy exports: drop repeated header rows (concatenated
+    CSVs), then coerce known columns; "2.2%" becomes 0.022, bad cells NaN/NA.
+    """
+    cols = list(df.columns)
+    if len(df):
+        header_like = (df.astype(str) == pd.Series(cols, index=cols)).all(axis=1)
+        df = df.loc[~header_like].reset_index(drop=True)
+    for c, t in SCHEMA.items():
+        if c not in df.columns:
+            continue
+        if t.startswith("datetime"):
+            df[c] = pd.to_datetime(df[c], errors="coerce")
+        elif t in ("Int64", "float64"):
+            raw = df[c].astype("string").str.strip().str.replace(",", "", regex=False)
+            pct = raw.str.endswith("%").fillna(False)
+            # Float first: all-whole percentages ("5%") parse as Int64, which can't hold 0.05.
+            num = pd.to_numeric(raw.str.rstrip("%"), errors="coerce").astype("float64")
+            num = num.where(~pct, num / 100.0)
+            df[c] = num.round().astype("Int64") if t == "Int64" else num.astype("float64")
+        else:
+            df[c] = df[c].astype(t)
+    return df
+
+
+def read_csv_typed(source, **kwargs) -> pd.DataFrame:
+    """
+    `pd.read_csv` with the known-column schema applied (dates parsed, counts as
+    nullable ints, channel/post_type as categories). `source` is a path or a
+    file-like object; extra kwargs go to `pd.read_csv`. Clean files take the
+    fast typed parse; files that fail it are re-read as text and coerced.
+    """
+    pos = source.tell() if hasattr(source, "seek") else None
+    header = pd.read_csv(source, nrows=0).columns
+    if pos is not None:
+        source.seek(pos)
+    dtypes = {c: t for c, t in SCHEMA.items() if c in header and not t.startswith("datetime")}
+    dates = [c for c, t in SCHEMA.items() if c in header and t.startswith("datetime")]
     try:
-        return pd.read_csv(path)
+        df = pd.read_csv(source, dtype=dtypes, **kwargs)
+    except (ValueError, TypeError):
+        if pos is not None:
+            source.seek(pos)
+        return _coerce(pd.read_csv(source, dtype={c: "string" for c in dtypes}, **kwargs))
+    for c in dates:
+        df[c] = pd.to_datetime(df[c], errors="coerce")
+    return df
+
+
+def _read_sidecar(side: Path, sig: Tuple[int, int]) -> Optional[pd.DataFrame]:
+    if pa_ipc is None or not side.exists():
+        return None
+    try:
+        with pa.memory_map(str(side), "r") as src:
+            table = pa_ipc.open_file(src).read_all()
+        meta = table.schema.metadata or {}
+        if meta.get(_META_KEY) != _sig_bytes(sig):
+            return None  # CSV changed since the sidecar was written
+        return table.to_pandas()
     except Exception:
         return None
+
+
+def _write_sidecar(side: Path, df: pd.DataFrame, sig: Tuple[int, int]) -> None:
+    if pa_ipc is None:
+        return
+    try:
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: _sig_bytes(sig)})
+        tmp = side.with_name(side.name + ".tmp")
+        # Uncompressed Arrow IPC so later loads can memory-map it.
+        with pa.OSFile(str(tmp), "wb") as sink, pa_ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        tmp.replace(side)
+    except Exception:
+        pass  # the sidecar is an optimisation; the CSV stays the source of truth
+
+
+def load_csv(path: str, use_sidecar: bool = True):
+    """
+    Load a dataset CSV with the known-column schema.
+      - Frames are cached per process, keyed by path + mtime/size, so reruns
+        return instantly until the file changes. Treat the result as read-only.
+      - With `use_sidecar`, the first load writes `<file>.arrow` next to the
+        CSV and later cold loads memory-map it instead of re-parsing.
+    Returns None if the file can't be read.
+    """
+    try:
+        p = Path(path).resolve()
+        sig = _signature(p)
+    except Exception:
+        return None
+    key = str(p)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == sig:
+        return hit[1]
+
+    with _cache_lock, span("dataframe.load_csv", file=p.name) as sp:
+        hit = _cache.get(key)
+        if hit is not None and hit[0] == sig:
+            return hit[1]
+        side = sidecar_path(p)
+        df = _read_sidecar(side, sig) if use_sidecar else None
+        sp.set(source="sidecar" if df is not None else "csv")
+        if df is None:
+            try:
+                df = read_csv_typed(p)
+            except Exception:
+                return None
+            if use_sidecar:
+                _write_sidecar(side, df, sig)
+        sp.set(rows=len(df))
+        _cache[key] = (sig, df)
+        return df
+
+
+def clear_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+# -----------------------------------------------------------------------------
+# Bounded-memory helpers for large uploads (Admin Settings)
+# -----------------------------------------------------------------------------
+DEFAULT_CHUNKSIZE = 100_000
+_DISTINCT_CAP = 1000
+
+
+def _rewind(source) -> None:
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+@traced("dataframe.preview_csv")
+def preview_csv(source, n: int = 50) -> pd.DataFrame:
+    """First `n` rows only (typed where possible); never parses the rest of the file."""
+    _rewind(source)
+    df = pd.read_csv(source, nrows=n, dtype="string")
+    return _coerce(df)
+
+
+def infer_schema(source, sample_rows: int = 1000) -> Dict[str, str]:
+    """Column -> dtype name, from the known schema or inferred on a leading sample."""
+    sample = preview_csv(source, n=sample_rows)
+    out: Dict[str, str] = {}
+    for c in sample.columns:
+        if c in SCHEMA:
+            out[c] = SCHEMA[c]
+            continue
+        num = pd.to_numeric(sample[c], errors="coerce")
+        if sample[c].notna().any() and num.notna().sum() == sample[c].notna().sum():
+            out[c] = "float64"
+        else:
+            out[c] = "string"
+    return out
+
+
+def iter_csv_chunks(source, chunksize: int = DEFAULT_CHUNKSIZE,
+                    schema: Optional[Dict[str, str]] = None,
+                    names: Optional[list] = None) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV as typed chunks of at most `chunksize` rows. Known columns are
+    coerced like `read_csv_typed`'s tolerant path; other numeric columns from
+    `schema` (see `infer_schema`) become float64. With `names`, reading starts
+    at the source's current position and no header line is expected (used to
+    pick up rows appended since a previous pass).
+    """
+    if names is None:
+        _rewind(source)
+        reader = pd.read_csv(source, chunksize=chunksize, dtype="string")
+    else:
+        reader = pd.read_csv(source, chunksize=chunksize, dtype="string", header=None, names=names)
+    for chunk in reader:
+        chunk = _coerce(chunk)
+        for c, t in (schema or {}).items():
+            if c in chunk.columns and c not in SCHEMA and t == "float64":
+                chunk[c] = pd.to_numeric(chunk[c], errors="coerce")
+        yield chunk
+
+
+@traced("dataframe.scan_csv")
+def scan_csv_stats(source, chunksize: int = DEFAULT_CHUNKSIZE,
+                   schema: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    One chunked pass over the file: row count plus per-column non-null counts,
+    min/max/mean for numeric columns and a capped distinct count for the rest.
+    Memory is bounded by `chunksize`, not by file size.
+    """
+    rows = 0
+    cols: Dict[str, Dict[str, Any]] = {}
+    for chunk in iter_csv_chunks(source, chunksize=chunksize, schema=schema):
+        rows += len(chunk)
+        for c in chunk.columns:
+            s = chunk[c]
+            st_ = cols.setdefault(c, {"dtype": str(s.dtype), "non_null": 0})
+            nn = int(s.notna().sum())
+            st_["non_null"] += nn
+            if not nn:
+                continue
+            if pd.api.types.is_numeric_dtype(s.dtype) or pd.api.types.is_datetime64_any_dtype(s.dtype):
+                lo, hi = s.min(), s.max()
+                st_["min"] = lo if "min" not in st_ else min(st_["min"], lo)
+                st_["max"] = hi if "max" not in st_ else max(st_["max"], hi)
+                if pd.api.types.is_numeric_dtype(s.dtype):
+                    st_["_sum"] = st_.get("_sum", 0.0) + float(s.sum())
+            else:
+                seen = st_.setdefault("_distinct", set())
+                if len(seen) < _DISTINCT_CAP:
+                    seen.update(s.dropna().unique()[: _DISTINCT_CAP - len(seen)].tolist())
+                    st_["distinct_capped"] = len(seen) >= _DISTINCT_CAP
+    for st_ in cols.values():
+        if "_sum" in st_:
+            st_["mean"] = st_.pop("_sum") / st_["non_null"] if st_["non_null"] else None
+        if "_distinct" in st_:
+            st_["distinct"] = len(st_.pop("_distinct"))
+    return {"rows": rows, "columns": cols}
+
+
+def convert_csv_to_sidecar(path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE) -> Path:
+    """
+    Stream `path` into its Arrow sidecar chunk by chunk (constant memory), so
+    `load_csv(path)` memory-maps it afterwards. Categories are written as
+    plain strings because per-chunk dictionaries differ.
+    """
+    if pa_ipc is None:
+        raise RuntimeError("Converting uploads requires the 'pyarrow' package.")
+    p = Path(path).resolve()
+    sig = _signature(p)
+    side = sidecar_path(p)
+    tmp = side.with_name(side.name + ".tmp")
+    schema = None
+    with open(p, "rb") as fh, pa.OSFile(str(tmp), "wb") as sink:
+        writer = None
+        try:
+            for chunk in iter_csv_chunks(fh, chunksize=chunksize, schema=infer_schema(fh)):
+                for c in chunk.columns:
+                    if isinstance(chunk[c].dtype, pd.CategoricalDtype):
+                        chunk[c] = chunk[c].astype("string")
+                table = pa.Table.from_pandas(chunk, preserve_index=False)
+                if schema is None:
+                    schema = table.schema.with_metadata(
+                        {**(table.schema.metadata or {}), _META_KEY: _sig_bytes(sig)}
+                    )
+                    writer = pa_ipc.new_file(sink, schema)
+                writer.write_table(table.cast(schema))
+        finally:
+            if writer is not None:
+                writer.close()
+    if schema is None:
+        tmp.unlink(missing_ok=True)
+        raise ValueError("CSV has no rows to convert.")
+    tmp.replace(side)
+    return side
+
+
+# Background conversions: dest path -> {"status": ..., "error": ...}
+_conversions: Dict[str, Dict[str, Any]] = {}
+
+
+def convert_in_background(path: str | Path, chunksize: int = DEFAULT_CHUNKSIZE) -> str:
+    """Start `convert_csv_to_sidecar` on a daemon thread; poll `conversion_status(path)`."""
+    key = str(Path(path).resolve())
+    job = _conversions.get(key)
+    if job and job["status"] == "running":
+        return key
+    _conversions[key] = {"status": "running", "error": None}
+
+    def _run() -> None:
+        try:
+            convert_csv_to_sidecar(key, chunksize=chunksize)
+            _conversions[key] = {"status": "done", "error": None}
+        except Exception as e:
+            _conversions[key] = {"status": "failed", "error": str(e)}
+
+    threading.Thread(target=_run, name=f"sidecar:{Path(key).name}", daemon=True).start()
+    return key
+
+
+def conversion_status(path: str | Path) -> Optional[Dict[str, Any]]:
+    return _conversions.get(str(Path(path).resolve()))
@@ -0,0 +1,197 @@
+# shared/dedupe.py
+from __future__ import annotations
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Query params that only track the click, never change the story.
+_TRACKING_PARAMS = frozenset(("fbclid", "gclid", "mc_cid", "mc_eid", "ocid", "cmpid", "ref", "rss"))
+_TRACKING_PREFIX = "utm_"  # utm_source, utm_medium, ...
+
+_WORD = re.compile(r"[a-z0-9]+")
+_MERSENNE = (1 << 61) - 1
+
+
+def canonical_url(url: str) -> str:
+    """
+    Normalise a link so the same article from different feeds compares equal:
+    lower-case host without `www.`, no fragment, no tracking params, sorted
+    query, no trailing slash.
+    """
+    if not url:
+        return ""
+    try:
+        parts = urlsplit(url.strip())
+    except Exception:
+        return url.strip()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in _TRACKING_PARAMS and not k.lower().startswith(_TRACKING_PREFIX)
+    ]
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit(("https" if parts.scheme in ("http", "https") else parts.scheme,
+                       host, path, urlencode(sorted(query)), ""))
+
+
+def item_key(entry: Any) -> str:
+    """Stable exact-duplicate key: hash of the GUID if present, else the canonical link."""
+    guid = str(entry.get("id") or entry.get("guid") or "").strip()
+    basis = f"guid:{guid}" if guid else f"url:{canonical_url(str(entry.get('link') or ''))}"
+    if basis in ("guid:", "url:"):
+        basis = f"title:{normalize_title(str(entry.get('title') or ''))}"
+    return hashlib.sha1(basis.encode("utf-8")).hexdigest()
+
+
+def entry_source(entry: Any, fallback: str = "") -> str:
+    """Best-effort outlet name: feed `source.title`, else link host, else `fallback`."""
+    src = entry.get("source")
+    if isinstance(src, dict) and src.get("title"):
+        return str(src["title"])
+    host = urlsplit(str(entry.get("link") or "")).hostname or ""
+    return host[4:] if host.startswith("www.") else (host or fallback)
+
+
+def normalize_title(title: str) -> str:
+    # Aggregators append " - Outlet" / " | Outlet"; drop it before comparing.
+    t = re.split(r"\s+[-|–—]\s+(?=[^-|–—]+$)", title.strip(), maxsplit=1)[0]
+    return " ".join(_WORD.findall(t.lower()))
+
+
+def _shingles(text: str) -> List[str]:
+    words = normalize_title(text).split()
+    if len(words) < 2:
+        return words
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def _h64(s: str) -> int:
+    return int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class MinHasher:
+    """
+    MinHash signatures over word + bigram shingles. `num_perm` must be
+    divisible by `bands` for the LSH index.
+    """
+
+    def __init__(self, num_perm: int = 32, seed: int = 1):
+        self.num_perm = num_perm
+        coeffs = [_h64(f"{seed}:{i}") for i in range(num_perm * 2)]
+        self._a = [(c % (_MERSENNE - 1)) + 1 for c in coeffs[:num_perm]]
+        self._b = [c % _MERSENNE for c in coeffs[num_perm:]]
+
+    def signature(self, text: str) -> Tuple[int, ...]:
+        """MinHash signature of `text`; empty when it has no shingles (nothing to compare)."""
+        hashes = [_h64(s) for s in set(_shingles(text))]
+        if not hashes:
+            return ()
+        return tuple(
+            min((a * h + b) % _MERSENNE for h in hashes)
+            for a, b in zip(self._a, self._b)
+        )
+
+    @staticmethod
+    def similarity(s1: Tuple[int, ...], s2: Tuple[int, ...]) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        if not s1:
+            return 0.0
+        return sum(1 for x, y in zip(s1, s2) if x == y) / len(s1)
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures: only items sharing a band are compared."""
+
+    def __init__(self, num_perm: int = 32, bands: int = 8):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], List[int]] = {}
+
+    def candidates(self, sig: Tuple[int, ...]) -> List[int]:
+        out: Dict[int, None] = {}
+        for b in range(self.bands):
+            band = sig[b * self.rows:(b + 1) * self.rows]
+            for i in self._buckets.get((b, band), ()):
+                out.setdefault(i, None)
+        return list(out)
+
+    def add(self, idx: int, sig: Tuple[int, ...]) -> None:
+        for b in range(self.bands):
+            band = sig[b * self.rows:(b + 1) * self.rows]
+            self._buckets.setdefault((b, band), []).append(idx)
+
+
+@dataclass
+class StoryCluster:
+    """One story: the first-seen entry plus every near-duplicate of it."""
+    entry: Any
+    items: List[Any] = field(default_factory=list)
+    sources: List[str] = field(default_factory=list)
+
+    @property
+    def title(self) -> str:
+        return str(self.entry.get("title") or "")
+
+    @property
+    def source_count(self) -> int:
+        return len(self.sources)
+
+
+def dedupe_exact(entries: Iterable[Any]) -> List[Any]:
+    """Drop entries whose GUID / canonical URL was already seen (first wins)."""
+    seen: set = set()
+    out: List[Any] = []
+    for e in entries:
+        k = item_key(e)
+        if k in seen:
+            continue
+        seen.add(k)
+        out.append(e)
+    return out
+
+
+def cluster_stories(entries: Iterable[Any], threshold: float = 0.5,
+                    num_perm: int = 32, bands: int = 8,
+                    source_of: Optional[Any] = None) -> List[StoryCluster]:
+    """
+    Exact-dedupe `entries`, then group near-duplicate titles with MinHash/LSH
+    (estimated Jaccard >= `threshold` against the closest candidate).
+    Clusters come back in first-seen order; `source_of(entry)` overrides how
+    the outlet name is derived.
+    """
+    source_of = source_of or entry_source
+    hasher = MinHasher(num_perm=num_perm)
+    index = LSHIndex(num_perm=num_perm, bands=bands)
+    sigs: List[Tuple[int, ...]] = []
+    clusters: List[StoryCluster] = []
+    owner: List[int] = []  # signature idx -> cluster idx
+
+    for e in dedupe_exact(entries):
+        sig = hasher.signature(str(e.get("title") or ""))
+        best, best_sim = -1, threshold
+        # Untitled entries have no shingles: each stays its own story instead of all colliding.
+        for i in (index.candidates(sig) if sig else ()):
+            sim = hasher.similarity(sig, sigs[i])
+            if sim >= best_sim:
+                best, best_sim = i, sim
+        idx = len(sigs)
+        sigs.append(sig)
+        if sig:
+            index.add(idx, sig)
+        src = source_of(e)
+        if best < 0:
+            owner.append(len(clusters))
+            clusters.append(StoryCluster(entry=e, items=[e], sources=[src] if src else []))
+        else:
+            c = clusters[owner[best]]
+            owner.append(owner[best])
+            c.items.append(e)
+            if src and src not in c.sources:
+                c.sources.append(src)
+    return clusters
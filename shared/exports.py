@@ -4,15 +4,27 @@ from typing import Iterable, Optional, List
 import io
 import os
 
-try:
-    from fpdf import FPDF
-except Exception:  # fpdf not installed
-    FPDF = None
+from .tracing import traced
 
-try:
-    from docx import Document  # python-docx
-except Exception:
-    Document = None
+# fpdf / python-docx are imported on first export, not when a page imports
+# this module: every page rerun pays for its imports, few reruns export.
+_MISSING = object()
+_libs: dict = {}
+
+
+def _lazy(name: str):
+    """Import-once loader; returns None if the optional package is missing."""
+    mod = _libs.get(name, _MISSING)
+    if mod is _MISSING:
+        try:
+            if name == "fpdf":
+                from fpdf import FPDF as mod
+            else:
+                from docx import Document as mod  # python-docx
+        except Exception:
+            mod = None
+        _libs[name] = mod
+    return mod
 
 
 def _find_dejavu() -> Optional[str]:
@@ -36,6 +48,7 @@ def _find_dejavu() -> Optional[str]:
     return None
 
 
+@traced("export.pdf")
 def text_to_pdf_bytes(text: str, title: str = "Document") -> bytes:
     """
     Robust PDF exporter:
@@ -45,6 +58,7 @@ def text_to_pdf_bytes(text: str, title: str = "Document") -> bytes:
 
     Requires `fpdf`. If missing, we return a tiny PDF-like message.
     """
+    FPDF = _lazy("fpdf")
     if FPDF is None:
         return b"PDF export requires the 'fpdf' package."
 
@@ -75,19 +89,24 @@ def text_to_pdf_bytes(text: str, title: str = "Document") -> bytes:
             # blank line => vertical space
             pdf.ln(6)
             continue
-        # width=0 means take full width minus margins; height=6 is a nice leading
+        # width=0 means take full width minus margins; height=6 is a nice leading.
+        # fpdf2 leaves x at the right margin after multi_cell, so reset it first.
+        pdf.set_x(pdf.l_margin)
         pdf.multi_cell(w=0, h=6, txt=line)
 
     # fpdf.output(dest="S") returns str in some versions, bytes in others
     out = pdf.output(dest="S")
-    return out if isinstance(out, (bytes, bytearray)) else out.encode("latin-1", "ignore")
+    # ... and fpdf2 returns a bytearray, which st.download_button rejects.
+    return bytes(out) if isinstance(out, (bytes, bytearray)) else out.encode("latin-1", "ignore")
 
 
+@traced("export.docx")
 def text_to_docx_bytes(text: str, title: str = "Document") -> bytes:
     """
     Create a simple .docx with a heading and paragraphs.
     Requires `python-docx`. If missing, returns a .txt-ish fallback in bytes.
     """
+    Document = _lazy("docx")
     if Document is None:
         return (f"{title}\n\n{text}").encode("utf-8")
 
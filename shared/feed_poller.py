@@ -0,0 +1,98 @@
+# shared/feed_poller.py
+from __future__ import annotations
+import random
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from .matcher import compile_keywords
+from .media_store import MediaStore, get_store
+
+JITTER = 0.1          # +/- fraction of each feed's interval
+MIN_INTERVAL_S = 60
+MAX_SLEEP_S = 30.0    # upper bound between due-checks so new feeds start promptly
+ERROR_BACKOFF_S = 300
+
+
+def _next_due(now: float, interval_s: float, jitter: float = JITTER) -> float:
+    interval_s = max(MIN_INTERVAL_S, float(interval_s))
+    return now + interval_s * (1.0 + random.uniform(-jitter, jitter))
+
+
+def poll_feed(store: MediaStore, feed: Dict[str, Any], now: Optional[float] = None) -> int:
+    """
+    Fetch one configured feed (conditional GET via stored ETag / Last-Modified),
+    ingest new entries and schedule the next poll. Returns new-item count.
+    """
+    now = time.time() if now is None else now
+    url = feed["url"]
+    try:
+        import feedparser  # optional, local only
+    except Exception:
+        store.mark_polled(url, now, now + ERROR_BACKOFF_S, error="feedparser not installed")
+        return 0
+    try:
+        d = feedparser.parse(url, etag=feed.get("etag"), modified=feed.get("modified"))
+        if getattr(d, "bozo", False) and not d.entries:
+            raise RuntimeError(str(getattr(d, "bozo_exception", "parse error")))
+        matcher = compile_keywords(feed.get("keywords") or "")
+        new = 0
+        if getattr(d, "status", 200) != 304:
+            new = store.ingest(url, d.entries, matcher=matcher, fetched=now)
+        modified = d.get("modified")
+        store.mark_polled(
+            url, now, _next_due(now, feed.get("interval_s") or MIN_INTERVAL_S),
+            etag=d.get("etag"), modified=str(modified) if modified else None,
+        )
+        return new
+    except Exception as e:
+        store.mark_polled(url, now, _next_due(now, ERROR_BACKOFF_S), error=str(e)[:500])
+        return 0
+
+
+class FeedPoller(threading.Thread):
+    """Daemon thread: polls due feeds, then sleeps until the next one is due (or `wake()`)."""
+
+    def __init__(self, store: MediaStore):
+        super().__init__(name="presence-feed-poller", daemon=True)
+        self.store = store
+        self._wake = threading.Event()
+        self._halt = threading.Event()
+        self.last_cycle: Optional[float] = None
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._halt.set()
+        self._wake.set()
+
+    def run(self) -> None:
+        while not self._halt.is_set():
+            now = time.time()
+            try:
+                for feed in self.store.due_feeds(now):
+                    if self._halt.is_set():
+                        break
+                    poll_feed(self.store, feed)
+            except Exception:
+                pass  # keep the thread alive; per-feed errors are recorded in the store
+            self.last_cycle = time.time()
+            nxt = self.store.next_due()
+            sleep_s = MAX_SLEEP_S if nxt is None else min(MAX_SLEEP_S, max(0.5, nxt - time.time()))
+            self._wake.wait(sleep_s)
+            self._wake.clear()
+
+
+_poller: Optional[FeedPoller] = None
+_poller_lock = threading.Lock()
+
+
+def ensure_poller(store: Optional[MediaStore] = None) -> FeedPoller:
+    """Start the process-wide poller once; later calls (every rerun) just return it."""
+    global _poller
+    with _poller_lock:
+        if _poller is None or not _poller.is_alive():
+            _poller = FeedPoller(store or get_store())
+            _poller.start()
+        return _poller
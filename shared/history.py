@@ -2,27 +2,146 @@
 from __future__ import annotations
 import json
 import time
-from typing import Any, Dict, List
+import uuid
+from typing import Any, Dict, List, Optional
 import streamlit as st
 
 _KEY = "presence_history_v1"
+_SYNCED = "_presence_history_synced"  # items of this workspace's backend list already in _KEY
+_CHECKED = "_presence_history_checked"
+_REMOTE = "_presence_history_remote"  # remote_key() resolved once per session
+_EPOCH = "_presence_history_epoch"    # generation of the backend list this session mirrors
+REFRESH_S = 2.0  # how often a session re-checks the backend for items other replicas added
+
+
+def remote_key() -> Optional[str]:
+    """Backend list holding this workspace's history (None when state is session-only or headless)."""
+    from . import state
+
+    wid = state.workspace_id()
+    return f"presence:{wid}:history" if wid and state.buffer() is not None else None
+
+
+def _epoch(key: str) -> str:
+    """
+    Current generation of a workspace's history. `clear` starts a new one, so
+    batches other replicas were still flushing land in the old list, not the new.
+    """
+    from . import state
+
+    return state.buffer().backend.get(f"{key}:epoch") or ""
+
+
+def _list_key(key: str, epoch: str) -> str:
+    return f"{key}:{epoch}" if epoch else key  # "": lists written before epochs existed
+
+
+def push_remote(key: str, item: Dict[str, Any]) -> None:
+    """Append to a workspace's history from any thread (background jobs)."""
+    from . import state
+
+    buf = state.buffer()
+    if buf is not None:
+        buf.rpush(_list_key(key, _epoch(key)), json.dumps(item, ensure_ascii=False))
+
 
 def _ensure() -> None:
+    # Read-through: the first access in a session loads the workspace's history once.
     if _KEY not in st.session_state:
-        st.session_state[_KEY] = []  # list[dict]
+        key = remote_key()
+        epoch = _epoch(key) if key else ""
+        items = _load(_list_key(key, epoch), 0) if key else []
+        st.session_state[_KEY] = items  # list[dict]
+        st.session_state[_SYNCED] = len(items)
+        st.session_state[_CHECKED] = time.time()
+        st.session_state[_REMOTE] = key
+        st.session_state[_EPOCH] = epoch
+
+
+def detach() -> None:
+    """Stop mirroring this session's history to the backend (it became unreachable)."""
+    st.session_state[_REMOTE] = None
+
+
+def _load(key: str, start: int) -> List[Dict[str, Any]]:
+    from . import state
+
+    out = []
+    for raw in state.buffer().backend.lrange(key, start, -1):
+        try:
+            out.append(json.loads(raw))
+        except ValueError:
+            continue
+    return out
+
+
+def sync(force: bool = False) -> int:
+    """
+    Pick up items another replica (or a background job) appended to this
+    workspace since the last check; at most every REFRESH_S unless `force`.
+    Called from `state.init()`. Returns how many items arrived.
+    """
+    _ensure()
+    key = st.session_state.get(_REMOTE)
+    if not key or (not force and time.time() - st.session_state.get(_CHECKED, 0) < REFRESH_S):
+        return 0
+    from . import state
+
+    st.session_state[_CHECKED] = time.time()
+    synced = st.session_state.get(_SYNCED, 0)
+    buf = state.buffer()
+    epoch = _epoch(key)
+    if epoch != st.session_state.get(_EPOCH, ""):
+        # Another replica cleared it (new generation): start over from the current list.
+        items = _load(_list_key(key, epoch), 0)
+        st.session_state[_KEY] = items
+        st.session_state[_SYNCED] = len(items)
+        st.session_state[_EPOCH] = epoch
+        return len(items)
+    lkey = _list_key(key, epoch)
+    # While our own writes are still buffered the backend indexes would not line up; next time.
+    if buf.pending(lkey):
+        return 0
+    n = buf.backend.llen(lkey)
+    if n < synced:
+        # Shorter than what we consumed (deleted outside `clear`): reload it.
+        items = _load(lkey, 0)
+        st.session_state[_KEY] = items
+        st.session_state[_SYNCED] = len(items)
+        return len(items)
+    if n == synced:
+        return 0
+    new = _load(lkey, synced)
+    st.session_state[_KEY].extend(new)
+    st.session_state[_SYNCED] = synced + len(new)
+    return len(new)
+
+
+def _push(items: List[Dict[str, Any]]) -> None:
+    key = st.session_state.get(_REMOTE)
+    if key:
+        from . import state
+
+        lkey = _list_key(key, st.session_state.get(_EPOCH, ""))
+        state.buffer().rpush(lkey, *(json.dumps(it, ensure_ascii=False) for it in items))
+        st.session_state[_SYNCED] = st.session_state.get(_SYNCED, 0) + len(items)
+
 
 def add(kind: str, content: str, meta: Dict[str, Any] | None = None, tags: List[str] | None = None) -> None:
     """Append a history item."""
-    _ensure()
-    st.session_state[_KEY].append(
-        {
-            "ts": time.time(),
-            "kind": kind,
-            "content": content,
-            "meta": meta or {},
-            "tags": tags or [],
-        }
-    )
+    items = st.session_state.get(_KEY)
+    if items is None:
+        _ensure()
+        items = st.session_state[_KEY]
+    item = {
+        "ts": time.time(),
+        "kind": kind,
+        "content": content,
+        "meta": meta or {},
+        "tags": tags or [],
+    }
+    items.append(item)
+    _push([item])
 
 # for backward-compat with pages that import add_history
 add_history = add
@@ -33,8 +152,35 @@ def get() -> List[Dict[str, Any]]:
 
 def clear() -> None:
     _ensure()
+    key = st.session_state.get(_REMOTE)
+    if key:
+        from . import state
+
+        buf, old = state.buffer(), _list_key(key, st.session_state.get(_EPOCH, ""))
+        epoch = uuid.uuid4().hex[:12]
+        buf.discard(old)
+        buf.backend.set_many({f"{key}:epoch": epoch})  # other sessions reload on their next sync
+        buf.backend.delete(old)
+        st.session_state[_EPOCH] = epoch
     st.session_state[_KEY] = []
+    st.session_state[_SYNCED] = 0
 
 def export_json() -> str:
     """Return the entire history as a UTF-8 JSON string."""
     return json.dumps(get(), ensure_ascii=False, indent=2)
+
+def import_json(text: str) -> int:
+    """Append items from an `export_json` dump; returns how many were added."""
+    items = json.loads(text or "[]")
+    if isinstance(items, dict):
+        items = [items]
+    _ensure()
+    added = [it for it in items if isinstance(it, dict)]
+    st.session_state[_KEY].extend(added)
+    _push(added)
+    return len(added)
+
+# names older pages use
+get_history = get
+export_json_str = export_json
+import_json_str = import_json
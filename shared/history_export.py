@@ -0,0 +1,215 @@
+# shared/history_export.py
+"""
+Columnar export of the generation history for analytics pipelines: items
+are flattened into a typed Arrow schema and streamed into Parquet one row
+group at a time. Incremental exports take only items newer than the last
+exported watermark (the largest `ts` written), which is stored per workspace
+and also recorded in the file's metadata.
+"""
+from __future__ import annotations
+import io
+import json
+import re
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+import streamlit as st
+
+from .tracing import traced
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:  # pyarrow not installed: JSON export only
+    pa = None
+    pq = None
+
+ROW_GROUP_SIZE = 10_000
+COMPRESSION = "zstd"
+# Top-level item keys with fixed columns; any other key is flattened like meta, as payload_<key>.
+CORE = ("ts", "kind", "content", "text", "tags", "meta")
+_WATERMARK = "_history_export_watermark"  # session: {"ts", "rows", "at"}
+_META_KEY = b"presence_history_export"
+_NAME = re.compile(r"[^0-9a-z_]+")
+_json = json.JSONEncoder(ensure_ascii=False, default=str).encode
+
+
+def available() -> bool:
+    return pq is not None
+
+
+def _column(prefix: str, key: str) -> str:
+    return prefix + (_NAME.sub("_", str(key).lower()).strip("_") or "field")
+
+
+def _infer(kinds: set) -> "pa.DataType":
+    # Scalars keep their type (ints widen to float when mixed); anything else is JSON text.
+    kinds = kinds - {type(None)}
+    if kinds == {bool}:
+        return pa.bool_()
+    if kinds and kinds <= {int}:
+        return pa.int64()
+    if kinds and kinds <= {int, float}:
+        return pa.float64()
+    return pa.string()
+
+
+@dataclass(frozen=True)
+class Flattened:
+    """Where each flattened column comes from: (column, "meta" | "payload", source key, type)."""
+    schema: "pa.Schema"
+    extra: List[tuple]
+
+
+def flatten_schema(items: Sequence[Dict[str, Any]]) -> Flattened:
+    """
+    Fixed columns (ts, kind, content, tags, meta_json) plus one typed column
+    per meta key (`meta_<key>`) and per extra top-level key (`payload_<key>`)
+    seen in `items`. Needs one pass over the keys before anything is written.
+    """
+    seen: Dict[tuple, set] = {}  # (where, key) -> value types
+    for it in items:
+        for k, v in (it.get("meta") or {}).items():
+            seen.setdefault(("meta", k), set()).add(type(v))
+        for k, v in it.items():
+            if k not in CORE:
+                seen.setdefault(("payload", k), set()).add(type(v))
+    fields = [
+        pa.field("ts", pa.timestamp("us", tz="UTC")),
+        pa.field("kind", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("content", pa.string()),
+        pa.field("tags", pa.list_(pa.string())),
+        pa.field("meta_json", pa.string()),
+    ]
+    names = {f.name for f in fields}
+    extra = []
+    for (where, key), kinds in seen.items():
+        name = _column(f"{where}_", key)
+        if name in names:
+            continue  # two keys that differ only in punctuation/case: the first wins, meta_json keeps both
+        names.add(name)
+        typ = _infer(kinds)
+        fields.append(pa.field(name, typ))
+        extra.append((name, where, key, typ))
+    return Flattened(pa.schema(fields), extra)
+
+
+def _text(v: Any) -> Optional[str]:
+    if v is None:
+        return None
+    return v if isinstance(v, str) else _json(v)
+
+
+def _batch(items: Sequence[Dict[str, Any]], flat: Flattened) -> "pa.RecordBatch":
+    cols: Dict[str, Any] = {
+        "ts": pa.array([int(float(it.get("ts") or 0) * 1_000_000) for it in items], pa.int64())
+                .cast(pa.timestamp("us", tz="UTC")),
+        "kind": pa.array([str(it.get("kind") or "") for it in items], pa.string()).dictionary_encode(),
+        "content": pa.array([_text(it.get("content", it.get("text"))) for it in items], pa.string()),
+        "tags": pa.array([[str(t) for t in it.get("tags") or []] for it in items], pa.list_(pa.string())),
+        "meta_json": pa.array([_text(it.get("meta") or {}) for it in items], pa.string()),
+    }
+    for name, where, key, typ in flat.extra:
+        src = ((it.get("meta") or {}) if where == "meta" else it for it in items)
+        vals = [d.get(key) for d in src]
+        if pa.types.is_string(typ):
+            vals = [_text(v) for v in vals]
+        elif pa.types.is_floating(typ):
+            vals = [None if v is None else float(v) for v in vals]
+        cols[name] = pa.array(vals, typ)
+    return pa.RecordBatch.from_arrays([cols[f.name] for f in flat.schema], schema=flat.schema)
+
+
+@dataclass
+class ExportResult:
+    rows: int
+    since: float        # exclusive lower bound on ts that was applied (0 = full export)
+    watermark: float    # largest ts written; `since` again when nothing was new
+
+
+def newer_than(items: Iterable[Dict[str, Any]], since: float) -> List[Dict[str, Any]]:
+    return [it for it in items if float(it.get("ts") or 0) > since]
+
+
+@traced("history.export_parquet")
+def write_parquet(items: Sequence[Dict[str, Any]], sink: Union[str, BinaryIO], since: float = 0.0,
+                  row_group_size: int = ROW_GROUP_SIZE, compression: str = COMPRESSION) -> ExportResult:
+    """
+    Write history `items` with ts > `since` to Parquet at `sink` (path or
+    binary file), converting and writing `row_group_size` items at a time so
+    only one row group is materialized in Arrow at once.
+    """
+    if pq is None:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package.")
+    items = newer_than(items, since) if since else list(items)
+    flat = flatten_schema(items)
+    watermark = max((float(it.get("ts") or 0) for it in items), default=since)
+    meta = {"since": since, "watermark": watermark, "rows": len(items), "exported_at": time.time()}
+    schema = flat.schema.with_metadata({_META_KEY: json.dumps(meta).encode("utf-8")})
+    with pq.ParquetWriter(sink, schema, compression=compression) as writer:
+        for batch in _chunks(items, row_group_size):
+            writer.write_batch(_batch(batch, flat), row_group_size=row_group_size)
+    return ExportResult(rows=len(items), since=since, watermark=watermark)
+
+
+def _chunks(items: Sequence[Dict[str, Any]], n: int) -> Iterator[Sequence[Dict[str, Any]]]:
+    for i in range(0, len(items), max(1, int(n))):
+        yield items[i:i + n]
+
+
+def read_watermark(source: Union[str, BinaryIO]) -> Optional[float]:
+    """Watermark recorded in a file written by `write_parquet` (None for other files)."""
+    if pq is None:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package.")
+    raw = (pq.read_schema(source).metadata or {}).get(_META_KEY)
+    return json.loads(raw)["watermark"] if raw else None
+
+
+# ---- per-workspace watermark --------------------------------------------------
+
+def _remote_key() -> Optional[str]:
+    from . import history
+
+    key = history.remote_key()
+    return key + ":export" if key else None
+
+
+def last_export() -> Dict[str, float]:
+    """{"ts": watermark, "rows", "at"} of this workspace's last incremental export ({} if none)."""
+    info = st.session_state.get(_WATERMARK)
+    if info is None:
+        info = {}
+        key = _remote_key()
+        if key:
+            from . import state
+
+            try:
+                info = json.loads(state.buffer().backend.get(key) or "{}")
+            except ValueError:
+                info = {}
+        st.session_state[_WATERMARK] = info
+    return info
+
+
+def commit(result: ExportResult) -> None:
+    """Advance the watermark once an incremental export was actually delivered."""
+    if result.watermark <= last_export().get("ts", 0.0):
+        return
+    info = {"ts": result.watermark, "rows": result.rows, "at": time.time()}
+    st.session_state[_WATERMARK] = info
+    key = _remote_key()
+    if key:
+        from . import state
+
+        state.buffer().set(key, json.dumps(info))
+
+
+def export_bytes(incremental: bool = False, row_group_size: int = ROW_GROUP_SIZE) -> tuple:
+    """This session's history as Parquet bytes and the ExportResult (watermark not yet committed)."""
+    from . import history
+
+    buf = io.BytesIO()
+    since = last_export().get("ts", 0.0) if incremental else 0.0
+    result = write_parquet(history.get(), buf, since=since, row_group_size=row_group_size)
+    return buf.getvalue(), result
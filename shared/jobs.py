@@ -0,0 +1,218 @@
+# shared/jobs.py
+from __future__ import annotations
+import contextvars
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+# Global cap on concurrently running jobs across all sessions; further
+# submissions queue in the pool.
+MAX_WORKERS = int(os.environ.get("PRESENCE_JOB_WORKERS", "4"))
+JOB_TTL_S = 3600  # finished jobs are forgotten after this long
+
+QUEUED, RUNNING, DONE, ERROR, CANCELLED = "queued", "running", "done", "error", "cancelled"
+
+
+@dataclass
+class Job:
+    id: str
+    kind: str
+    label: str
+    owner: str                         # session id that submitted it
+    status: str = QUEUED
+    progress: float = 0.0
+    message: str = ""
+    result: Any = None
+    partial: List[Any] = field(default_factory=list)  # pieces streamed before `result` (see JobContext.emit)
+    error: str = ""
+    history: Optional[Dict[str, Any]] = None  # item to append to the owner's history
+    history_key: str = ""              # owner's shared-backend history list, if any
+    synced: bool = False               # owner session has pulled the backend copy
+    delivered: bool = False
+    cancel_requested: bool = False
+    created: float = field(default_factory=time.time)
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+    @property
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.time()) - self.started
+
+
+class JobContext:
+    """Handed to the job function: report progress, check for cancellation, attach a history item."""
+
+    def __init__(self, job: Job) -> None:
+        self._job = job
+
+    @property
+    def cancelled(self) -> bool:
+        return self._job.cancel_requested
+
+    def progress(self, fraction: float, message: str = "") -> None:
+        self._job.progress = max(0.0, min(1.0, float(fraction)))
+        if message:
+            self._job.message = message
+
+    def emit(self, item: Any) -> None:
+        """Publish one finished piece (a variant, a hook) for the page to render while the job runs."""
+        self._job.partial.append(item)
+
+    def record(self, kind: str, content: str, meta: Optional[Dict[str, Any]] = None,
+               tags: Optional[List[str]] = None) -> None:
+        """Deliver `content` into the owner's history once the job finishes (see `deliver`)."""
+        self._job.history = {"kind": kind, "content": content, "meta": meta or {}, "tags": tags or []}
+
+
+class JobManager:
+    """
+    Process-local job queue on a shared thread pool. Jobs outlive the page
+    (and rerun) that submitted them; results reach the session's history
+    the next time any page of that session calls `deliver`.
+    """
+
+    def __init__(self, max_workers: int = MAX_WORKERS) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="presence-job")
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn: Callable[..., Any], *args: Any, owner: str, label: str = "",
+               history_key: str = "", **kwargs: Any) -> str:
+        """Queue `fn(ctx, *args, **kwargs)`; returns the job id immediately."""
+        job = Job(id=uuid.uuid4().hex[:12], kind=kind, label=label or kind, owner=owner,
+                  history_key=history_key)
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        # In the submitter's context, so the job's spans nest under the rerun that queued it.
+        self._pool.submit(contextvars.copy_context().run, self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job: Job, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        if job.cancel_requested:
+            job.status, job.finished = CANCELLED, time.time()
+            return
+        job.status, job.started = RUNNING, time.time()
+        from .tracing import span
+
+        try:
+            with span("job", kind=job.kind, job_id=job.id):
+                job.result = fn(JobContext(job), *args, **kwargs)
+            status = CANCELLED if job.cancel_requested else DONE
+            if status == DONE and job.history is not None and job.history_key and self.claim(job):
+                # Straight into the shared backend: the result survives even if the
+                # owner's next rerun lands on another replica.
+                from .history import push_remote
+
+                h = job.history
+                push_remote(job.history_key, {"ts": time.time(), "kind": h["kind"], "content": h["content"],
+                                              "meta": {**h["meta"], "job_id": job.id}, "tags": h["tags"]})
+            # Published last, so `deliver()` never sees DONE before the item is claimed.
+            job.progress = 1.0 if status == DONE else job.progress
+            job.status = status
+        except Exception as e:
+            job.status, job.error = ERROR, f"{type(e).__name__}: {e}"
+            job.message = traceback.format_exc(limit=3)
+        finally:
+            job.finished = time.time()
+
+    def claim(self, job: Job) -> bool:
+        """Mark `job`'s history item as delivered; True for exactly one caller."""
+        with self._lock:
+            if job.delivered:
+                return False
+            job.delivered = True
+            return True
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, owner: Optional[str] = None, kind: Optional[str] = None) -> List[Job]:
+        """Jobs, newest first, optionally for one session and/or kind."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values()
+                    if (owner is None or j.owner == owner) and (kind is None or j.kind == kind)]
+        return sorted(jobs, key=lambda j: j.created, reverse=True)
+
+    def cancel(self, job_id: str) -> bool:
+        """Ask a job to stop; queued jobs never start, running ones see `ctx.cancelled`."""
+        job = self.get(job_id)
+        if job is None or not job.active:
+            return False
+        job.cancel_requested = True
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        return {s: sum(j.status == s for j in jobs) for s in (QUEUED, RUNNING, DONE, ERROR, CANCELLED)}
+
+    def _prune(self) -> None:
+        now = time.time()
+        for jid in [jid for jid, j in self._jobs.items()
+                    if j.finished and now - j.finished > JOB_TTL_S and (j.delivered or j.history is None)]:
+            del self._jobs[jid]
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> JobManager:
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
+
+
+def submit(kind: str, fn: Callable[..., Any], *args: Any, label: str = "", **kwargs: Any) -> str:
+    """Submit on behalf of the current Streamlit session."""
+    from .history import remote_key
+    from .memprof import session_id
+
+    return get_manager().submit(kind, fn, *args, owner=session_id(), label=label,
+                                history_key=remote_key() or "", **kwargs)
+
+
+def my_jobs(kind: Optional[str] = None) -> List[Job]:
+    from .memprof import session_id
+
+    return get_manager().list(owner=session_id(), kind=kind)
+
+
+def deliver() -> int:
+    """
+    Append finished jobs' history items to this session's history (runs on
+    the script thread, which owns session_state). Called from `state.init()`.
+    With a shared backend the job already wrote the item and `history.sync`
+    picks it up.
+    """
+    from . import history, state
+
+    n = 0
+    remote = [j for j in my_jobs() if j.status == DONE and j.history_key and j.delivered and not j.synced]
+    if remote:
+        state.buffer().flush()  # the job's item may still be buffered
+        history.sync(force=True)
+        for job in remote:
+            job.synced = True
+        n += len(remote)
+    for job in my_jobs():
+        if job.status == DONE and job.history is not None and not job.delivered and get_manager().claim(job):
+            h = job.history
+            history.add(h["kind"], h["content"], meta={**h["meta"], "job_id": job.id}, tags=h["tags"])
+            n += 1
+    return n
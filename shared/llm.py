@@ -1,44 +1,360 @@
 # shared/llm.py
 from __future__ import annotations
-from typing import Optional
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional, Tuple
 import streamlit as st
 
+from . import router, structured, tracing
+
 SYSTEM_PROMPT = (
     "You are an expert PR & Marketing copywriter. "
     "Write clear, compelling, brand-safe copy. Follow brand rules if provided. "
     "Return copy only."
 )
 
+OFFLINE_DRAFT = (
+    "Draft:\n"
+    "• Opening line tailored to the audience.\n"
+    "• Benefit/feature #1\n"
+    "• Benefit/feature #2\n"
+    "• Clear CTA"
+)
+
+# (key, base_url) -> client; one client (and its connection pool) per process.
+_clients: Dict[Tuple[str, str], object] = {}
+_clients_lock = threading.Lock()
+
+# (prompt, cache model, temperature, scope) of cached calls in flight -> set once the
+# output is stored; an identical request (e.g. the click a prefetch anticipated)
+# waits for it instead of paying for the same completion twice.
+_inflight: Dict[Tuple[str, str, float, str], threading.Event] = {}
+_inflight_lock = threading.Lock()
+
+
+def headless() -> bool:
+    """True outside a Streamlit script run (CLI batch runs, benchmarks)."""
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+        return get_script_run_ctx(suppress_warning=True) is None
+    except Exception:
+        return True
+
+
+def _api_key() -> str:
+    # Headless runs take the key from the environment only: loading st.secrets
+    # copies root-level secrets into os.environ, so an empty secret there
+    # would wipe the key the CLI was started with.
+    if headless():
+        return os.environ.get("OPENAI_API_KEY", "")
+    try:
+        return st.secrets.get("OPENAI_API_KEY", "") or os.environ.get("OPENAI_API_KEY", "")
+    except Exception:  # no secrets.toml
+        return os.environ.get("OPENAI_API_KEY", "")
+
+
 def _client():
     # Lazy import, no crash if missing
-    key = st.secrets.get("OPENAI_API_KEY", "")
+    key = _api_key()
     if not key:
         return None, False
-    try:
-        from openai import OpenAI
-        return OpenAI(api_key=key), True
-    except Exception:
-        return None, False
+    # OPENAI_BASE_URL lets the batch runner point at a local stub server.
+    ident = (key, os.environ.get("OPENAI_BASE_URL", ""))
+    with _clients_lock:
+        client = _clients.get(ident)
+        if client is None:
+            try:
+                from openai import OpenAI
+                client = _clients[ident] = OpenAI(api_key=key, base_url=ident[1] or None)
+            except Exception:
+                return None, False
+    return client, True
 
-def llm_copy(user_prompt: str, model: str = "gpt-4o-mini",
-             temperature: float = 0.6, max_tokens: int = 800) -> str:
-    client, ok = _client()
-    if not ok or client is None:
-        # Offline fallback, simple template
-        return (
-            "Draft:\n"
-            "• Opening line tailored to the audience.\n"
-            "• Benefit/feature #1\n"
-            "• Benefit/feature #2\n"
-            "• Clear CTA"
-        )
-    resp = client.chat.completions.create(
+def available() -> bool:
+    """An API key is configured (otherwise llm_copy returns the offline template)."""
+    return _client()[1]
+
+
+def check_brand(text: str):
+    """Scan generated copy against the active profile's brand rules and flag violations inline."""
+    from . import compliance, state, ui
+
+    report = compliance.check_text(text, state.company_version().rules)
+    st.session_state["last_compliance"] = report
+    ui.compliance_flags(report)
+    return report
+
+
+def _system(context: Optional[str], cache_scope: str) -> Tuple[str, str]:
+    """System prompt with the company context block, and the cache scope keyed on that context."""
+    if context is None and not headless():
+        from . import state
+        context = state.company_version().context
+    system = SYSTEM_PROMPT + (f"\n\nActive company profile:\n{context}" if context else "")
+    if context:
+        # Same request for a different client (or profile version) is a different answer.
+        cache_scope = f"{cache_scope}|ctx:{hashlib.sha1(context.encode('utf-8')).hexdigest()[:12]}"
+    return system, cache_scope
+
+
+def _create(client, system: str, user_prompt: str, model: str, temperature: float, max_tokens: int,
+            response_format: Optional[Dict[str, Any]] = None,
+            on_delta: Optional[Callable[[str], None]] = None) -> Tuple[str, Dict[str, int]]:
+    """One chat completion and its token usage; streamed through `on_delta` when given."""
+    kw: Dict[str, Any] = dict(
         model=model,
         messages=[
-            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "system", "content": system},
             {"role": "user", "content": user_prompt},
         ],
         temperature=temperature,
         max_tokens=max_tokens,
     )
-    return (resp.choices[0].message.content or "").strip()
+    if on_delta is not None:
+        kw["stream"] = True
+        kw["stream_options"] = {"include_usage": True}  # usage arrives on the last chunk
+    if response_format:
+        kw["response_format"] = response_format
+    try:
+        resp = client.chat.completions.create(**kw)
+    except Exception as e:
+        # Endpoints without structured outputs reject the request up front;
+        # the prompt states the format too, so ask again without it.
+        if not response_format or "response_format" not in str(e):
+            raise
+        kw.pop("response_format")
+        resp = client.chat.completions.create(**kw)
+    if on_delta is None or hasattr(resp, "choices"):  # not streamed (e.g. a stub client)
+        out = resp.choices[0].message.content or ""
+        if on_delta is not None:
+            on_delta(out)
+        return out, _usage(resp)
+    parts: List[str] = []
+    usage: Dict[str, int] = {}
+    for chunk in resp:
+        usage = _usage(chunk) or usage
+        delta = chunk.choices[0].delta.content if chunk.choices else None
+        if delta:
+            parts.append(delta)
+            on_delta(delta)
+    return "".join(parts), usage
+
+
+def _usage(resp) -> Dict[str, int]:
+    u = getattr(resp, "usage", None)
+    if u is None:
+        return {}
+    return {k: int(getattr(u, k, 0) or 0) for k in ("prompt_tokens", "completion_tokens")}
+
+
+def _routed(client, system: str, user_prompt: str, route: router.Route, temperature: float,
+            **kw: Any) -> str:
+    """`_create` with the routed model, its latency and usage recorded for the router."""
+    with tracing.span("llm.call", model=route.model, task_class=route.task_class,
+                      max_tokens=route.max_tokens, stream=kw.get("on_delta") is not None) as sp:
+        t0 = time.perf_counter()
+        try:
+            out, usage = _create(client, system, user_prompt, route.model, temperature, route.max_tokens, **kw)
+        except Exception as e:
+            router.get_router().record(route, time.perf_counter() - t0, error=f"{type(e).__name__}: {e}")
+            raise
+        router.get_router().record(route, time.perf_counter() - t0, usage)
+        sp.set(**usage)
+        return out
+
+
+def _plan(user_prompt: str, model: Optional[str], max_tokens: Optional[int], cache_scope: str,
+          context: Optional[str], task: str) -> Tuple[str, str, router.Route, str]:
+    """System prompt, cache scope, route and cache model of an `llm_copy` call."""
+    system, cache_scope = _system(context, cache_scope)
+    route = router.get_router().route(system + user_prompt, task, model, max_tokens)
+    # Routed calls share cache entries across the models of their task class.
+    return system, cache_scope, route, model or f"auto:{route.task_class}"
+
+
+def cached(user_prompt: str, temperature: float = 0.6, cache_scope: str = "",
+           context: Optional[str] = None, task: str = "", model: Optional[str] = None,
+           semantic: bool = False) -> bool:
+    """Whether `llm_copy` with these arguments would be answered from the cache."""
+    from . import semantic as sem
+
+    _, cache_scope, _, cache_model = _plan(user_prompt, model, None, cache_scope, context, task)
+    return sem.get_cache().lookup(user_prompt, cache_model, temperature, cache_scope,
+                                  semantic=semantic) is not None
+
+
+def estimate_cost(user_prompt: str, context: Optional[str] = None, task: str = "",
+                  model: Optional[str] = None, max_tokens: Optional[int] = None) -> float:
+    """Worst-case list-price USD of an `llm_copy` call (the routed model writing max_tokens)."""
+    system, _, route, _ = _plan(user_prompt, model, max_tokens, "", context, task)
+    return router.cost_usd(route.model, router.estimate_tokens(system + user_prompt), route.max_tokens)
+
+
+@tracing.traced("llm.copy")
+def llm_copy(user_prompt: str, model: Optional[str] = None,
+             temperature: float = 0.6, max_tokens: Optional[int] = None, brand_check: bool = True,
+             use_cache: bool = True, cache_scope: str = "", context: Optional[str] = None,
+             task: str = "", semantic: bool = False) -> str:
+    """
+    One completion. With `use_cache`, the same prompt asked earlier (same
+    model/temperature/`cache_scope`) is answered from the local cache instead
+    of a new paid call. `semantic=True` also reuses a near-identical prompt in
+    that scope (cosine >= semantic.CACHE_THRESHOLD); only opt in for template
+    prompts whose free-text inputs are all in `cache_scope`.
+
+    `context` is the company context block sent with the system prompt; by
+    default the active profile's precomputed block (none when headless).
+
+    `model` and `max_tokens` default to what `router` picks for `task` (a
+    page / prompt-builder tag, e.g. "strategy") and the prompt size.
+    """
+    from . import semantic as sem
+
+    system, cache_scope, route, cache_model = _plan(user_prompt, model, max_tokens, cache_scope, context, task)
+    sp = tracing.current()
+    sp.set(task=task, task_class=route.task_class)
+    cache = sem.get_cache() if use_cache else None
+    key = (user_prompt, cache_model, temperature, cache_scope)
+    if cache is not None:
+        with tracing.span("llm.cache_lookup"):
+            hit = cache.lookup(user_prompt, cache_model, temperature, cache_scope, semantic=semantic)
+        pending = _inflight.get(key) if hit is None else None
+        if pending is not None:
+            with tracing.span("llm.wait_inflight"):
+                pending.wait(route.slo)
+            hit = cache.lookup(user_prompt, cache_model, temperature, cache_scope, semantic=semantic)
+        if hit is not None:
+            sp.set(source="cache")
+            if headless():
+                return hit.text
+            if hit.prompt == user_prompt:
+                st.caption("♻️ Reused the earlier generation for this same request.")
+            else:
+                st.caption(f"♻️ Reused an earlier generation for a near-identical request (similarity {hit.score:.2f}).")
+            if brand_check:
+                try:
+                    check_brand(hit.text)
+                except Exception:
+                    pass
+            return hit.text
+
+    client, ok = _client()
+    if not ok or client is None:
+        # Offline fallback, simple template
+        sp.set(source="offline")
+        return OFFLINE_DRAFT
+    if cache is None:
+        out = _routed(client, system, user_prompt, route, temperature).strip()
+    else:
+        done = threading.Event()
+        with _inflight_lock:
+            _inflight[key] = done
+        try:
+            out = _routed(client, system, user_prompt, route, temperature).strip()
+            cache.store(user_prompt, cache_model, temperature, out, cache_scope)
+        finally:
+            with _inflight_lock:
+                if _inflight.get(key) is done:
+                    del _inflight[key]
+            done.set()
+    if brand_check and not headless():
+        try:
+            check_brand(out)
+        except Exception:
+            pass  # flags are advisory; never block the copy
+    return out
+
+
+@tracing.traced("llm.json")
+def llm_json(user_prompt: str, schema: structured.Schema, model: Optional[str] = None,
+             temperature: float = 0.6, max_tokens: Optional[int] = None, brand_check: bool = True,
+             use_cache: bool = True, cache_scope: str = "", context: Optional[str] = None, task: str = "",
+             on_item: Optional[Callable[[int, Dict[str, str]], None]] = None,
+             semantic: bool = False) -> structured.StructuredResult:
+    """
+    Like `llm_copy`, but the model must answer in `schema`'s JSON shape.
+
+    The completion is streamed and `on_item(index, item)` fires as soon as each
+    list item's object closes, so pages can render variants one by one. Broken
+    JSON is repaired locally (closed items are kept); if items are still
+    missing, one follow-up call asks for just those instead of regenerating all.
+    """
+    from . import semantic as sem
+
+    system, cache_scope = _system(context, cache_scope)
+    cache_scope = f"{cache_scope}|json:{schema.name}:{schema.min_items}"
+    prompt = f"{user_prompt}\n\n{schema.instructions()}"
+    route = router.get_router().route(system + prompt, task, model, max_tokens)
+    cache_model = model or f"auto:{route.task_class}"
+    tracing.current().set(task=task, task_class=route.task_class, schema=schema.name)
+    emitted: List[Dict[str, str]] = []
+
+    def _emit(items: List[Dict[str, str]]) -> None:
+        for item in items:
+            if schema.max_items and len(emitted) >= schema.max_items:
+                return
+            emitted.append(item)
+            if on_item is not None:
+                on_item(len(emitted) - 1, item)
+
+    def _finish(res: structured.StructuredResult) -> structured.StructuredResult:
+        tracing.current().set(source=res.source, items=len(res.items), topped_up=res.topped_up)
+        _emit(res.items[len(emitted):])
+        if brand_check and not headless() and res.items:
+            try:
+                check_brand("\n\n".join("\n".join(v for v in it.values() if v) for it in res.items))
+            except Exception:
+                pass
+        return res
+
+    cache = sem.get_cache() if use_cache else None
+    if cache is not None:
+        with tracing.span("llm.cache_lookup"):
+            hit = cache.lookup(prompt, cache_model, temperature, cache_scope, semantic=semantic)
+        if hit is not None:
+            res = structured.parse(hit.text, schema)
+            if len(res.items) >= schema.min_items:
+                res.source = "cache"
+                return _finish(res)
+
+    client, ok = _client()
+    if not ok or client is None:
+        # One template item, like llm_copy's offline draft.
+        items = [{f: ("Draft" if i == 0 else OFFLINE_DRAFT if i == 1 else "") for i, f in enumerate(schema.fields)}]
+        return _finish(structured.StructuredResult(items, raw="", source="offline"))
+
+    stream = structured.ItemStream()
+    rf = schema.response_format()
+    raw = _routed(client, system, prompt, route, temperature, response_format=rf,
+                  on_delta=lambda d: _emit(structured.coerce(stream.feed(d), schema)))
+    res = structured.parse(raw, schema)
+    missing = schema.min_items - len(res.items)
+    if missing > 0:
+        # Targeted repair: ask only for the items that did not survive parsing.
+        part = structured.Schema(schema.name, schema.key, schema.fields, min_items=missing, max_items=missing)
+        have = json.dumps({schema.key: res.items}, ensure_ascii=False)
+        follow_up = (f"{user_prompt}\n\nThese items are already written:\n{have}\n\n"
+                     f"Write only the {missing} remaining item(s), different from those.\n{part.instructions()}")
+        # The earlier items were emitted already; stream the new ones after them.
+        _emit(res.items[len(emitted):])
+        base = len(res.items)
+        more_stream = structured.ItemStream()
+        try:
+            share = max(200, route.max_tokens * missing // max(1, schema.min_items) + 100)
+            more_raw = _routed(client, system, follow_up, replace(route, max_tokens=share), temperature,
+                               response_format=part.response_format(),
+                               on_delta=lambda d: _emit(structured.coerce(more_stream.feed(d), part)))
+            more = structured.parse(more_raw, part).items
+        except Exception:
+            more = []
+        res.items = (res.items + more)[: schema.max_items] if schema.max_items else res.items + more
+        res.topped_up = len(res.items) - base
+        res.repaired = True
+    if cache is not None and len(res.items) >= schema.min_items:
+        cache.store(prompt, cache_model, temperature, json.dumps({schema.key: res.items}, ensure_ascii=False),
+                    cache_scope)
+    return _finish(res)
@@ -0,0 +1,152 @@
+# shared/matcher.py
+from __future__ import annotations
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# Fields we look at on a feed entry, in display order.
+DEFAULT_FIELDS: Tuple[str, ...] = ("title", "summary", "content")
+
+_TOKEN = re.compile(r'\s*(-?\s*"[^"]+"|[^,]+)')
+
+
+def parse_keywords(spec: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    """
+    Split a comma-separated keyword spec into (include, exclude) term tuples.
+      - `acme, robohub`        -> two include terms
+      - `"series b"`           -> a quoted phrase (commas allowed inside quotes)
+      - `-layoffs`, `-"recall"` -> negative terms
+    Terms are lower-cased and de-duplicated, order preserved.
+    """
+    inc: List[str] = []
+    exc: List[str] = []
+    for raw in _TOKEN.findall(spec or ""):
+        tok = raw.strip()
+        neg = tok.startswith("-")
+        if neg:
+            tok = tok[1:].strip()
+        tok = " ".join(tok.strip('"').lower().split())
+        if not tok:
+            continue
+        bucket = exc if neg else inc
+        if tok not in bucket:
+            bucket.append(tok)
+    return tuple(inc), tuple(exc)
+
+
+def _alternation(terms: Iterable[str], whole_words: bool) -> Optional[re.Pattern]:
+    # Longest first so "robohub 2.0" wins over "robohub" at the same offset.
+    parts = []
+    for t in sorted(set(terms), key=len, reverse=True):
+        body = r"\s+".join(re.escape(w) for w in t.split())
+        if whole_words:
+            # \b only works next to word chars; fall back to look-arounds for
+            # terms that start/end with punctuation (e.g. "c++", ".net").
+            left = r"\b" if t[0].isalnum() or t[0] == "_" else r"(?<!\w)"
+            right = r"\b" if t[-1].isalnum() or t[-1] == "_" else r"(?!\w)"
+            body = f"{left}{body}{right}"
+        parts.append(f"(?:{body})")
+    if not parts:
+        return None
+    return re.compile("|".join(parts), re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class KeywordMatcher:
+    """
+    Keyword set compiled into one alternation regex (one scan per field,
+    independent of the number of terms). Build with `compile_keywords`.
+    """
+    include: Tuple[str, ...]
+    exclude: Tuple[str, ...]
+    whole_words: bool = True
+    fields: Tuple[str, ...] = DEFAULT_FIELDS
+    _inc_re: Optional[re.Pattern] = field(default=None, repr=False, compare=False)
+    _exc_re: Optional[re.Pattern] = field(default=None, repr=False, compare=False)
+
+    @property
+    def empty(self) -> bool:
+        return not self.include and not self.exclude
+
+    def text_of(self, entry: Any) -> str:
+        """Concatenate the configured fields of a feed entry (dict-like)."""
+        chunks: List[str] = []
+        for f in self.fields:
+            val = entry.get(f) if hasattr(entry, "get") else getattr(entry, f, None)
+            if not val:
+                continue
+            if isinstance(val, list):
+                # feedparser `content` is a list of {"value": ...}
+                val = " ".join(str(v.get("value", "")) if isinstance(v, dict) else str(v) for v in val)
+            chunks.append(str(val))
+        return "\n".join(chunks)
+
+    def hits(self, text: str) -> List[str]:
+        """Include terms found in `text` (canonical lower-case form, first-seen order)."""
+        if self._inc_re is None or not text:
+            return []
+        seen: Dict[str, None] = {}
+        for m in self._inc_re.finditer(text):
+            seen.setdefault(" ".join(m.group(0).lower().split()), None)
+        return list(seen)
+
+    def spans(self, text: str) -> List[Tuple[str, int, int]]:
+        """Every include-term occurrence as (canonical term, start, end)."""
+        if self._inc_re is None or not text:
+            return []
+        return [(" ".join(m.group(0).lower().split()), m.start(), m.end()) for m in self._inc_re.finditer(text)]
+
+    def excluded(self, text: str) -> bool:
+        return bool(self._exc_re is not None and text and self._exc_re.search(text))
+
+    def match(self, entry: Any) -> Optional[List[str]]:
+        """
+        Returns the list of include terms that hit, or None if the entry is
+        filtered out. With no include terms every non-excluded entry passes
+        (with an empty hit list).
+        """
+        text = self.text_of(entry)
+        if self.excluded(text):
+            return None
+        found = self.hits(text)
+        if self.include and not found:
+            return None
+        return found
+
+    def filter(self, entries: Iterable[Any]) -> List[Tuple[Any, List[str]]]:
+        """Batch form of `match`: [(entry, hits), ...] for entries that pass."""
+        out: List[Tuple[Any, List[str]]] = []
+        for e in entries:
+            found = self.match(e)
+            if found is not None:
+                out.append((e, found))
+        return out
+
+
+@lru_cache(maxsize=64)
+def _compile(include: Tuple[str, ...], exclude: Tuple[str, ...],
+             whole_words: bool, fields: Tuple[str, ...]) -> KeywordMatcher:
+    return KeywordMatcher(
+        include=include,
+        exclude=exclude,
+        whole_words=whole_words,
+        fields=fields,
+        _inc_re=_alternation(include, whole_words),
+        _exc_re=_alternation(exclude, whole_words),
+    )
+
+
+def compile_keywords(spec: str, whole_words: bool = True,
+                     fields: Iterable[str] = DEFAULT_FIELDS) -> KeywordMatcher:
+    """
+    Compile a keyword spec (see `parse_keywords`) once; repeated calls with the
+    same spec/options return the cached matcher, so reruns don't recompile.
+    """
+    inc, exc = parse_keywords(spec)
+    return _compile(inc, exc, bool(whole_words), tuple(fields))
+
+
+def compile_terms(terms: Iterable[str], whole_words: bool = True) -> Optional[re.Pattern]:
+    """One case-insensitive alternation over literal `terms` (None when there are none)."""
+    return _alternation([" ".join(t.lower().split()) for t in terms if t and t.strip()], whole_words)
@@ -0,0 +1,597 @@
+# shared/media_store.py
+from __future__ import annotations
+import calendar
+import re
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from . import tagging
+from .dedupe import entry_source, item_key
+from .matcher import KeywordMatcher
+from .media_trends import DIM_KEYWORD, DIM_OUTLET, RESOLUTIONS, bucket_counts
+
+DEFAULT_PATH = Path("data") / "media_monitor.sqlite"
+DEFAULT_INTERVAL_S = 15 * 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS feeds (
+    url         TEXT PRIMARY KEY,
+    interval_s  INTEGER NOT NULL DEFAULT 900,
+    keywords    TEXT NOT NULL DEFAULT '',
+    etag        TEXT,
+    modified    TEXT,
+    last_polled REAL,
+    next_due    REAL NOT NULL DEFAULT 0,
+    last_error  TEXT
+);
+CREATE TABLE IF NOT EXISTS items (
+    key       TEXT PRIMARY KEY,
+    feed      TEXT NOT NULL,
+    guid      TEXT,
+    title     TEXT NOT NULL DEFAULT '',
+    summary   TEXT NOT NULL DEFAULT '',
+    link      TEXT NOT NULL DEFAULT '',
+    source    TEXT NOT NULL DEFAULT '',
+    published REAL NOT NULL,
+    fetched   REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_items_published ON items(published);
+CREATE INDEX IF NOT EXISTS idx_items_feed_published ON items(feed, published);
+CREATE INDEX IF NOT EXISTS idx_items_source_published ON items(source, published);
+CREATE TABLE IF NOT EXISTS item_keywords (
+    key     TEXT NOT NULL,
+    keyword TEXT NOT NULL,
+    PRIMARY KEY (key, keyword)
+);
+CREATE INDEX IF NOT EXISTS idx_item_keywords_keyword ON item_keywords(keyword, key);
+CREATE TABLE IF NOT EXISTS meta (
+    k TEXT PRIMARY KEY,
+    v TEXT
+);
+"""
+
+# Full-text archive over the items table (external content, kept in sync by triggers).
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(
+    title, summary, source,
+    content='items', content_rowid='rowid', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS items_ai AFTER INSERT ON items BEGIN
+    INSERT INTO items_fts(rowid, title, summary, source) VALUES (new.rowid, new.title, new.summary, new.source);
+END;
+CREATE TRIGGER IF NOT EXISTS items_ad AFTER DELETE ON items BEGIN
+    INSERT INTO items_fts(items_fts, rowid, title, summary, source)
+    VALUES ('delete', old.rowid, old.title, old.summary, old.source);
+END;
+"""
+
+# Rolling time-bucketed counters per keyword / outlet, maintained on ingest.
+_TREND_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trend_counts (
+    dim    TEXT NOT NULL,
+    key    TEXT NOT NULL,
+    res    TEXT NOT NULL,
+    bucket INTEGER NOT NULL,
+    n      INTEGER NOT NULL,
+    PRIMARY KEY (dim, res, key, bucket)
+);
+CREATE INDEX IF NOT EXISTS idx_trend_counts_bucket ON trend_counts(dim, res, bucket);
+"""
+
+# Local sentiment / entity tags (shared/tagging.py), written on ingest.
+_TAG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS item_tags (
+    key       TEXT PRIMARY KEY,
+    sentiment REAL NOT NULL,
+    label     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_item_tags_label ON item_tags(label, key);
+CREATE INDEX IF NOT EXISTS idx_item_tags_sentiment ON item_tags(sentiment);
+CREATE TABLE IF NOT EXISTS item_entities (
+    key    TEXT NOT NULL,
+    entity TEXT NOT NULL,
+    kind   TEXT NOT NULL,
+    PRIMARY KEY (key, entity)
+);
+CREATE INDEX IF NOT EXISTS idx_item_entities_entity ON item_entities(entity, key);
+CREATE INDEX IF NOT EXISTS idx_item_entities_kind ON item_entities(kind, key);
+"""
+
+# Sort orders accepted by `MediaStore.query`.
+ORDERS = {
+    "newest": "i.published DESC",
+    "most negative": "t.sentiment ASC, i.published DESC",
+    "most positive": "t.sentiment DESC, i.published DESC",
+}
+
+_FTS_TOKEN = re.compile(r'"[^"]+"|\S+')
+
+
+def fts_query(text: str) -> str:
+    """
+    Turn free text into a safe FTS5 query: every word / "quoted phrase" is
+    quoted (so punctuation can't raise a syntax error) and AND-ed; a trailing
+    `*` on a word keeps prefix matching, and a bare OR is passed through.
+    """
+    parts: List[str] = []
+    for tok in _FTS_TOKEN.findall(text or ""):
+        if tok == "OR":
+            if parts and parts[-1] != "OR":
+                parts.append("OR")
+            continue
+        prefix = tok.endswith("*") and not tok.startswith('"')
+        body = tok.strip('"').rstrip("*").replace('"', "")
+        if body.strip():
+            parts.append(f'"{body}"' + ("*" if prefix else ""))
+    while parts and parts[-1] == "OR":
+        parts.pop()
+    return " ".join(parts)
+
+
+def _published_ts(entry: Any, default: float) -> float:
+    for f in ("published_parsed", "updated_parsed"):
+        st_ = entry.get(f)
+        if st_:
+            try:
+                return float(calendar.timegm(st_))
+            except Exception:
+                pass
+    return default
+
+
+class MediaStore:
+    """
+    Persistent, incremental store for Media Monitor: configured feeds, every
+    ingested item (keyed by `dedupe.item_key`), the keywords each item hit,
+    an FTS5 index for searching the archive and rolling trend counters.
+    Safe to share between the poller thread and page reruns — each call opens
+    its own short-lived connection.
+    """
+
+    def __init__(self, path: str | Path = DEFAULT_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_lock = threading.Lock()
+        with self._conn() as c:
+            c.execute("PRAGMA journal_mode=WAL")
+            c.executescript(_SCHEMA)
+            has_fts = c.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='items_fts'"
+            ).fetchone()
+            c.executescript(_FTS_SCHEMA)
+            if not has_fts:
+                # Stores created before the archive existed: index what's already there.
+                c.execute("INSERT INTO items_fts(items_fts) VALUES ('rebuild')")
+            has_trends = c.execute(
+                "SELECT 1 FROM sqlite_master WHERE type='table' AND name='trend_counts'"
+            ).fetchone()
+            c.executescript(_TREND_SCHEMA)
+            if not has_trends:
+                self._backfill_trends(c)
+            c.executescript(_TAG_SCHEMA)
+            if self._meta(c, "tag_lexicon") != tagging.lexicon_version():
+                # New store, or the sentiment lexicon changed: (re)tag everything.
+                self._retag(c, self._tagger(c))
+                self._put_meta(c, "tag_lexicon", tagging.lexicon_version())
+
+    @staticmethod
+    def _backfill_trends(c: sqlite3.Connection) -> None:
+        for res, width in RESOLUTIONS.items():
+            c.execute(
+                "INSERT INTO trend_counts(dim, key, res, bucket, n) "
+                "SELECT ?, source, ?, CAST(published / ? AS INTEGER) AS b, COUNT(*) "
+                "FROM items WHERE source != '' GROUP BY source, b",
+                (DIM_OUTLET, res, width),
+            )
+            c.execute(
+                "INSERT INTO trend_counts(dim, key, res, bucket, n) "
+                "SELECT ?, k.keyword, ?, CAST(i.published / ? AS INTEGER) AS b, COUNT(*) "
+                "FROM item_keywords k JOIN items i ON i.key = k.key GROUP BY k.keyword, b",
+                (DIM_KEYWORD, res, width),
+            )
+
+    @staticmethod
+    def _tagger(c: sqlite3.Connection) -> tagging.Tagger:
+        return tagging.get_tagger(tagging.EntityDict.from_json(MediaStore._meta(c, "tag_entities")))
+
+    @staticmethod
+    def _write_tags(c: sqlite3.Connection, keys: List[str], tags: List[tagging.Tags],
+                    sentiment: bool = True) -> None:
+        if sentiment:
+            c.executemany(
+                "INSERT OR REPLACE INTO item_tags(key, sentiment, label) VALUES (?, ?, ?)",
+                [(k, t.score, t.label) for k, t in zip(keys, tags)],
+            )
+        c.executemany(
+            "INSERT OR IGNORE INTO item_entities(key, entity, kind) VALUES (?, ?, ?)",
+            [(k, name, kind) for k, t in zip(keys, tags) for name, kind in t.entities],
+        )
+
+    @staticmethod
+    def _retag(c: sqlite3.Connection, tagger: tagging.Tagger, sentiment: bool = True) -> int:
+        """Re-tag every stored item in tagger-sized batches; entity tags are rebuilt from scratch."""
+        c.execute("DELETE FROM item_entities")
+        done, last = 0, 0
+        while True:
+            rows = c.execute(
+                "SELECT rowid, key, title, summary FROM items WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last, tagging.BATCH),
+            ).fetchall()
+            if not rows:
+                return done
+            tags = tagger.tag(tagging.text_of(dict(r)) for r in rows)
+            MediaStore._write_tags(c, [r["key"] for r in rows], tags, sentiment=sentiment)
+            done += len(rows)
+            last = rows[-1]["rowid"]
+
+    @contextmanager
+    def _conn(self) -> Iterator[sqlite3.Connection]:
+        c = sqlite3.connect(self.path, timeout=30)
+        c.row_factory = sqlite3.Row
+        try:
+            yield c
+            c.commit()
+        finally:
+            c.close()
+
+    # ---- feeds ---------------------------------------------------------------
+
+    def upsert_feed(self, url: str, interval_s: int = DEFAULT_INTERVAL_S, keywords: str = "") -> None:
+        with self._write_lock, self._conn() as c:
+            c.execute(
+                "INSERT INTO feeds(url, interval_s, keywords) VALUES (?, ?, ?) "
+                "ON CONFLICT(url) DO UPDATE SET interval_s=excluded.interval_s, keywords=excluded.keywords",
+                (url, int(interval_s), keywords),
+            )
+
+    def remove_feed(self, url: str) -> None:
+        with self._write_lock, self._conn() as c:
+            c.execute("DELETE FROM feeds WHERE url = ?", (url,))
+
+    def feeds(self) -> List[Dict[str, Any]]:
+        with self._conn() as c:
+            return [dict(r) for r in c.execute("SELECT * FROM feeds ORDER BY url")]
+
+    def due_feeds(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        with self._conn() as c:
+            rows = c.execute("SELECT * FROM feeds WHERE next_due <= ? ORDER BY next_due", (now,))
+            return [dict(r) for r in rows]
+
+    def next_due(self) -> Optional[float]:
+        with self._conn() as c:
+            row = c.execute("SELECT MIN(next_due) FROM feeds").fetchone()
+            return row[0] if row else None
+
+    def mark_polled(self, url: str, polled: float, next_due: float, etag: Optional[str] = None,
+                    modified: Optional[str] = None, error: Optional[str] = None) -> None:
+        with self._write_lock, self._conn() as c:
+            c.execute(
+                "UPDATE feeds SET last_polled=?, next_due=?, etag=COALESCE(?, etag), "
+                "modified=COALESCE(?, modified), last_error=? WHERE url=?",
+                (polled, next_due, etag, modified, error, url),
+            )
+
+    def request_poll(self, url: Optional[str] = None) -> None:
+        """Make one feed (or all) due immediately; the poller picks it up on wake."""
+        with self._write_lock, self._conn() as c:
+            if url:
+                c.execute("UPDATE feeds SET next_due = 0 WHERE url = ?", (url,))
+            else:
+                c.execute("UPDATE feeds SET next_due = 0")
+
+    # ---- items ---------------------------------------------------------------
+
+    def ingest(self, feed_url: str, entries: Iterable[Any],
+               matcher: Optional[KeywordMatcher] = None, fetched: Optional[float] = None) -> int:
+        """
+        Archive entries not seen before; returns how many were new. When a
+        matcher is given its hits are recorded in `item_keywords` (entries it
+        rejects are still archived, just without keywords). New items are
+        sentiment/entity tagged and trend counters incremented in the same
+        transaction.
+        """
+        fetched = time.time() if fetched is None else fetched
+        batch: Dict[str, tuple] = {}
+        hits_by_key: Dict[str, List[str]] = {}
+        for e in entries:
+            key = item_key(e)
+            if key in batch:
+                continue
+            batch[key] = (
+                key, feed_url, str(e.get("id") or e.get("guid") or ""),
+                str(e.get("title") or ""), str(e.get("summary") or ""), str(e.get("link") or ""),
+                entry_source(e), _published_ts(e, fetched), fetched,
+            )
+            if matcher is not None and not matcher.empty:
+                hits_by_key[key] = matcher.match(e) or []
+        if not batch:
+            return 0
+        with self._write_lock, self._conn() as c:
+            keys = list(batch)
+            for i in range(0, len(keys), 500):
+                chunk = keys[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for (k,) in c.execute(f"SELECT key FROM items WHERE key IN ({marks})", chunk):
+                    batch.pop(k, None)
+            if not batch:
+                return 0
+            rows = list(batch.values())
+            c.executemany(
+                "INSERT INTO items(key, feed, guid, title, summary, link, source, published, fetched) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            c.executemany(
+                "INSERT OR IGNORE INTO item_keywords(key, keyword) VALUES (?, ?)",
+                [(k, kw) for k in batch for kw in hits_by_key.get(k, ())],
+            )
+            self._write_tags(c, list(batch), self._tagger(c).tag(tagging.text_of({"title": r[3], "summary": r[4]})
+                                                                  for r in rows))
+            delta = bucket_counts((r[7], r[6], hits_by_key.get(r[0], ())) for r in rows)
+            c.executemany(
+                "INSERT INTO trend_counts(dim, key, res, bucket, n) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(dim, res, key, bucket) DO UPDATE SET n = n + excluded.n",
+                [(*k, n) for k, n in delta.items()],
+            )
+        return len(rows)
+
+    def query(self, since: Optional[float] = None, until: Optional[float] = None,
+              feed: Optional[str] = None, source: Optional[str] = None, keyword: Optional[str] = None,
+              fetched_since: Optional[float] = None, matched_only: bool = False,
+              sentiment: Optional[str] = None, entity: Optional[str] = None, mention: Optional[str] = None,
+              order: str = "newest", limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Items in `order` (see ORDERS; newest first by default); every filter
+        is optional and backed by an index. `sentiment` is a tagging label,
+        `entity` an entity name and `mention` an entity kind (company /
+        competitor).
+        """
+        sql = ["SELECT i.*, t.sentiment, t.label FROM items i LEFT JOIN item_tags t ON t.key = i.key"]
+        where: List[str] = []
+        args: List[Any] = []
+        if keyword:
+            sql.append("JOIN item_keywords k ON k.key = i.key")
+            where.append("k.keyword = ?")
+            args.append(keyword.lower())
+        if since is not None:
+            where.append("i.published >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("i.published < ?")
+            args.append(until)
+        if feed:
+            where.append("i.feed = ?")
+            args.append(feed)
+        if source:
+            where.append("i.source = ?")
+            args.append(source)
+        if fetched_since is not None:
+            where.append("i.fetched > ?")
+            args.append(fetched_since)
+        if matched_only and not keyword:
+            where.append("EXISTS (SELECT 1 FROM item_keywords m WHERE m.key = i.key)")
+        if sentiment:
+            where.append("t.label = ?")
+            args.append(sentiment)
+        if entity:
+            where.append("EXISTS (SELECT 1 FROM item_entities e WHERE e.entity = ? AND e.key = i.key)")
+            args.append(entity)
+        if mention:
+            where.append("EXISTS (SELECT 1 FROM item_entities e WHERE e.kind = ? AND e.key = i.key)")
+            args.append(mention)
+        if where:
+            sql.append("WHERE " + " AND ".join(where))
+        sql.append(f"ORDER BY {ORDERS[order]} LIMIT ?")
+        args.append(int(limit))
+        with self._conn() as c:
+            return self._with_tags(c, [dict(r) for r in c.execute(" ".join(sql), args)])
+
+    @staticmethod
+    def _with_tags(c: sqlite3.Connection, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Attach `keywords`, `entities` ([(name, kind)]) and, if missing, `sentiment` / `label`."""
+        if items:
+            marks = ",".join("?" * len(items))
+            keys = [it["key"] for it in items]
+            kws: Dict[str, List[str]] = {}
+            for r in c.execute(f"SELECT key, keyword FROM item_keywords WHERE key IN ({marks})", keys):
+                kws.setdefault(r["key"], []).append(r["keyword"])
+            ents: Dict[str, List[tuple]] = {}
+            for r in c.execute(f"SELECT key, entity, kind FROM item_entities WHERE key IN ({marks})", keys):
+                ents.setdefault(r["key"], []).append((r["entity"], r["kind"]))
+            tags: Dict[str, tuple] = {}
+            if "label" not in items[0]:
+                for r in c.execute(f"SELECT key, sentiment, label FROM item_tags WHERE key IN ({marks})", keys):
+                    tags[r["key"]] = (r["sentiment"], r["label"])
+            for it in items:
+                it["keywords"] = kws.get(it["key"], [])
+                it["entities"] = ents.get(it["key"], [])
+                if tags or "label" not in it:
+                    it["sentiment"], it["label"] = tags.get(it["key"], (None, None))
+        return items
+
+    def entities(self) -> List[Dict[str, Any]]:
+        """Tagged entities with their item counts, most mentioned first."""
+        with self._conn() as c:
+            return [dict(r) for r in c.execute(
+                "SELECT entity, kind, COUNT(*) AS items FROM item_entities GROUP BY entity, kind ORDER BY items DESC"
+            )]
+
+    # ---- archive search ------------------------------------------------------
+
+    @staticmethod
+    def _archive_filter(text: str, since: Optional[float], until: Optional[float],
+                        source: Optional[str]) -> tuple:
+        where: List[str] = []
+        args: List[Any] = []
+        q = fts_query(text)
+        if q:
+            where.append("i.rowid IN (SELECT rowid FROM items_fts WHERE items_fts MATCH ?)")
+            args.append(q)
+        if since is not None:
+            where.append("i.published >= ?")
+            args.append(since)
+        if until is not None:
+            where.append("i.published < ?")
+            args.append(until)
+        if source:
+            where.append("i.source = ?")
+            args.append(source)
+        return q, (" WHERE " + " AND ".join(where)) if where else "", args
+
+    def search(self, text: str, since: Optional[float] = None, until: Optional[float] = None,
+               source: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+        """
+        Ranked (bm25) full-text search over title/summary/source, optionally
+        limited to a published-time window and one outlet. Empty `text`
+        returns the newest items in the window instead.
+        """
+        q = fts_query(text)
+        if not q:
+            return self.query(since=since, until=until, source=source, limit=limit)
+        sql = (
+            "SELECT i.*, bm25(items_fts, 10.0, 2.0, 1.0) AS score "
+            "FROM items_fts JOIN items i ON i.rowid = items_fts.rowid "
+            "WHERE items_fts MATCH ?"
+        )
+        args: List[Any] = [q]
+        if since is not None:
+            sql += " AND i.published >= ?"
+            args.append(since)
+        if until is not None:
+            sql += " AND i.published < ?"
+            args.append(until)
+        if source:
+            sql += " AND i.source = ?"
+            args.append(source)
+        sql += " ORDER BY score LIMIT ?"
+        args.append(int(limit))
+        with self._conn() as c:
+            return self._with_tags(c, [dict(r) for r in c.execute(sql, args)])
+
+    def count_matches(self, text: str = "", since: Optional[float] = None,
+                      until: Optional[float] = None, source: Optional[str] = None) -> int:
+        _, where, args = self._archive_filter(text, since, until, source)
+        with self._conn() as c:
+            return int(c.execute(f"SELECT COUNT(*) FROM items i{where}", args).fetchone()[0])
+
+    def counts_by_source(self, text: str = "", since: Optional[float] = None,
+                         until: Optional[float] = None, limit: int = 25) -> List[Dict[str, Any]]:
+        """Per-outlet coverage counts for the same filters as `search`, largest first."""
+        _, where, args = self._archive_filter(text, since, until, None)
+        sql = f"SELECT i.source AS source, COUNT(*) AS items FROM items i{where} GROUP BY i.source ORDER BY items DESC LIMIT ?"
+        with self._conn() as c:
+            return [dict(r) for r in c.execute(sql, args + [int(limit)])]
+
+    def counts_by_day(self, text: str = "", since: Optional[float] = None,
+                      until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Daily (UTC) coverage counts for the same filters as `search`."""
+        _, where, args = self._archive_filter(text, since, until, None)
+        sql = (
+            "SELECT date(i.published, 'unixepoch') AS day, COUNT(*) AS items "
+            f"FROM items i{where} GROUP BY day ORDER BY day"
+        )
+        with self._conn() as c:
+            return [dict(r) for r in c.execute(sql, args)]
+
+    # ---- trends --------------------------------------------------------------
+
+    def trend_series(self, dim: str, res: str, first_bucket: int,
+                     keys: Optional[List[str]] = None, top: int = 8) -> Dict[str, Dict[int, int]]:
+        """
+        Precomputed bucket counts from `first_bucket` on, as {key: {bucket: n}}.
+        Without explicit `keys`, the `top` keys by volume in that window are used.
+        """
+        with self._conn() as c:
+            if not keys:
+                keys = [r[0] for r in c.execute(
+                    "SELECT key, SUM(n) AS total FROM trend_counts WHERE dim = ? AND res = ? AND bucket >= ? "
+                    "GROUP BY key ORDER BY total DESC LIMIT ?",
+                    (dim, res, first_bucket, int(top)),
+                )]
+            if not keys:
+                return {}
+            marks = ",".join("?" * len(keys))
+            out: Dict[str, Dict[int, int]] = {k: {} for k in keys}
+            for r in c.execute(
+                f"SELECT key, bucket, n FROM trend_counts WHERE dim = ? AND res = ? AND bucket >= ? AND key IN ({marks})",
+                [dim, res, first_bucket, *keys],
+            ):
+                out[r["key"]][r["bucket"]] = r["n"]
+            return out
+
+    def sources(self) -> List[str]:
+        with self._conn() as c:
+            return [r[0] for r in c.execute("SELECT DISTINCT source FROM items WHERE source != '' ORDER BY source")]
+
+    def keywords(self) -> List[str]:
+        with self._conn() as c:
+            return [r[0] for r in c.execute("SELECT DISTINCT keyword FROM item_keywords ORDER BY keyword")]
+
+    def count(self) -> int:
+        with self._conn() as c:
+            return int(c.execute("SELECT COUNT(*) FROM items").fetchone()[0])
+
+    # ---- meta ----------------------------------------------------------------
+
+    @staticmethod
+    def _meta(c: sqlite3.Connection, k: str, default: Optional[str] = None) -> Optional[str]:
+        row = c.execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else default
+
+    @staticmethod
+    def _put_meta(c: sqlite3.Connection, k: str, v: str) -> None:
+        c.execute("INSERT INTO meta(k, v) VALUES (?, ?) ON CONFLICT(k) DO UPDATE SET v=excluded.v", (k, v))
+
+    def get_meta(self, k: str, default: Optional[str] = None) -> Optional[str]:
+        with self._conn() as c:
+            return self._meta(c, k, default)
+
+    def set_meta(self, k: str, v: str) -> None:
+        with self._write_lock, self._conn() as c:
+            self._put_meta(c, k, v)
+
+    # ---- tagging -------------------------------------------------------------
+
+    def entity_dict(self) -> tagging.EntityDict:
+        return tagging.EntityDict.from_json(self.get_meta("tag_entities"))
+
+    def set_entities(self, entities: tagging.EntityDict) -> int:
+        """
+        Make `entities` the dictionary new items are tagged with; when it
+        differs from the stored one every archived item's entity tags are
+        rebuilt. Returns how many items were re-tagged (0 if unchanged).
+        """
+        text = entities.to_json()
+        if self.get_meta("tag_entities", "[]") == text:
+            return 0
+        with self._write_lock, self._conn() as c:
+            self._put_meta(c, "tag_entities", text)
+            return self._retag(c, tagging.get_tagger(entities), sentiment=False)
+
+    def retag_for(self, profile: Dict[str, str], competitors: Optional[str] = None) -> int:
+        """
+        Point entity tags at a saved `profile` and `competitors` (the stored
+        list when None). Called on explicit saves only: the store is shared by
+        every session, so page loads must not swap the dictionary.
+        """
+        if competitors is None:
+            competitors = self.get_meta("competitors", "") or ""
+        return self.set_entities(tagging.entities_for(profile, competitors))
+
+
+_store: Optional[MediaStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store(path: str | Path = DEFAULT_PATH) -> MediaStore:
+    """Process-wide store (shared by every session and the poller)."""
+    global _store
+    with _store_lock:
+        if _store is None or _store.path != Path(path):
+            _store = MediaStore(path)
+        return _store
@@ -0,0 +1,88 @@
+# shared/media_trends.py
+from __future__ import annotations
+import math
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+# Bucket width per resolution, in seconds (UTC-aligned).
+RESOLUTIONS: Dict[str, int] = {"hour": 3600, "day": 86400}
+# How many previous buckets form the baseline for the spike score.
+DEFAULT_BASELINE: Dict[str, int] = {"hour": 24, "day": 14}
+
+DIM_KEYWORD = "keyword"
+DIM_OUTLET = "outlet"
+
+
+def bucket_of(ts: float, res: str) -> int:
+    """Bucket index (bucket start = index * width) for a timestamp."""
+    return int(ts // RESOLUTIONS[res])
+
+
+def bucket_counts(items: Iterable[Tuple[float, str, Sequence[str]]]) -> Counter:
+    """
+    Fold newly ingested items into counter deltas.
+    `items` yields (published_ts, outlet, keywords); the result maps
+    (dim, key, res, bucket) -> count, ready to be added to the stored totals.
+    """
+    delta: Counter = Counter()
+    for ts, outlet, kws in items:
+        for res in RESOLUTIONS:
+            b = bucket_of(ts, res)
+            if outlet:
+                delta[(DIM_OUTLET, outlet, res, b)] += 1
+            for k in kws:
+                delta[(DIM_KEYWORD, k, res, b)] += 1
+    return delta
+
+
+def dense_series(points: Dict[int, int], first: int, last: int) -> List[int]:
+    """Zero-fill sparse {bucket: count} into a list covering [first, last]."""
+    return [int(points.get(b, 0)) for b in range(first, last + 1)]
+
+
+def zscore(current: float, baseline: Sequence[float], min_std: float = 1.0) -> float:
+    """
+    Spike score of `current` against a rolling baseline. The std is floored at
+    `min_std` so a quiet series going 0 -> 2 doesn't read as an infinite spike.
+    """
+    if not baseline:
+        return 0.0
+    mean = sum(baseline) / len(baseline)
+    var = sum((x - mean) ** 2 for x in baseline) / len(baseline)
+    return (current - mean) / max(math.sqrt(var), min_std)
+
+
+@dataclass
+class Spike:
+    key: str
+    current: int
+    baseline_mean: float
+    score: float
+
+
+def spikes(series: Dict[str, Dict[int, int]], res: str, now_ts: float,
+           baseline: int | None = None) -> List[Spike]:
+    """
+    Score the current bucket of every series against the `baseline` buckets
+    before it; highest score first.
+    """
+    baseline = baseline or DEFAULT_BASELINE[res]
+    cur = bucket_of(now_ts, res)
+    out: List[Spike] = []
+    for key, pts in series.items():
+        vals = dense_series(pts, cur - baseline, cur)
+        base, x = vals[:-1], vals[-1]
+        out.append(Spike(key=key, current=x, baseline_mean=sum(base) / len(base),
+                         score=round(zscore(x, base), 2)))
+    out.sort(key=lambda s: (s.score, s.current), reverse=True)
+    return out
+
+
+def series_table(series: Dict[str, Dict[int, int]], res: str, first: int, last: int) -> Dict[str, Any]:
+    """Column-oriented table (bucket start timestamps + one column per key) for charting."""
+    width = RESOLUTIONS[res]
+    table: Dict[str, Any] = {"bucket": [b * width for b in range(first, last + 1)]}
+    for key, pts in series.items():
+        table[key] = dense_series(pts, first, last)
+    return table
@@ -0,0 +1,183 @@
+# shared/memprof.py
+from __future__ import annotations
+import os
+import sys
+import threading
+import time
+import types
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Mapping, Optional, Tuple
+
+# A session is re-measured at most this often (deep walks of a large history
+# aren't free); the process-wide trend gets one point per TREND_INTERVAL_S.
+SAMPLE_INTERVAL_S = 30.0
+TREND_INTERVAL_S = 60.0
+TREND_POINTS = 24 * 60            # one day at one point per minute
+SESSION_TTL_S = 2 * 3600          # drop sessions not seen for this long
+ALERT_BYTES = int(float(os.environ.get("PRESENCE_SESSION_ALERT_MB", "50")) * 1024 * 1024)
+
+_SKIP = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType,
+         types.MethodType, threading.Thread)
+
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """
+    Approximate retained size of `obj` in bytes: sys.getsizeof over the object
+    graph, each object counted once. NumPy arrays and pandas frames report
+    their buffers; modules, classes, functions and threads are not followed.
+    """
+    seen = set() if seen is None else seen
+    total = 0
+    stack = [obj]
+    while stack:
+        o = stack.pop()
+        if id(o) in seen or isinstance(o, _SKIP):
+            continue
+        seen.add(id(o))
+        mem = getattr(o, "memory_usage", None)
+        if callable(mem) and hasattr(o, "columns"):  # pandas DataFrame
+            try:
+                total += int(mem(deep=True).sum())
+                continue
+            except Exception:
+                pass
+        nbytes = getattr(o, "nbytes", None)
+        if isinstance(nbytes, int) and hasattr(o, "dtype"):  # numpy array / pandas Series
+            # getsizeof already includes the buffer for arrays that own their data
+            total += max(nbytes, sys.getsizeof(o)) if type(o).__module__.startswith("numpy") else nbytes
+            continue
+        try:
+            total += sys.getsizeof(o)
+        except TypeError:
+            continue
+        if isinstance(o, (str, bytes, bytearray, int, float, bool, complex)) or o is None:
+            continue
+        if isinstance(o, Mapping):
+            stack.extend(o.keys())
+            stack.extend(o.values())
+        elif isinstance(o, (list, tuple, set, frozenset, deque)):
+            stack.extend(o)
+        else:
+            d = getattr(o, "__dict__", None)
+            if d is not None:
+                stack.append(d)
+            for s in getattr(type(o), "__slots__", ()) or ():
+                if hasattr(o, s):
+                    stack.append(getattr(o, s))
+    return total
+
+
+def measure(state: Mapping[str, Any]) -> Dict[str, int]:
+    """Deep size per top-level key. Objects shared between keys count once, under the first key."""
+    seen: set = set()
+    out: Dict[str, int] = {}
+    for k in list(state.keys()):
+        try:
+            out[str(k)] = deep_size(state[k], seen)
+        except Exception:
+            continue
+    return out
+
+
+@dataclass
+class SessionSample:
+    session: str
+    ts: float
+    sizes: Dict[str, int] = field(default_factory=dict)
+
+    @property
+    def total(self) -> int:
+        return sum(self.sizes.values())
+
+
+class MemoryRegistry:
+    """Latest sample per live session plus a bounded process-wide trend."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._sessions: Dict[str, SessionSample] = {}
+        self._trend: Deque[Tuple[float, int, int]] = deque(maxlen=TREND_POINTS)  # (ts, bytes, sessions)
+
+    def due(self, session: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        with self._lock:
+            s = self._sessions.get(session)
+        return s is None or now - s.ts >= SAMPLE_INTERVAL_S
+
+    def record(self, session: str, sizes: Dict[str, int], now: Optional[float] = None) -> SessionSample:
+        now = time.time() if now is None else now
+        sample = SessionSample(session=session, ts=now, sizes=sizes)
+        with self._lock:
+            self._sessions[session] = sample
+            for sid in [sid for sid, s in self._sessions.items() if now - s.ts > SESSION_TTL_S]:
+                del self._sessions[sid]
+            if not self._trend or now - self._trend[-1][0] >= TREND_INTERVAL_S:
+                self._trend.append((now, sum(s.total for s in self._sessions.values()), len(self._sessions)))
+        return sample
+
+    def sessions(self) -> List[SessionSample]:
+        with self._lock:
+            return sorted(self._sessions.values(), key=lambda s: s.total, reverse=True)
+
+    def by_key(self) -> List[Dict[str, Any]]:
+        """Per session_state key across sessions: total, max and how many sessions hold it."""
+        agg: Dict[str, Dict[str, Any]] = {}
+        for s in self.sessions():
+            for k, n in s.sizes.items():
+                a = agg.setdefault(k, {"key": k, "total_bytes": 0, "max_bytes": 0, "sessions": 0})
+                a["total_bytes"] += n
+                a["max_bytes"] = max(a["max_bytes"], n)
+                a["sessions"] += 1
+        return sorted(agg.values(), key=lambda a: a["total_bytes"], reverse=True)
+
+    def trend(self) -> List[Tuple[float, int, int]]:
+        with self._lock:
+            return list(self._trend)
+
+    def over_threshold(self, limit: int = ALERT_BYTES) -> List[SessionSample]:
+        return [s for s in self.sessions() if s.total >= limit]
+
+
+_registry: Optional[MemoryRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_registry() -> MemoryRegistry:
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = MemoryRegistry()
+        return _registry
+
+
+def session_id() -> str:
+    try:
+        from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+        ctx = get_script_run_ctx()
+        return ctx.session_id if ctx is not None else "bare"
+    except Exception:
+        return "bare"
+
+
+def sample(force: bool = False) -> Optional[SessionSample]:
+    """
+    Measure the current session's state into the registry (rate-limited per
+    session unless `force`). Called from `state.init()` on every page.
+    """
+    import streamlit as st
+
+    reg = get_registry()
+    sid = session_id()
+    if not force and not reg.due(sid):
+        return None
+    return reg.record(sid, measure(st.session_state))
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if abs(n) < 1024 or unit == "GB":
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GB"
@@ -0,0 +1,140 @@
+# shared/phrases.py
+from __future__ import annotations
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .tracing import traced
+
+BUILTIN_PATH = Path(__file__).parent / "lexicons" / "phrases.json"
+# Optional team-specific additions/overrides, same shape as the builtin file.
+USER_PATH = Path("data") / "phrases.json"
+
+_TOKEN = re.compile(r"[\w'’%-]+", re.UNICODE)
+_END = "\0"  # terminal marker inside trie nodes
+
+
+def tokenize(text: str) -> List[Tuple[str, int, int]]:
+    """(lower-cased token, start, end) for every word-ish token; punctuation is skipped."""
+    return [(m.group(0).lower().replace("’", "'"), m.start(), m.end()) for m in _TOKEN.finditer(text or "")]
+
+
+@dataclass
+class Suggestion:
+    phrase: str              # the text as written in the copy
+    start: int
+    end: int
+    replacements: List[str]
+
+
+class PhraseTrie:
+    """
+    Word-level trie of weak phrases -> stronger replacements. `scan` makes one
+    left-to-right pass and reports leftmost-longest, non-overlapping matches,
+    so cost is linear in the copy length (times the longest phrase).
+    """
+
+    def __init__(self) -> None:
+        self._root: Dict[str, Any] = {}
+        self.size = 0
+
+    def add(self, phrase: str, replacements: Iterable[str]) -> None:
+        toks = [t for t, _, _ in tokenize(phrase)]
+        if not toks:
+            return
+        node = self._root
+        for t in toks:
+            node = node.setdefault(t, {})
+        if _END not in node:
+            self.size += 1
+        node[_END] = list(dict.fromkeys([*node.get(_END, []), *replacements]))
+
+    def scan(self, text: str) -> List[Suggestion]:
+        toks = tokenize(text)
+        out: List[Suggestion] = []
+        i, n = 0, len(toks)
+        while i < n:
+            node, j, best = self._root, i, None
+            while j < n and toks[j][0] in node:
+                node = node[toks[j][0]]
+                if _END in node:
+                    best = (j, node[_END])
+                j += 1
+            if best is None:
+                i += 1
+                continue
+            last, repl = best
+            start, end = toks[i][1], toks[last][2]
+            out.append(Suggestion(phrase=text[start:end], start=start, end=end, replacements=list(repl)))
+            i = last + 1
+        return out
+
+
+def _merge(into: Dict[str, Any], extra: Dict[str, Any]) -> None:
+    for lang, goals in (extra or {}).items():
+        for goal, entries in (goals or {}).items():
+            into.setdefault(lang, {}).setdefault(goal, {}).update(
+                {k: (v if isinstance(v, list) else [v]) for k, v in (entries or {}).items()}
+            )
+
+
+def load_dictionary(paths: Optional[Iterable[Path]] = None) -> Dict[str, Dict[str, Dict[str, List[str]]]]:
+    """
+    {language: {goal: {weak phrase: [replacements]}}} merged from the builtin
+    lexicon and then USER_PATH (later files extend/override earlier ones).
+    Missing or unreadable files are skipped.
+    """
+    merged: Dict[str, Any] = {}
+    for p in (paths if paths is not None else (BUILTIN_PATH, USER_PATH)):
+        try:
+            with open(p, encoding="utf-8") as fh:
+                _merge(merged, json.load(fh))
+        except (OSError, ValueError):
+            continue
+    return merged
+
+
+def save_user_entries(lang: str, goal: str, entries: Dict[str, List[str]], path: Path = USER_PATH) -> None:
+    """Add/override entries in the user dictionary file (created if missing)."""
+    current = load_dictionary([path])
+    _merge(current, {lang: {goal: entries}})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(current, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+# (lang, goal) -> trie, rebuilt only when a dictionary file changes.
+_tries: Dict[Tuple[str, str], PhraseTrie] = {}
+_stamp: Optional[Tuple[float, ...]] = None
+_lock = threading.Lock()
+
+
+def _file_stamp() -> Tuple[float, ...]:
+    return tuple(os.path.getmtime(p) if os.path.exists(p) else 0.0 for p in (BUILTIN_PATH, USER_PATH))
+
+
+def get_trie(lang: str, goal: str) -> PhraseTrie:
+    global _stamp
+    stamp = _file_stamp()
+    with _lock:
+        if stamp != _stamp:
+            _tries.clear()
+            _stamp = stamp
+        trie = _tries.get((lang, goal))
+        if trie is None:
+            trie = PhraseTrie()
+            for phrase, repl in load_dictionary().get(lang, {}).get(goal, {}).items():
+                trie.add(phrase, repl)
+            _tries[(lang, goal)] = trie
+        return trie
+
+
+@traced("phrases.suggest")
+def suggest(text: str, goal: str, lang: str = "English") -> List[Suggestion]:
+    """Instant local suggestions for `text` (no LLM)."""
+    return get_trie(lang, goal).scan(text)
@@ -0,0 +1,168 @@
+# shared/prefetch.py
+"""
+Speculative pre-generation: after "Save Profile" the next step is almost
+always Strategy Ideas or PR Intelligence, so (when the session opted in)
+those generations start as background jobs right away. Their output lands
+in the semantic cache under exactly the key the page's first click will
+use, which makes that click instant. A daily spend cap bounds the waste.
+"""
+from __future__ import annotations
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import streamlit as st
+
+ENABLED_DEFAULT = os.environ.get("PRESENCE_PREFETCH", "0") == "1"
+# Worst-case list-price spend per process per day on speculative calls.
+BUDGET_USD = float(os.environ.get("PRESENCE_PREFETCH_BUDGET_USD", "0.25"))
+_KEY = "_prefetch"  # session: {"version", "jobs": {target: job id}, "cost": {target: usd}, "skipped": {target: why}}
+
+
+@dataclass(frozen=True)
+class Target:
+    """A generation a page runs with its default inputs; must mirror that page's `llm_copy` call."""
+    name: str
+    page: str
+    task: str                 # prompts.TASKS key, also the router task tag
+    opts: Dict[str, str]      # prompt-builder options = the page's default widget values
+    temperature: float = 0.6
+    cache_scope: str = ""
+    semantic: bool = False
+
+
+TARGETS = (
+    Target("strategy", "Strategy Ideas", "strategy", {}, 0.55, "strategy|Professional|Medium"),
+    Target("pr_angles", "PR Intelligence", "pr_angles", {"timing": "ASAP (next 7 days)"},
+           cache_scope="pr_angles|ASAP (next 7 days)", semantic=True),
+)
+
+
+def prompt_for(target: Target, data: Dict[str, Any]) -> str:
+    from . import prompts
+
+    return prompts.build(target.task, data, **target.opts)
+
+
+class Budget:
+    """Speculative spend per calendar day (local time), charged at each call's worst-case estimate."""
+
+    def __init__(self, limit_usd: float = BUDGET_USD) -> None:
+        self.limit = limit_usd
+        self.day = ""
+        self.spent = 0.0
+        self._lock = threading.Lock()
+
+    def charge(self, usd: float) -> bool:
+        with self._lock:
+            today = time.strftime("%Y-%m-%d")
+            if today != self.day:
+                self.day, self.spent = today, 0.0
+            if self.spent + usd > self.limit:
+                return False
+            self.spent += usd
+            return True
+
+    def refund(self, usd: float) -> None:
+        with self._lock:
+            self.spent = max(0.0, self.spent - usd)
+
+
+_budget: Optional[Budget] = None
+_budget_lock = threading.Lock()
+
+
+def get_budget() -> Budget:
+    global _budget
+    with _budget_lock:
+        if _budget is None:
+            _budget = Budget()
+        return _budget
+
+
+def enabled() -> bool:
+    return bool(st.session_state.get("prefetch_enabled", ENABLED_DEFAULT))
+
+
+def cancel() -> int:
+    """Cancel this session's prefetches (the profile they were made for changed). Returns how many."""
+    from . import jobs
+
+    info = st.session_state.pop(_KEY, None)
+    if not info:
+        return 0
+    mgr = jobs.get_manager()
+    n = 0
+    for name, jid in info["jobs"].items():
+        job = mgr.get(jid)
+        queued = job is not None and job.status == jobs.QUEUED
+        if mgr.cancel(jid):
+            n += 1
+            if queued:
+                get_budget().refund(info["cost"][name])  # never started, so never spent
+    return n
+
+
+def _generate(ctx: Any, target: Target, prompt: str, context: str) -> Optional[str]:
+    from . import llm
+
+    if ctx.cancelled:
+        return None
+    ctx.progress(0.1, f"Pre-generating {target.page}…")
+    # llm_copy stores the result in the semantic cache; nothing goes to history
+    # until the user actually asks for it.
+    return llm.llm_copy(prompt, temperature=target.temperature, cache_scope=target.cache_scope,
+                        context=context, task=target.task, brand_check=False, semantic=target.semantic)
+
+
+def schedule(pv: Any) -> Dict[str, str]:
+    """
+    Start prefetch jobs for a just-saved ProfileVersion `pv` (cancelling any
+    for the previous version). Targets already cached, over budget, or
+    pointless offline are skipped. Returns {target: job id or skip reason}.
+    """
+    from . import jobs, llm
+
+    cancel()
+    if not enabled():
+        return {}
+    out: Dict[str, str] = {}
+    info: Dict[str, Any] = {"version": f"{pv.id}:{pv.version}", "jobs": {}, "cost": {}, "skipped": {}}
+    for t in TARGETS:
+        prompt = prompt_for(t, pv.data)
+        if not llm.available():
+            why = "offline"
+        elif llm.cached(prompt, t.temperature, t.cache_scope, context=pv.context, task=t.task,
+                        semantic=t.semantic):
+            why = "already cached"
+        else:
+            cost = llm.estimate_cost(prompt, context=pv.context, task=t.task)
+            why = "" if get_budget().charge(cost) else "over daily budget"
+        if why:
+            info["skipped"][t.name] = out[t.name] = why
+            continue
+        jid = jobs.submit("prefetch", _generate, t, prompt, pv.context, label=f"Prefetch: {t.page}")
+        info["jobs"][t.name] = out[t.name] = jid
+        info["cost"][t.name] = cost
+    st.session_state[_KEY] = info
+    return out
+
+
+def status() -> List[Dict[str, str]]:
+    """This session's prefetches for the active profile version: target page and state."""
+    from . import jobs
+
+    info = st.session_state.get(_KEY)
+    if not info:
+        return []
+    rows = []
+    by_name = {t.name: t for t in TARGETS}
+    for name, jid in info["jobs"].items():
+        job = jobs.get_manager().get(jid)
+        rows.append({"page": by_name[name].page, "status": job.status if job else "expired",
+                     "error": job.error if job else ""})
+    for name, why in info["skipped"].items():
+        rows.append({"page": by_name[name].page, "status": f"skipped ({why})", "error": ""})
+    return rows
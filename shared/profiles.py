@@ -0,0 +1,205 @@
+# shared/profiles.py
+from __future__ import annotations
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from dataclasses import dataclass, field
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from . import compliance
+from .matcher import KeywordMatcher
+
+STORE_PATH = Path("data") / "profiles.json"
+
+FIELDS: Tuple[str, ...] = ("name", "industry", "size", "goals", "audience", "brand_voice", "brand_rules", "website")
+
+# Order and labels of the prompt context block.
+_CONTEXT_LABELS = (
+    ("industry", "Industry"), ("size", "Size"), ("audience", "Audience"),
+    ("brand_voice", "Brand voice"), ("goals", "Goals"), ("website", "Website"),
+)
+
+
+def normalize(profile: Any) -> Dict[str, str]:
+    """All FIELDS as stripped strings (single-line fields whitespace-collapsed, website with a scheme)."""
+    raw = profile if isinstance(profile, dict) else {f: getattr(profile, f, "") for f in FIELDS}
+    out: Dict[str, str] = {}
+    for f in FIELDS:
+        v = str(raw.get(f) or "").strip()
+        if f not in ("goals", "brand_rules"):
+            v = " ".join(v.split())
+        out[f] = v
+    site = out["website"]
+    if site and not re.match(r"^[a-z][a-z0-9+.-]*://", site, re.I):
+        out["website"] = "https://" + site
+    out["website"] = out["website"].rstrip("/")
+    return out
+
+
+def name_key(name: str) -> str:
+    return " ".join((name or "").split()).casefold()
+
+
+def render_context(p: Dict[str, str]) -> str:
+    """Prompt-ready context block for a normalized profile ('' when the profile is empty)."""
+    lines = [f"Company: {p['name']}"] if p.get("name") else []
+    lines += [f"{label}: {p[k]}" for k, label in _CONTEXT_LABELS if p.get(k)]
+    if p.get("brand_rules"):
+        lines.append("Brand rules:\n" + p["brand_rules"])
+    return "\n".join(lines)
+
+
+@dataclass(frozen=True)
+class ProfileVersion:
+    """One immutable version of a profile plus the artifacts derived from it once."""
+    id: str
+    version: int
+    data: Dict[str, str]
+    fingerprint: str
+    context: str
+    rules: compliance.BrandRules
+    banned: Optional[KeywordMatcher]
+    required: Optional[KeywordMatcher]
+    updated: float = field(default_factory=time.time)
+
+    @property
+    def name(self) -> str:
+        return self.data["name"]
+
+
+def fingerprint(data: Dict[str, str]) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+@lru_cache(maxsize=256)
+def _derive(fp: str, items: Tuple[Tuple[str, str], ...], pid: str, version: int, updated: float) -> ProfileVersion:
+    data = dict(items)
+    rules = compliance.parse_rules(data["brand_rules"])
+    banned, required = compliance.matchers(rules)
+    return ProfileVersion(id=pid, version=version, data=data, fingerprint=fp, context=render_context(data),
+                          rules=rules, banned=banned, required=required, updated=updated)
+
+
+def derive(profile: Any, pid: str = "", version: int = 0, updated: float = 0.0) -> ProfileVersion:
+    """Normalize `profile` and build its derived artifacts (cached per content)."""
+    data = normalize(profile)
+    return _derive(fingerprint(data), tuple(sorted(data.items())), pid, version, updated)
+
+
+class ProfileStore:
+    """
+    Many company profiles in one JSON file, indexed by id and by
+    case-insensitive name. Every save that changes a profile bumps its
+    version and derives the artifacts once; lookups are dict hits.
+    """
+
+    def __init__(self, path: Path = STORE_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._by_id: Dict[str, ProfileVersion] = {}
+        self._by_name: Dict[str, str] = {}
+        self._mtime = 0.0
+        self._load()
+
+    def _stat(self) -> float:
+        try:
+            return self.path.stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def _load(self) -> None:
+        self._mtime = self._stat()
+        try:
+            raw = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self._by_id, self._by_name = {}, {}
+        for rec in raw.get("profiles", []):
+            pv = derive(rec.get("data", {}), rec["id"], int(rec.get("version", 1)), float(rec.get("updated", 0)))
+            self._by_id[pv.id] = pv
+            self._by_name[name_key(pv.name)] = pv.id
+
+    def _save(self) -> None:
+        payload = {"profiles": [{"id": p.id, "version": p.version, "updated": p.updated, "data": p.data}
+                                for p in self._by_id.values()]}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, indent=2), encoding="utf-8")
+        tmp.replace(self.path)
+        self._mtime = self._stat()
+
+    def _fresh(self) -> None:
+        """Reload when another process (replica) rewrote the file; one stat per call."""
+        if self._stat() != self._mtime:
+            with self._lock:
+                if self._stat() != self._mtime:
+                    self._load()
+
+    def upsert(self, profile: Any, pid: Optional[str] = None) -> ProfileVersion:
+        """
+        Save a profile. Matches an existing one by `pid`, else by name; an
+        unchanged profile keeps its version. Raises ValueError without a name.
+        """
+        data = normalize(profile)
+        if not data["name"]:
+            raise ValueError("A profile needs a name.")
+        self._fresh()
+        with self._lock:
+            pid = pid if pid in self._by_id else self._by_name.get(name_key(data["name"]))
+            cur = self._by_id.get(pid) if pid else None
+            if cur is not None and cur.fingerprint == fingerprint(data):
+                return cur
+            other = self._by_name.get(name_key(data["name"]))
+            if other and other != pid:
+                raise ValueError(f"Another profile is already named {data['name']!r}.")
+            pid = pid or uuid.uuid4().hex[:10]
+            pv = derive(data, pid, (cur.version + 1) if cur else 1, time.time())
+            if cur is not None:
+                self._by_name.pop(name_key(cur.name), None)
+            self._by_id[pid] = pv
+            self._by_name[name_key(pv.name)] = pid
+            self._save()
+            return pv
+
+    def delete(self, pid: str) -> bool:
+        self._fresh()
+        with self._lock:
+            pv = self._by_id.pop(pid, None)
+            if pv is None:
+                return False
+            self._by_name.pop(name_key(pv.name), None)
+            self._save()
+            return True
+
+    def get(self, pid: str) -> Optional[ProfileVersion]:
+        self._fresh()
+        return self._by_id.get(pid)
+
+    def by_name(self, name: str) -> Optional[ProfileVersion]:
+        self._fresh()
+        pid = self._by_name.get(name_key(name))
+        return self._by_id.get(pid) if pid else None
+
+    def list(self) -> List[ProfileVersion]:
+        self._fresh()
+        return sorted(self._by_id.values(), key=lambda p: p.name.casefold())
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+
+_store: Optional[ProfileStore] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> ProfileStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ProfileStore()
+        return _store
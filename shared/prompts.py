@@ -0,0 +1,83 @@
+# shared/prompts.py
+from __future__ import annotations
+from typing import Any, Callable, Dict, Tuple
+
+from .tracing import traced
+
+
+def field(co: Any, key: str, default: str = "") -> str:
+    """Profile value from a dict or a CompanyProfile-like object."""
+    if co is None:
+        return default
+    v = co.get(key, default) if isinstance(co, dict) else getattr(co, key, default)
+    return str(v if v not in (None, "") else default)
+
+
+@traced("prompt.strategy")
+def strategy(co: Any, goals: str = "", **_: Any) -> str:
+    return f"""Propose a practical PR/Marketing initiative for {field(co, "name")} ({field(co, "industry")}, size: {field(co, "size")}).
+Goals: {goals or field(co, "goals")}.
+Output a concise plan: headline, rationale, primary channel, 4–6 bullets, clear success metrics."""
+
+
+@traced("prompt.content")
+def content(co: Any, content_type: str = "Press Release", tone: str = "Professional",
+            length: str = "Medium", topic: str = "", **_: Any) -> str:
+    return f"""
+You are a senior PR/marketing copywriter.
+Create three distinct {content_type} variants for:
+- Company: {field(co, "name")} ({field(co, "industry")})
+- Audience: {field(co, "audience")}
+- Topic/Offer: {topic or field(co, "topic", "New Launch")}
+Tone: {tone}. Length: {length}.
+Return only the copy for each variant, separated with a clear title line.
+    """.strip()
+
+
+@traced("prompt.press_release")
+def press_release(co: Any, **opts: Any) -> str:
+    return content(co, **{**opts, "content_type": "Press Release"})
+
+
+@traced("prompt.pr_angles")
+def pr_angles(co: Any, timing: str = "No specific timing", **_: Any) -> str:
+    return f"""
+Act as a PR strategist. Using the context below, propose 3–5 press-worthy story angles,
+recommended journalist beats, suggested timing windows ({timing}), and a one-line pitch for each.
+
+Context:
+- Company: {field(co, "name")}
+- Industry: {field(co, "industry")}
+- Audience: {field(co, "audience")}
+    """.strip()
+
+
+@traced("prompt.creator_hooks")
+def creator_hooks(co: Any, platform: str = "LinkedIn Video", niche: str = "", cta: str = "Book a demo",
+                  n_hooks: int = 10, **_: Any) -> str:
+    return f"""
+You are a social content strategist.
+Generate {n_hooks} high-performing short-video hooks for {platform} in the niche "{niche}".
+Each hook should include:
+- Hook line
+- Suggested format (e.g., talking head, street vox-pop, B-roll with captions)
+- Visual beat (what appears on screen)
+- Ending CTA line (target CTA: {cta})
+Return numbered items.
+    """.strip()
+
+
+# task name -> (builder, history kind); shared by the pages and the batch runner.
+TASKS: Dict[str, Tuple[Callable[..., str], str]] = {
+    "strategy": (strategy, "strategy"),
+    "content": (content, "content"),
+    "press_release": (press_release, "content"),
+    "pr_angles": (pr_angles, "pr_intel"),
+    "creator_hooks": (creator_hooks, "creator"),
+}
+
+
+def build(task: str, co: Any, **opts: Any) -> str:
+    if task not in TASKS:
+        raise ValueError(f"Unknown task {task!r}; expected one of {', '.join(TASKS)}")
+    return TASKS[task][0](co, **opts)
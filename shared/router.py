@@ -0,0 +1,248 @@
+# shared/router.py
+from __future__ import annotations
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+log = logging.getLogger(__name__)
+
+# Every routed call is appended here (one JSON object per line) for cost /
+# quality audits; the tail also seeds the latency windows after a restart.
+# PRESENCE_ROUTE_LOG="" turns the file off.
+LOG_PATH = os.environ.get("PRESENCE_ROUTE_LOG", str(Path("data") / "llm_routes.jsonl"))
+WINDOW = 200          # latencies kept per (model, task class)
+MAX_AGE_S = 1800      # older samples are ignored, so a model dropped for a slow spell gets retried
+MIN_SAMPLES = 5       # below this the prior (or the model-wide window) is used
+P95_TTL_S = 5.0       # a computed p95 is reused this long (routing needs no fresher number)
+RECENT = 500          # decisions kept in memory for the Admin page
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    name: str
+    usd_in: float       # list price per 1M input tokens
+    usd_out: float      # list price per 1M output tokens
+    prior_p95_s: float  # assumed p95 until enough calls are recorded
+
+
+MODELS: Dict[str, ModelSpec] = {m.name: m for m in (
+    ModelSpec("gpt-4o", 2.50, 10.00, 12.0),
+    ModelSpec("gpt-4.1-mini", 0.40, 1.60, 7.0),
+    ModelSpec("gpt-4o-mini", 0.15, 0.60, 5.0),
+    ModelSpec("gpt-4.1-nano", 0.10, 0.40, 3.0),
+)}
+
+
+@dataclass(frozen=True)
+class TaskClass:
+    name: str
+    models: Tuple[str, ...]  # preferred first; later ones are the faster fallbacks
+    max_tokens: int
+    slo_s: float             # p95 latency budget; PRESENCE_LLM_SLO_<NAME> overrides
+
+    @property
+    def slo(self) -> float:
+        return float(os.environ.get(f"PRESENCE_LLM_SLO_{self.name.upper()}", self.slo_s))
+
+
+CLASSES: Dict[str, TaskClass] = {c.name: c for c in (
+    TaskClass("phrase", ("gpt-4o-mini", "gpt-4.1-nano"), 400, 6.0),
+    TaskClass("short", ("gpt-4o-mini", "gpt-4.1-nano"), 500, 8.0),
+    TaskClass("copy", ("gpt-4o-mini", "gpt-4.1-nano"), 800, 15.0),
+    TaskClass("strategy", ("gpt-4o", "gpt-4.1-mini", "gpt-4o-mini"), 900, 25.0),
+)}
+
+# Task tags passed by pages / the batch runner -> task class.
+TASKS: Dict[str, str] = {
+    "phrases": "phrase",
+    "rewrite": "short",
+    "optimizer": "short",
+    "content": "copy",
+    "press_release": "copy",
+    "creator_hooks": "copy",
+    "strategy": "strategy",
+    "pr_angles": "strategy",
+}
+SHORT_PROMPT_TOKENS = 300  # untagged calls with shorter prompts are "short", longer ones "copy"
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text or "") // 4)
+
+
+def classify(task: str, prompt: str) -> TaskClass:
+    name = TASKS.get(task) or (task if task in CLASSES else "")
+    if not name:
+        name = "short" if estimate_tokens(prompt) < SHORT_PROMPT_TOKENS else "copy"
+    return CLASSES[name]
+
+
+def cost_usd(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    spec = MODELS.get(model)
+    if spec is None:
+        return 0.0
+    return (prompt_tokens * spec.usd_in + completion_tokens * spec.usd_out) / 1_000_000
+
+
+@dataclass
+class Route:
+    model: str
+    max_tokens: int
+    task: str
+    task_class: str
+    reason: str
+    p95_s: Optional[float]
+    slo_s: float
+    prompt_tokens: int
+
+
+class LatencyTracker:
+    """Rolling latency windows per (model, task class) and per model."""
+
+    def __init__(self, window: int = WINDOW) -> None:
+        self._window = window
+        self._lat: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}  # key -> (ts, seconds)
+        self._p95: Dict[Tuple[str, str], Tuple[float, Tuple[Optional[float], int]]] = {}  # key -> (at, result)
+        self._lock = threading.Lock()
+
+    def record(self, model: str, task_class: str, seconds: float, ts: Optional[float] = None) -> None:
+        ts = time.time() if ts is None else ts
+        with self._lock:
+            for key in ((model, task_class), (model, "")):
+                self._lat.setdefault(key, deque(maxlen=self._window)).append((ts, seconds))
+
+    def p95(self, model: str, task_class: str = "") -> Tuple[Optional[float], int]:
+        """(p95 seconds, samples) from the class window, else the model-wide one; (None, n) if too few."""
+        now = time.time()
+        with self._lock:
+            hit = self._p95.get((model, task_class))
+            if hit is not None and now - hit[0] < P95_TTL_S:
+                return hit[1]
+            cutoff = now - MAX_AGE_S
+            out: Tuple[Optional[float], int] = (None, 0)
+            for key in ((model, task_class), (model, "")):
+                vals = sorted(s for ts, s in self._lat.get(key, ()) if ts >= cutoff)
+                if len(vals) >= MIN_SAMPLES:
+                    out = (vals[min(len(vals) - 1, int(0.95 * len(vals)))], len(vals))
+                    break
+                out = (None, out[1] or len(vals))
+            self._p95[(model, task_class)] = (now, out)
+            return out
+
+
+class Router:
+    """
+    Picks model and max_tokens per call: the task class's preferred model
+    while its observed p95 fits the class SLO, else the first fallback that
+    does (or the fastest one when none does). Explicit `model` pins the choice.
+    """
+
+    def __init__(self, log_path: str = LOG_PATH) -> None:
+        self.log_path = Path(log_path) if log_path else None
+        self.tracker = LatencyTracker()
+        self.recent: Deque[Dict[str, Any]] = deque(maxlen=RECENT)
+        self._lock = threading.Lock()
+        self._seed()
+
+    def _seed(self) -> None:
+        if self.log_path is None or not self.log_path.exists():
+            return
+        try:
+            with open(self.log_path, encoding="utf-8") as fh:
+                tail = deque(fh, maxlen=WINDOW * len(MODELS))
+        except OSError:
+            return
+        for line in tail:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if rec.get("latency_s") is not None and not rec.get("error"):
+                self.tracker.record(rec["model"], rec.get("task_class", ""), float(rec["latency_s"]), rec.get("ts"))
+            self.recent.append(rec)
+
+    def route(self, prompt: str, task: str = "", model: Optional[str] = None,
+              max_tokens: Optional[int] = None) -> Route:
+        tc = classify(task, prompt)
+        tokens = max_tokens or tc.max_tokens
+        slo = tc.slo
+        n_prompt = estimate_tokens(prompt)
+        if model:
+            p95, _ = self.tracker.p95(model, tc.name)
+            return Route(model, tokens, task, tc.name, "pinned by caller", p95, slo, n_prompt)
+        estimates = []
+        for name in tc.models:
+            p95, n = self.tracker.p95(name, tc.name)
+            est = p95 if p95 is not None else MODELS[name].prior_p95_s
+            estimates.append((name, est))
+            if est <= slo:
+                src = "prior" if p95 is None else f"p95 of {n}"
+                why = "preferred" if name == tc.models[0] else f"fallback ({tc.models[0]} over SLO)"
+                return Route(name, tokens, task, tc.name, f"{why}: {src} {est:.1f}s <= SLO {slo:.0f}s",
+                             est, slo, n_prompt)
+        name, est = min(estimates, key=lambda e: e[1])
+        return Route(name, tokens, task, tc.name, f"SLO at risk: fastest {name} at {est:.1f}s > SLO {slo:.0f}s",
+                     est, slo, n_prompt)
+
+    def record(self, route: Route, latency_s: float, usage: Optional[Dict[str, int]] = None,
+               error: str = "") -> Dict[str, Any]:
+        """
+        Append the decision to the audit log; only successful calls feed the
+        latency window (a fast 429 or a timeout says nothing about the p95).
+        """
+        if not error:
+            self.tracker.record(route.model, route.task_class, latency_s)
+        usage = usage or {}
+        p_tok = int(usage.get("prompt_tokens") or route.prompt_tokens)
+        c_tok = int(usage.get("completion_tokens") or 0)
+        rec = {**vars(route), "ts": round(time.time(), 3), "latency_s": round(latency_s, 3),
+               "prompt_tokens": p_tok, "completion_tokens": c_tok,
+               "cost_usd": round(cost_usd(route.model, p_tok, c_tok), 6), "error": error}
+        log.info("llm route %s/%s -> %s (%s) %.2fs $%.5f", route.task or "-", route.task_class, route.model,
+                 route.reason, latency_s, rec["cost_usd"])
+        with self._lock:
+            self.recent.append(rec)
+            if self.log_path is not None:
+                try:
+                    self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                    with open(self.log_path, "a", encoding="utf-8") as fh:
+                        fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                except OSError:
+                    pass  # auditing must never break generation
+        return rec
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per (task class, model): calls, p95, errors and spend over the in-memory window."""
+        rows: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        with self._lock:
+            recent = list(self.recent)
+        for r in recent:
+            row = rows.setdefault((r.get("task_class", ""), r["model"]), {
+                "task_class": r.get("task_class", ""), "model": r["model"], "calls": 0, "errors": 0,
+                "cost_usd": 0.0, "completion_tokens": 0})
+            row["calls"] += 1
+            row["errors"] += bool(r.get("error"))
+            row["cost_usd"] += r.get("cost_usd") or 0.0
+            row["completion_tokens"] += r.get("completion_tokens") or 0
+        for (cls, model), row in rows.items():
+            row["p95_s"] = self.tracker.p95(model, cls)[0]
+            row["cost_usd"] = round(row["cost_usd"], 4)
+        return sorted(rows.values(), key=lambda r: (r["task_class"], r["model"]))
+
+
+_router: Optional[Router] = None
+_router_lock = threading.Lock()
+
+
+def get_router() -> Router:
+    global _router
+    with _router_lock:
+        if _router is None:
+            _router = Router()
+        return _router
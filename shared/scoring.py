@@ -0,0 +1,189 @@
+# shared/scoring.py
+from __future__ import annotations
+import re
+from dataclasses import dataclass
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from .tracing import traced
+
+GOALS = ("Awareness", "Clicks", "Signups", "Demo Requests")
+
+FEATURES = (
+    "readability",    # Flesch reading ease, scaled to 0..1
+    "length_fit",     # 1 at the goal's ideal word count, falling off either side
+    "cta",            # goal-specific call-to-action present
+    "numerals",       # concrete numbers / percentages (capped)
+    "power_words",    # persuasive vocabulary (capped)
+    "you_focus",      # reader-directed ("you", "your")
+    "question",       # opens a loop with a question
+    "exclaim_excess", # more than one "!" reads as hype
+)
+
+# Ideal length in words per goal (short hooks for awareness, a bit more for demos).
+_IDEAL_WORDS: Dict[str, float] = {"Awareness": 18, "Clicks": 14, "Signups": 20, "Demo Requests": 24}
+
+# Per-goal feature weights, same order as FEATURES; tuned by hand for the prototype.
+_WEIGHTS: Dict[str, Sequence[float]] = {
+    "Awareness":     (1.4, 1.0, 0.3, 0.8, 1.2, 0.6, 0.6, -0.8),
+    "Clicks":        (1.0, 1.2, 1.2, 1.0, 1.0, 0.8, 0.8, -0.8),
+    "Signups":       (1.0, 0.8, 1.6, 0.8, 0.8, 1.0, 0.3, -0.8),
+    "Demo Requests": (0.8, 0.8, 1.8, 1.2, 0.6, 0.8, 0.3, -1.0),
+}
+
+_CTA: Dict[str, Dict[str, Sequence[str]]] = {
+    "English": {
+        "Awareness": ("learn more", "discover", "see how", "meet", "watch", "read"),
+        "Clicks": ("learn more", "see how", "read more", "find out", "explore", "click", "discover"),
+        "Signups": ("sign up", "join", "start free", "get started", "create your", "try it", "try free", "subscribe"),
+        "Demo Requests": ("book a demo", "request a demo", "get a demo", "schedule", "talk to", "see it in action", "book a call"),
+    },
+    "Spanish": {
+        "Awareness": ("descubre", "conoce", "mira"),
+        "Clicks": ("más información", "descubre", "haz clic", "explora"),
+        "Signups": ("regístrate", "únete", "empieza gratis", "suscríbete"),
+        "Demo Requests": ("solicita una demo", "agenda", "reserva una demo", "habla con"),
+    },
+    "French": {
+        "Awareness": ("découvrez", "rencontrez", "regardez"),
+        "Clicks": ("en savoir plus", "découvrez", "cliquez", "explorez"),
+        "Signups": ("inscrivez-vous", "rejoignez", "commencez gratuitement", "abonnez-vous"),
+        "Demo Requests": ("demandez une démo", "réservez une démo", "planifiez", "parlez à"),
+    },
+    "German": {
+        "Awareness": ("entdecken", "lernen sie", "sehen sie"),
+        "Clicks": ("mehr erfahren", "jetzt entdecken", "klicken", "erkunden"),
+        "Signups": ("registrieren", "jetzt starten", "kostenlos testen", "anmelden"),
+        "Demo Requests": ("demo anfordern", "demo buchen", "termin vereinbaren", "sprechen sie mit"),
+    },
+}
+
+_POWER: Dict[str, Sequence[str]] = {
+    "English": ("new", "free", "proven", "faster", "instantly", "save", "guaranteed", "exclusive",
+                "now", "easy", "secure", "results", "boost", "cut", "lower", "today", "simple"),
+    "Spanish": ("nuevo", "gratis", "probado", "rápido", "ahorra", "exclusivo", "ahora", "fácil", "seguro", "hoy"),
+    "French": ("nouveau", "gratuit", "prouvé", "rapide", "économisez", "exclusif", "maintenant", "facile", "sécurisé"),
+    "German": ("neu", "kostenlos", "bewährt", "schneller", "sparen", "exklusiv", "jetzt", "einfach", "sicher", "heute"),
+}
+
+_YOU: Dict[str, Sequence[str]] = {
+    "English": ("you", "your", "you're", "yours"),
+    "Spanish": ("tú", "tu", "usted", "su", "tus"),
+    "French": ("vous", "votre", "vos", "tu", "ton"),
+    "German": ("sie", "ihr", "ihre", "du", "dein"),
+}
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)?", re.UNICODE)
+_NUM = re.compile(r"\d+(?:[.,]\d+)?\s*%?|\$\s?\d")
+_SENT = re.compile(r"[.!?]+(?:\s|$)")
+_VOWELS = re.compile(r"[aeiouyáéíóúàèìòùâêîôûäëïöü]+", re.IGNORECASE)
+
+
+def _phrase_re(terms: Sequence[str]) -> re.Pattern:
+    return re.compile(r"(?<!\w)(?:" + "|".join(re.escape(t) for t in sorted(terms, key=len, reverse=True)) + r")(?!\w)",
+                      re.IGNORECASE)
+
+
+# Compiled once at import; one pattern per (language, goal) and per language.
+_CTA_RE = {lang: {g: _phrase_re(t) for g, t in goals.items()} for lang, goals in _CTA.items()}
+_POWER_RE = {lang: _phrase_re(t) for lang, t in _POWER.items()}
+_YOU_RE = {lang: _phrase_re(t) for lang, t in _YOU.items()}
+_W = np.array([_WEIGHTS[g] for g in GOALS], dtype=np.float64)  # (goals, features)
+
+
+def _syllables(word: str) -> int:
+    n = len(_VOWELS.findall(word))
+    if word.lower().endswith("e") and n > 1:
+        n -= 1
+    return max(1, n)
+
+
+def feature_matrix(texts: Sequence[str], goal: str, lang: str = "English") -> np.ndarray:
+    """(n_texts, n_features) matrix of raw features in 0..1 (exclaim_excess is 0/1)."""
+    lang = lang if lang in _CTA else "English"
+    cta_re, pow_re, you_re = _CTA_RE[lang][goal], _POWER_RE[lang], _YOU_RE[lang]
+    ideal = _IDEAL_WORDS[goal]
+    X = np.zeros((len(texts), len(FEATURES)), dtype=np.float64)
+    for i, t in enumerate(texts):
+        t = t or ""
+        words = _WORD.findall(t)
+        n_words = max(1, len(words))
+        n_sent = max(1, len(_SENT.findall(t)) or 1)
+        syl = sum(_syllables(w) for w in words) if words else 0
+        flesch = 206.835 - 1.015 * (n_words / n_sent) - 84.6 * (syl / n_words)
+        X[i] = (
+            flesch,
+            len(words),
+            bool(cta_re.search(t)),
+            len(_NUM.findall(t)),
+            len(pow_re.findall(t)),
+            len(you_re.findall(t)),
+            "?" in t,
+            t.count("!") > 1,
+        )
+    # Vectorised normalisation of the raw columns.
+    X[:, 0] = np.clip(X[:, 0] / 100.0, 0.0, 1.0)
+    X[:, 1] = np.exp(-((X[:, 1] - ideal) / ideal) ** 2)
+    X[:, 3] = np.minimum(X[:, 3], 2) / 2
+    X[:, 4] = np.minimum(X[:, 4], 3) / 3
+    X[:, 5] = np.minimum(X[:, 5], 2) / 2
+    return X
+
+
+def score_batch(texts: Sequence[str], goal: str, lang: str = "English") -> np.ndarray:
+    """
+    Deterministic 1–10 scores for `texts` against `goal`. One weighted sum per
+    row (matrix-vector product) squashed through a logistic, so scores are
+    comparable across batches.
+    """
+    if goal not in GOALS:
+        raise ValueError(f"Unknown goal: {goal!r}")
+    if not texts:
+        return np.zeros(0)
+    X = feature_matrix(texts, goal, lang)
+    w = _W[GOALS.index(goal)]
+    z = X @ w - w[w > 0].sum() / 2  # centre: "half of everything good" -> 5.5
+    return np.round(1 + 9 / (1 + np.exp(-z)), 1)
+
+
+@dataclass
+class ScoredVariant:
+    label: str
+    text: str
+    score: float
+    reasons: List[str]
+
+
+_REASONS = {
+    "readability": ("easy to read", "hard to read"),
+    "length_fit": ("right length", "length off target"),
+    "cta": ("clear CTA", "no CTA for this goal"),
+    "numerals": ("concrete numbers", "no numbers"),
+    "power_words": ("strong wording", "flat wording"),
+    "you_focus": ("speaks to the reader", "not reader-focused"),
+    "question": ("opens with a question", ""),
+    "exclaim_excess": ("", "too many '!'"),
+}
+
+
+@traced("score.rank_variants")
+def rank_variants(variants: Dict[str, str], goal: str, lang: str = "English") -> List[ScoredVariant]:
+    """Score labelled variants, best first, with the top positive/negative reasons."""
+    labels = list(variants)
+    texts = [variants[k] for k in labels]
+    if not texts:
+        return []
+    X = feature_matrix(texts, goal, lang)
+    scores = score_batch(texts, goal, lang)
+    w = _W[GOALS.index(goal)]
+    out: List[ScoredVariant] = []
+    for i, label in enumerate(labels):
+        contrib = X[i] * w - np.where(w > 0, w / 2, 0)
+        order = np.argsort(contrib)
+        reasons = [_REASONS[FEATURES[j]][0] for j in order[::-1][:2] if contrib[j] > 0 and _REASONS[FEATURES[j]][0]]
+        reasons += [_REASONS[FEATURES[j]][1] for j in order[:2] if contrib[j] < 0 and _REASONS[FEATURES[j]][1]]
+        out.append(ScoredVariant(label=label, text=texts[i], score=float(scores[i]), reasons=reasons))
+    out.sort(key=lambda v: v.score, reverse=True)
+    return out
+
@@ -0,0 +1,253 @@
+# shared/semantic.py
+from __future__ import annotations
+import hashlib
+import re
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 256 float32 dims = 1 KB per row, so 100k rows is ~100 MB and a top-k query
+# is one (n x 256) mat-vec product — a few ms on a laptop.
+DIM = 256
+# Prompts are mostly templates, so a one-field change (tone, length) still
+# scores ~0.96; keep the reuse bar above that and let callers put structured
+# options in the cache scope instead. Only used by callers that opt in to
+# similarity matching; the default is an exact prompt match.
+CACHE_THRESHOLD = 0.97   # prompt similarity needed to reuse a generation
+SIMILAR_THRESHOLD = 0.35 # lower bar for "you made something like this before"
+
+_WORD = re.compile(r"[^\W_]+(?:['’][^\W_]+)?", re.UNICODE)
+
+
+def _features(text: str) -> List[str]:
+    words = [w.lower() for w in _WORD.findall(text or "")]
+    return words + [a + " " + b for a, b in zip(words, words[1:])]
+
+
+def embed(text: str, dim: int = DIM) -> np.ndarray:
+    """
+    Hashing-trick embedding: unigrams + bigrams hashed (crc32) into `dim`
+    signed buckets, sublinear tf, L2-normalised. No vocabulary, no network.
+    """
+    v = np.zeros(dim, dtype=np.float32)
+    feats = _features(text)
+    if not feats:
+        return v
+    h = np.fromiter((zlib.crc32(f.encode("utf-8")) for f in feats), dtype=np.uint32, count=len(feats))
+    idx = (h % dim).astype(np.int64)
+    sign = np.where(h & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(v, idx, sign)
+    v = np.sign(v) * np.log1p(np.abs(v))
+    n = float(np.linalg.norm(v))
+    return v / n if n else v
+
+
+class VectorIndex:
+    """
+    Append-only cosine index over unit vectors. Rows live in one preallocated
+    float32 matrix that doubles when full; with `capacity` set it becomes a
+    ring that overwrites the oldest rows. Each row carries an int `tag` that
+    `search` can restrict to before ranking.
+    """
+
+    def __init__(self, dim: int = DIM, capacity: Optional[int] = None) -> None:
+        self.dim = dim
+        self.capacity = capacity
+        self._m = np.zeros((min(capacity or 1024, 1024), dim), dtype=np.float32)
+        self._tags = np.zeros(len(self._m), dtype=np.int32)
+        self._payloads: List[Any] = []
+        self._n = 0      # rows in use
+        self._next = 0   # next write slot (differs from _n once the ring wraps)
+
+    def __len__(self) -> int:
+        return self._n
+
+    def add(self, vec: np.ndarray, payload: Any, tag: int = 0) -> Tuple[int, Any]:
+        """Store a row; returns its slot and the payload the ring overwrote there (None if none)."""
+        if self._next == len(self._m):
+            if self.capacity and len(self._m) >= self.capacity:
+                self._next = 0
+            else:
+                grow = len(self._m) * 2 if not self.capacity else min(len(self._m) * 2, self.capacity)
+                m = np.zeros((grow, self.dim), dtype=np.float32)
+                m[: self._n] = self._m[: self._n]
+                self._m = m
+                self._tags = np.resize(self._tags, grow)
+        i = self._next
+        self._m[i] = vec
+        self._tags[i] = tag
+        evicted = None
+        if i < len(self._payloads):
+            evicted, self._payloads[i] = self._payloads[i], payload
+        else:
+            self._payloads.append(payload)
+        self._next += 1
+        self._n = max(self._n, self._next)
+        return i, evicted
+
+    def payload(self, slot: int) -> Any:
+        return self._payloads[slot] if 0 <= slot < self._n else None
+
+    def search(self, vec: np.ndarray, k: int = 5, min_score: float = 0.0,
+               tag: Optional[int] = None) -> List[Tuple[float, Any]]:
+        """Top-k (score, payload), best first; only rows with `tag` when given. argpartition keeps this O(n)."""
+        if not self._n or not vec.any():
+            return []
+        sims = self._m[: self._n] @ vec
+        if tag is not None:
+            sims[self._tags[: self._n] != tag] = -np.inf
+        k = min(k, self._n)
+        top = np.argpartition(-sims, k - 1)[:k]
+        top = top[np.argsort(-sims[top])]
+        return [(float(sims[i]), self._payloads[i]) for i in top if sims[i] >= min_score]
+
+    def clear(self) -> None:
+        self._n = self._next = 0
+        self._payloads = []
+
+
+@dataclass
+class CacheHit:
+    text: str
+    score: float
+    prompt: str
+    ts: float
+
+
+class SemanticCache:
+    """
+    Process-wide prompt -> completion cache. Entries only match within the
+    same scope: (model, temperature) plus whatever structured options the
+    caller passes as `extra`. Lookups match the exact prompt; with
+    `semantic=True` they fall back to the most similar prompt in the scope.
+    """
+
+    def __init__(self, threshold: float = CACHE_THRESHOLD, capacity: int = 100_000) -> None:
+        self.threshold = threshold
+        self._index = VectorIndex(capacity=capacity)
+        self._exact: Dict[str, int] = {}
+        self._scopes: Dict[str, List[int]] = {}  # scope -> [row tag in the index, live rows]
+        self._tags = 0  # next tag; never reused, so a dropped scope can't match a new one
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope(model: str, temperature: float, extra: str = "") -> str:
+        return f"{model}|{round(float(temperature), 1)}|{extra}"
+
+    @staticmethod
+    def _key(scope: str, prompt: str) -> str:
+        return hashlib.sha1(f"{scope}\n{prompt}".encode("utf-8")).hexdigest()
+
+    def _get(self, scope: str, prompt: str) -> Optional[tuple]:
+        slot = self._exact.get(self._key(scope, prompt))
+        row = self._index.payload(slot) if slot is not None else None
+        # The ring may have overwritten the slot since it was recorded.
+        return row if row is not None and row[:2] == (scope, prompt) else None
+
+    def lookup(self, prompt: str, model: str, temperature: float, extra: str = "",
+               threshold: Optional[float] = None, semantic: bool = False) -> Optional[CacheHit]:
+        scope = self._scope(model, temperature, extra)
+        with self._lock:
+            row = self._get(scope, prompt)
+            if row is not None:
+                self.hits += 1
+                return CacheHit(text=row[2], score=1.0, prompt=prompt, ts=row[3])
+            tag = self._scopes[scope][0] if scope in self._scopes else None
+            if semantic and tag is not None:
+                limit = self.threshold if threshold is None else threshold
+                found = self._index.search(embed(prompt), k=1, min_score=limit, tag=tag)
+                if found:
+                    score, (_, p, out, ts) = found[0]
+                    self.hits += 1
+                    return CacheHit(text=out, score=score, prompt=p, ts=ts)
+            self.misses += 1
+        return None
+
+    def store(self, prompt: str, model: str, temperature: float, output: str, extra: str = "") -> None:
+        if not output:
+            return
+        scope = self._scope(model, temperature, extra)
+        vec = embed(prompt)
+        with self._lock:
+            if self._get(scope, prompt) is not None:
+                return  # already cached
+            entry = self._scopes.get(scope)
+            if entry is None:
+                entry = self._scopes[scope] = [self._tags, 0]
+                self._tags += 1
+            entry[1] += 1
+            slot, evicted = self._index.add(vec, (scope, prompt, output, time.time()), entry[0])
+            if evicted is not None:
+                # The ring overwrote a row: drop its keys so the maps stay as small as the ring.
+                old = evicted[0]
+                self._exact.pop(self._key(old, evicted[1]), None)
+                self._scopes[old][1] -= 1
+                if not self._scopes[old][1]:
+                    del self._scopes[old]
+            self._exact[self._key(scope, prompt)] = slot
+
+    def clear(self) -> None:
+        with self._lock:
+            self._index.clear()
+            self._exact.clear()
+            self._scopes.clear()
+            self._tags = 0
+            self.hits = self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+
+_cache: Optional[SemanticCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> SemanticCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = SemanticCache()
+        return _cache
+
+
+def history_text(item: Dict[str, Any]) -> str:
+    """What we embed for a history item: its generated text plus the meta values."""
+    from .compliance import item_text
+
+    meta = item.get("meta") or {}
+    extra = " ".join(str(v) for v in meta.values() if isinstance(v, (str, int, float)))
+    return f"{item_text(item)}\n{extra}".strip()
+
+
+class HistoryIndex:
+    """
+    Index over a session's history list. History is append-only, so `sync`
+    embeds only the items added since the last call (a clear is detected by
+    the list shrinking and triggers a rebuild).
+    """
+
+    def __init__(self) -> None:
+        self._index = VectorIndex()
+        self._seen = 0
+
+    def sync(self, items: Sequence[Dict[str, Any]]) -> None:
+        if len(items) < self._seen:
+            self._index.clear()
+            self._seen = 0
+        for i in range(self._seen, len(items)):
+            self._index.add(embed(history_text(items[i])), i)
+        self._seen = len(items)
+
+    def similar(self, items: Sequence[Dict[str, Any]], query: str, k: int = 3,
+                kinds: Optional[Sequence[str]] = None,
+                min_score: float = SIMILAR_THRESHOLD) -> List[Tuple[float, Dict[str, Any]]]:
+        self.sync(items)
+        found = self._index.search(embed(query), k=k * 4 if kinds else k, min_score=min_score)
+        out = [(s, items[i]) for s, i in found if not kinds or items[i].get("kind") in kinds]
+        return out[:k]
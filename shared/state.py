@@ -1,7 +1,18 @@
 # shared/state.py
 from __future__ import annotations
+import json
+import re
+import sys
+import time
+import uuid
 import streamlit as st
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+_WS_PARAM = "ws"
+_WS_RE = re.compile(r"[0-9a-f]{32}")
+REFRESH_S = 2.0  # how often a session re-reads the shared company profile
 
 @dataclass
 class CompanyProfile:
@@ -9,29 +20,197 @@ class CompanyProfile:
     industry: str = "Technology"
     size: str = "Mid-market"
     goals: str = ""
+    audience: str = ""
+    brand_voice: str = ""
+    brand_rules: str = ""
+    website: str = ""
+    id: str = ""  # ProfileStore id once saved
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "CompanyProfile":
+        known = {f.name for f in fields(cls)}
+        return cls(**{k: ("" if v is None else str(v)) for k, v in d.items() if k in known})
+
+def buffer():
+    """Process-wide `backend.WriteBuffer` for PRESENCE_STATE_URL; None when state is session-only."""
+    from . import backend
+
+    return backend.get_buffer()
+
+def workspace_id() -> str:
+    """
+    Stable id of this browser's state in the shared backend, so any replica
+    can serve it and it survives restarts. Kept in the `?ws=` query param:
+    the link is the key, so treat it as private. '' when headless or when
+    state is session-only.
+    """
+    from .llm import headless
+
+    if headless() or st.session_state.get("_workspace_local") or buffer() is None:
+        return ""
+    wid = st.session_state.get("_workspace")
+    if not wid:
+        try:
+            wid = str(st.query_params.get(_WS_PARAM, ""))
+        except Exception:
+            wid = ""
+        if not _WS_RE.fullmatch(wid):
+            wid = uuid.uuid4().hex
+        st.session_state["_workspace"] = wid
+    try:
+        if st.query_params.get(_WS_PARAM) != wid:
+            st.query_params[_WS_PARAM] = wid  # page switches drop query params; put it back
+    except Exception:
+        pass
+    return wid
+
+def _company_key() -> str:
+    wid = workspace_id()
+    return f"presence:{wid}:company" if wid else ""
+
+def _persist_company() -> None:
+    key = _company_key()
+    if key:
+        raw = json.dumps({**asdict(get_company()), "brand_rules": get_brand_rules()}, ensure_ascii=False)
+        st.session_state["_company_raw"] = raw
+        buffer().set(key, raw)
+
+def _profile_changed() -> None:
+    from . import prefetch
+
+    _persist_company()
+    prefetch.cancel()  # speculative generations were for the previous profile
+
+def _refresh_company(force: bool = False) -> None:
+    """Read-through for the active profile: adopt the shared copy when another replica changed it."""
+    key = _company_key()
+    if not key or (not force and time.time() - st.session_state.get("_company_checked", 0) < REFRESH_S):
+        return
+    st.session_state["_company_checked"] = time.time()
+    raw = buffer().backend.get(key)
+    if raw and raw != st.session_state.get("_company_raw"):
+        st.session_state["_company_raw"] = raw
+        data = json.loads(raw)
+        st.session_state["company"] = CompanyProfile.from_dict(data)
+        st.session_state["brand_rules"] = data.get("brand_rules", "")
+
+def _sync_shared() -> None:
+    from . import history, tracing
+
+    try:
+        with tracing.span("state.sync"):
+            _refresh_company(force="company" not in st.session_state)
+            history.sync()
+    except Exception:
+        # Backend unreachable: keep this session working on session_state alone.
+        st.session_state["_workspace_local"] = True
+        history.detach()
 
 def init() -> None:
+    from . import tracing
+
+    # Root span of this rerun, named after the calling page script.
+    tracing.begin_rerun(Path(sys._getframe(1).f_code.co_filename).stem)
+    _sync_shared()
     st.session_state.setdefault("company", CompanyProfile())
     st.session_state.setdefault("brand_rules", "")
     st.session_state.setdefault("history", [])
     # cache: None / client
     st.session_state.setdefault("_openai_ready", None)
+    try:
+        from . import memprof
+        memprof.sample()  # rate-limited per session; feeds Admin → Memory
+    except Exception:
+        pass
+    try:
+        from . import jobs
+        jobs.deliver()  # background results land in history on whichever page is open
+    except Exception:
+        pass
 
-def set_company(**kwargs) -> None:
-    c = st.session_state.get("company", CompanyProfile())
+def set_company(profile: Optional[Dict[str, Any]] = None, **kwargs) -> None:
+    """
+    Replace the active profile with `profile` (a dict; `{}` clears it to
+    blanks) and/or update single fields via kwargs. Use `save_company` to
+    also persist it in the profile store.
+    """
+    if profile is not None:
+        blank = {f.name: "" for f in fields(CompanyProfile)}
+        c = CompanyProfile.from_dict({**blank, **profile})
+    else:
+        c = get_company() or CompanyProfile()
     for k, v in kwargs.items():
         if hasattr(c, k):
             setattr(c, k, v)
     st.session_state["company"] = c
+    st.session_state["brand_rules"] = c.brand_rules
+    _profile_changed()
 
 def get_company() -> CompanyProfile:
     c = st.session_state.get("company")
     if isinstance(c, dict):
         # migrate old dict to dataclass
-        c = CompanyProfile(**c)
+        c = CompanyProfile.from_dict(c)
         st.session_state["company"] = c
     return c
 
+def save_company(profile: Dict[str, Any]):
+    """Persist `profile` in the profile store and make it the active client. Returns the ProfileVersion."""
+    from . import profiles
+
+    c = get_company()
+    pv = profiles.get_store().upsert(profile, pid=getattr(c, "id", "") or None)
+    switch_company(pv.id)
+    try:
+        from . import prefetch
+        prefetch.schedule(pv)  # opt-in; warms the cache for the likely next page
+    except Exception:
+        pass
+    try:
+        from . import media_store
+        if media_store.DEFAULT_PATH.exists():  # Media Monitor in use: tag for the saved company
+            media_store.get_store().retag_for(pv.data)
+    except Exception:
+        pass
+    return pv
+
+def switch_company(pid: str) -> bool:
+    """Make a stored profile the active client: one dict lookup, derived context already built."""
+    from . import profiles
+
+    pv = profiles.get_store().get(pid)
+    if pv is None:
+        return False
+    st.session_state["company"] = CompanyProfile.from_dict({**pv.data, "id": pv.id})
+    st.session_state["brand_rules"] = pv.data["brand_rules"]
+    st.session_state["_company_version"] = pv
+    _profile_changed()
+    return True
+
+def list_companies() -> List[Any]:
+    from . import profiles
+
+    return profiles.get_store().list()
+
+def company_version():
+    """
+    Derived artifacts (normalized dict, prompt context block, brand-rule
+    matchers) for the active profile. Reuses the stored version when the
+    session profile is unchanged; unsaved edits are derived once per content.
+    """
+    from . import profiles
+
+    c = get_company() or CompanyProfile()
+    data = profiles.normalize(c)
+    if not data["brand_rules"]:
+        data["brand_rules"] = get_brand_rules()  # older pages set rules on their own key
+    cached = st.session_state.get("_company_version")
+    if cached is not None and cached.fingerprint == profiles.fingerprint(data):
+        return cached
+    pv = profiles.derive(data, pid=getattr(c, "id", ""))
+    st.session_state["_company_version"] = pv
+    return pv
+
 def get_company_as_dict() -> dict:
     c = get_company()
     return asdict(c)
@@ -41,6 +220,7 @@ def get_brand_rules() -> str:
 
 def set_brand_rules(text: str) -> None:
     st.session_state["brand_rules"] = text
+    _profile_changed()
 
 def has_openai() -> bool:
     if st.session_state.get("_openai_ready") is not None:
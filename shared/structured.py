@@ -0,0 +1,239 @@
+# shared/structured.py
+"""
+Schema-constrained JSON outputs: the schemas the variant-producing pages ask
+for, an incremental parser that yields each list item as soon as its object
+closes in a stream, and a local repair pass for truncated / sloppy JSON.
+"""
+from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+
+@dataclass(frozen=True)
+class Schema:
+    """A JSON object holding one list (`key`) of flat string-field objects."""
+    name: str
+    key: str
+    fields: Tuple[str, ...]
+    min_items: int = 1
+    max_items: Optional[int] = None
+
+    def json_schema(self) -> Dict[str, Any]:
+        item = {
+            "type": "object",
+            "properties": {f: {"type": "string"} for f in self.fields},
+            "required": list(self.fields),
+            "additionalProperties": False,
+        }
+        arr: Dict[str, Any] = {"type": "array", "items": item}
+        # Structured-outputs strict mode rejects minItems/maxItems; the count is in the prompt.
+        return {
+            "type": "object",
+            "properties": {self.key: arr},
+            "required": [self.key],
+            "additionalProperties": False,
+        }
+
+    def response_format(self) -> Dict[str, Any]:
+        return {"type": "json_schema",
+                "json_schema": {"name": self.name, "schema": self.json_schema(), "strict": True}}
+
+    def instructions(self) -> str:
+        """Format instructions appended to the prompt (also covers models without response_format)."""
+        n = f"exactly {self.min_items}" if self.min_items == self.max_items else f"at least {self.min_items}"
+        shape = ", ".join(f'"{f}": "..."' for f in self.fields)
+        return (f'Respond with JSON only, no prose or code fences: {{"{self.key}": [{{{shape}}}, ...]}} '
+                f"with {n} item{'s' if self.min_items != 1 else ''} in \"{self.key}\".")
+
+
+def variants(n: int = 3) -> Schema:
+    return Schema("variants", "variants", ("title", "body"), min_items=n, max_items=n)
+
+
+def hooks(n: int = 10) -> Schema:
+    return Schema("hooks", "hooks", ("hook", "format", "visual", "cta"), min_items=n, max_items=n)
+
+
+# An item is an object directly inside the top-level list, `{"key": [` or a bare `[`.
+_ITEM_PARENTS = (["{", "["], ["["])
+
+
+class ItemStream:
+    """
+    Incremental parser for `{"<key>": [{...}, {...}, ...]}` (or a bare list). `feed(chunk)`
+    returns the items whose objects closed within that chunk; each character
+    is scanned once, so feeding a whole stream is O(length).
+    """
+
+    def __init__(self) -> None:
+        self._buf: List[str] = []
+        self._pos = 0            # chars scanned so far
+        self._stack: List[str] = []
+        self._in_str = False
+        self._esc = False
+        self._start: Optional[int] = None  # offset of the current item's '{'
+        self.items: List[Dict[str, Any]] = []
+
+    @property
+    def text(self) -> str:
+        return "".join(self._buf)
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        if not chunk:
+            return []
+        self._buf.append(chunk)
+        base = self._pos
+        self._pos += len(chunk)
+        new: List[Dict[str, Any]] = []
+        for i, ch in enumerate(chunk, base):
+            if self._in_str:
+                if self._esc:
+                    self._esc = False
+                elif ch == "\\":
+                    self._esc = True
+                elif ch == '"':
+                    self._in_str = False
+                continue
+            if ch == '"':
+                self._in_str = bool(self._stack)  # quotes outside the JSON (prose) are ignored
+            elif ch in "{[":
+                if ch == "{" and self._stack in _ITEM_PARENTS:
+                    self._start = i
+                self._stack.append(ch)
+            elif ch in "}]" and self._stack:
+                self._stack.pop()
+                if ch == "}" and self._start is not None and self._stack in _ITEM_PARENTS:
+                    item = self._load(self._start, i + 1)
+                    self._start = None
+                    if item is not None:
+                        self.items.append(item)
+                        new.append(item)
+        return new
+
+    def _load(self, start: int, end: int) -> Optional[Dict[str, Any]]:
+        if len(self._buf) > 1:
+            self._buf = ["".join(self._buf)]
+        try:
+            obj = json.loads(self._buf[0][start:end])
+        except ValueError:
+            return None
+        return obj if isinstance(obj, dict) else None
+
+
+_FENCE = re.compile(r"^\s*```[a-zA-Z]*\s*|\s*```\s*$")
+
+
+def repair(text: str) -> Optional[Any]:
+    """
+    Best-effort local repair: strips code fences and surrounding prose, drops
+    trailing commas and closes an unterminated string / open brackets (a
+    completion cut off by max_tokens). None when it still does not parse.
+    """
+    s = _FENCE.sub("", text or "").strip()
+    starts = [i for i in (s.find("{"), s.find("[")) if i >= 0]
+    if not starts:
+        return None
+    s = s[min(starts):]
+    try:
+        return json.loads(s)
+    except ValueError:
+        pass
+    out: List[str] = []
+    stack: List[str] = []
+    in_str = esc = False
+    for ch in s:
+        if in_str:
+            out.append(ch)
+            if esc:
+                esc = False
+            elif ch == "\\":
+                esc = True
+            elif ch == '"':
+                in_str = False
+            continue
+        if ch == '"':
+            in_str = True
+        elif ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+        elif ch in "}]":
+            _drop_trailing_comma(out)
+            if not stack:
+                break  # prose after the JSON
+            stack.pop()
+            out.append(ch)
+            if not stack:
+                break
+            continue
+        out.append(ch)
+    if in_str:
+        out.append('"')
+    if stack:
+        # Cut a dangling key (`, "bo` / `, "body":`) before closing the object.
+        tail = "".join(out).rstrip()
+        if stack[-1] == "}":
+            tail = re.sub(r'([{,])\s*"(?:[^"\\]|\\.)*"\s*:?\s*$', r"\1", tail)
+        out = [tail.rstrip().rstrip(",")]
+        out.extend(reversed(stack))
+    try:
+        return json.loads("".join(out))
+    except ValueError:
+        return None
+
+
+def _drop_trailing_comma(out: List[str]) -> None:
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
+
+
+def coerce(obj: Any, schema: Schema) -> List[Dict[str, str]]:
+    """Items of `obj` in the schema's shape; bare strings map to the first field, empty items are dropped."""
+    if isinstance(obj, dict):
+        raw = obj.get(schema.key)
+        if raw is None:
+            lists = [v for v in obj.values() if isinstance(v, list)]
+            raw = lists[0] if len(lists) == 1 else ([obj] if any(f in obj for f in schema.fields) else [])
+    else:
+        raw = obj if isinstance(obj, list) else []
+    items: List[Dict[str, str]] = []
+    for it in raw:
+        if isinstance(it, str):
+            it = {schema.fields[0]: it}
+        if not isinstance(it, dict):
+            continue
+        item = {f: str(it.get(f) or "").strip() for f in schema.fields}
+        if any(item.values()):
+            items.append(item)
+    return items[: schema.max_items] if schema.max_items else items
+
+
+@dataclass
+class StructuredResult:
+    items: List[Dict[str, str]] = field(default_factory=list)
+    raw: str = ""
+    source: str = "api"      # "api" | "cache" | "offline"
+    repaired: bool = False   # needed local repair
+    topped_up: int = 0       # items added by a follow-up call
+
+
+def parse(text: str, schema: Schema) -> StructuredResult:
+    """
+    Parse a finished completion. Invalid JSON keeps the items whose objects
+    closed (a truncated last item is dropped rather than half-rendered); only
+    when none did is the whole text repaired locally.
+    """
+    try:
+        return StructuredResult(coerce(json.loads(text), schema), raw=text)
+    except ValueError:
+        pass
+    stream = ItemStream()
+    stream.feed(text or "")
+    items = coerce({schema.key: stream.items}, schema)
+    if not items:
+        fixed = repair(text)
+        items = coerce(fixed, schema) if fixed is not None else []
+    return StructuredResult(items, raw=text, repaired=True)
@@ -0,0 +1,259 @@
+# shared/tagging.py
+"""
+Local sentiment and entity tagging for Media Monitor items (no LLM). A batch
+of texts is joined and scanned once: one tokenizer pass looked up in the
+sentiment lexicon (a dict, phrases by first word) and one alternation regex
+over the entity dictionary. Per-item scores are summed with numpy, so the
+cost is a couple of passes per few thousand items, not a call per headline.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+from .matcher import compile_terms
+from .tracing import traced
+
+BUILTIN_PATH = Path(__file__).parent / "lexicons" / "sentiment.json"
+
+POSITIVE, NEUTRAL, NEGATIVE = "positive", "neutral", "negative"
+LABELS = (POSITIVE, NEUTRAL, NEGATIVE)
+COMPANY, COMPETITOR = "company", "competitor"
+
+POSITIVE_AT = 0.3    # normalized score at/above which an item is positive
+NEGATIVE_AT = -0.3
+_ALPHA = 15.0        # score = raw / sqrt(raw² + α): one weight-1 word stays neutral
+_NEGATED = -0.75     # weight multiplier for the first term one or two words after a negator
+BATCH = 2000         # items joined into one scan
+
+_SEP = "\x00"        # never matched by \w or \s, so no entity alias spans two items
+_BREAK = "\x01"      # item boundary token in the sentiment pass
+_CLAUSE = frozenset(",;:.!?\x01")  # tokens that end a negator's scope
+_WORD = re.compile(r"[\w'-]+|[,;:.!?\x01]")
+_SCHEME = "2"        # bump when tokenization/scoring changes so stored scores are recomputed
+_HTML = re.compile(r"<[^>]+>")
+_LEGAL = re.compile(r"[,\s]+(?:inc|incorporated|llc|ltd|limited|corp|corporation|co|gmbh|plc|ag|sa|s\.a|pty|bv)\.?$", re.I)
+
+
+def _canon(text: str) -> str:
+    return " ".join(text.lower().replace("’", "'").split())
+
+
+def text_of(entry: Any) -> str:
+    """Title and summary of a feed entry / stored item, markup stripped."""
+    title = str(entry.get("title") or "")
+    summary = str(entry.get("summary") or "")
+    if "<" in summary:
+        summary = _HTML.sub(" ", summary)
+    return f"{title}\n{summary}".replace(_SEP, " ")
+
+
+# ---- entity dictionary -------------------------------------------------------
+
+@dataclass(frozen=True)
+class Entity:
+    name: str                  # display / stored name
+    kind: str                  # COMPANY or COMPETITOR
+    aliases: Tuple[str, ...]   # surface forms matched (whole words, case-insensitive)
+
+
+def aliases_for(name: str, website: str = "") -> Tuple[str, ...]:
+    """`name`, `name` without a legal suffix ("Acme Inc." -> "Acme") and the website's domain stem."""
+    out = [name.strip()]
+    short = _LEGAL.sub("", name.strip())
+    out.append(short)
+    host = re.sub(r"^[a-z][a-z0-9+.-]*://", "", website.strip().lower()).split("/")[0]
+    host = host[4:] if host.startswith("www.") else host
+    if "." in host:
+        out.append(host.rsplit(".", 1)[0].split(".")[-1])
+    return tuple(dict.fromkeys(a for a in out if len(a) >= 3))
+
+
+def parse_competitors(spec: str) -> List[Entity]:
+    """
+    Comma-separated competitors; `|` adds aliases to one of them:
+    `Globex | Globex Corp, Initech`.
+    """
+    out: List[Entity] = []
+    for item in (spec or "").split(","):
+        names = [" ".join(n.split()) for n in item.split("|") if n.strip()]
+        if names:
+            extra = [a for n in names for a in aliases_for(n)]
+            out.append(Entity(names[0], COMPETITOR, tuple(dict.fromkeys(extra))))
+    return out
+
+
+@dataclass(frozen=True)
+class EntityDict:
+    entities: Tuple[Entity, ...] = ()
+
+    @property
+    def empty(self) -> bool:
+        return not self.entities
+
+    def names(self, kind: Optional[str] = None) -> List[str]:
+        return [e.name for e in self.entities if kind is None or e.kind == kind]
+
+    def to_json(self) -> str:
+        return json.dumps([[e.name, e.kind, list(e.aliases)] for e in self.entities], ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text: Optional[str]) -> "EntityDict":
+        try:
+            rows = json.loads(text or "[]")
+        except ValueError:
+            return cls()
+        return cls(tuple(Entity(str(n), str(k), tuple(a)) for n, k, a in rows))
+
+
+def entities_for(profile: Dict[str, str], competitors: str = "") -> EntityDict:
+    """Entity dictionary for a normalized profile (our company) plus a competitor spec."""
+    out: List[Entity] = []
+    name = (profile or {}).get("name", "").strip()
+    if name:
+        out.append(Entity(name, COMPANY, aliases_for(name, profile.get("website", ""))))
+    taken = {_canon(name)} if name else set()
+    for e in parse_competitors(competitors):
+        if _canon(e.name) not in taken:
+            taken.add(_canon(e.name))
+            out.append(e)
+    return EntityDict(tuple(out))
+
+
+# ---- sentiment lexicon -------------------------------------------------------
+
+def load_lexicon(path: Path = BUILTIN_PATH, lang: str = "English") -> Dict[str, Any]:
+    """{"positive": {term: weight}, "negative": {term: weight}, "negators": [...]}"""
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh).get(lang, {})
+
+
+def lexicon_version(path: Path = BUILTIN_PATH) -> str:
+    """Content hash of the lexicon file plus the scoring scheme; stored tags are recomputed when it changes."""
+    try:
+        return hashlib.sha1(path.read_bytes() + _SCHEME.encode()).hexdigest()[:12]
+    except OSError:
+        return ""
+
+
+class Tags(NamedTuple):
+    score: float                           # -1 … 1
+    label: str                             # POSITIVE / NEUTRAL / NEGATIVE
+    entities: List[Tuple[str, str]]        # [(entity name, kind), ...] in first-seen order
+
+
+class Tagger:
+    """A compiled lexicon + entity dictionary. Build with `get_tagger`."""
+
+    def __init__(self, lexicon: Dict[str, Any], entities: EntityDict) -> None:
+        weights: Dict[str, float] = {}
+        for term, w in (lexicon.get("positive") or {}).items():
+            weights[_canon(term)] = float(w)
+        for term, w in (lexicon.get("negative") or {}).items():
+            weights[_canon(term)] = -float(w)
+        self.weights = weights
+        # Multi-word terms, by first word: phrase lengths longest first.
+        self._phrases: Dict[str, List[int]] = {}
+        for term in weights:
+            words = term.split()
+            if len(words) > 1:
+                self._phrases.setdefault(words[0], []).append(len(words))
+        for lens in self._phrases.values():
+            lens.sort(reverse=True)
+        self._negators = frozenset(_canon(n) for n in lexicon.get("negators") or [])
+        self.entities = entities
+        self._alias: Dict[str, Tuple[str, str]] = {}
+        for e in entities.entities:
+            for a in e.aliases:
+                self._alias.setdefault(_canon(a), (e.name, e.kind))
+        self._ent_re = compile_terms(self._alias)
+
+    def _sentiment(self, texts: List[str]) -> np.ndarray:
+        # One tokenizer pass over the whole batch; _BREAK tokens mark item boundaries
+        # and, like clause punctuation, end a negator's scope.
+        toks = _WORD.findall(f" {_BREAK} ".join(texts).lower().replace("’", "'"))
+        weights, phrases, negators = self.weights, self._phrases, self._negators
+        pos: List[int] = []
+        w: List[float] = []
+        neg = -3  # index of the last negator still in scope
+        i, n = 0, len(toks)
+        while i < n:
+            t = toks[i]
+            if t in _CLAUSE:
+                neg = -3
+                i += 1
+                continue
+            wt, step = weights.get(t), 1
+            for k in phrases.get(t, ()):
+                pw = weights.get(" ".join(toks[i:i + k]))
+                if pw is not None:
+                    wt, step = pw, k
+                    break
+            if wt is not None:
+                # "not good", "not very good": only the first term after the negator.
+                if i - neg <= 2:
+                    wt *= _NEGATED
+                neg = -3
+                pos.append(i)
+                w.append(wt)
+            elif t in negators:
+                neg = i
+            i += step
+        raw = np.zeros(len(texts))
+        if pos:
+            doc = np.cumsum(np.fromiter((t == _BREAK for t in toks), dtype=bool, count=n))
+            raw = np.bincount(doc[pos], weights=np.asarray(w), minlength=len(texts))
+        return raw / np.sqrt(raw * raw + _ALPHA)
+
+    def _entities(self, texts: List[str]) -> List[List[Tuple[str, str]]]:
+        ents: List[List[Tuple[str, str]]] = [[] for _ in texts]
+        if self._ent_re is None:
+            return ents
+        joined = _SEP.join(texts)
+        found = [(m.start(), self._alias.get(_canon(m.group(0)))) for m in self._ent_re.finditer(joined)]
+        if found:
+            starts = np.cumsum([0] + [len(t) + 1 for t in texts[:-1]])
+            doc = np.searchsorted(starts, np.asarray([p for p, _ in found]), side="right") - 1
+            for i, (_, ent) in zip(doc.tolist(), found):
+                if ent is not None and ent not in ents[i]:
+                    ents[i].append(ent)
+        return ents
+
+    @traced("tagging.tag")
+    def tag(self, texts: Iterable[str]) -> List[Tags]:
+        """Tags for each text, in order."""
+        texts = [t.replace(_SEP, " ").replace(_BREAK, " ") for t in texts]
+        out: List[Tags] = []
+        for i in range(0, len(texts), BATCH):
+            chunk = texts[i:i + BATCH]
+            scores, ents = self._sentiment(chunk), self._entities(chunk)
+            labels = np.where(scores >= POSITIVE_AT, POSITIVE, np.where(scores <= NEGATIVE_AT, NEGATIVE, NEUTRAL))
+            out.extend(Tags(round(float(s), 3), str(lb), e) for s, lb, e in zip(scores, labels, ents))
+        return out
+
+    def tag_entries(self, entries: Iterable[Any]) -> List[Tags]:
+        return self.tag(text_of(e) for e in entries)
+
+
+# (lexicon version, entity json) -> tagger; rebuilt when either changes.
+_taggers: Dict[Tuple[str, str], Tagger] = {}
+_lock = threading.Lock()
+
+
+def get_tagger(entities: Optional[EntityDict] = None, path: Path = BUILTIN_PATH) -> Tagger:
+    entities = entities or EntityDict()
+    key = (f"{path}:{os.path.getmtime(path) if os.path.exists(path) else 0}", entities.to_json())
+    with _lock:
+        t = _taggers.get(key)
+        if t is None:
+            if len(_taggers) > 16:
+                _taggers.clear()
+            t = _taggers[key] = Tagger(load_lexicon(path), entities)
+        return t
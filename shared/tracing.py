@@ -0,0 +1,392 @@
+# shared/tracing.py
+"""
+Lightweight tracing: `span(name, **attrs)` context managers around the
+stages of a rerun (prompt building, LLM calls, exports, dataframe building)
+appended to a local JSONL trace file, plus opt-in cProfile captures of the
+next N reruns of a page (Admin → Tracing & profiling).
+
+Each script run gets a root "rerun" span, opened by `state.init()` and closed
+when Streamlit reports the run finished; spans opened during the run (and in
+jobs it submits) are its children.
+"""
+from __future__ import annotations
+import atexit
+import contextvars
+import cProfile
+import functools
+import itertools
+import json
+import os
+import pstats
+import threading
+import time
+import weakref
+from collections import defaultdict, deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# PRESENCE_TRACE_PATH="" keeps spans in memory only (Admin still shows them).
+TRACE_PATH = os.environ.get("PRESENCE_TRACE_PATH", str(Path("data") / "traces.jsonl"))
+PROFILE_DIR = Path(os.environ.get("PRESENCE_PROFILE_DIR", str(Path("data") / "cprofile")))
+MAX_BYTES = 20 * 1024 * 1024  # the trace file is rotated to <name>.1 beyond this
+FLUSH_AT = 200                # buffered spans are written after this many ...
+FLUSH_S = 1.0                 # ... or this many seconds, whichever comes first
+RECENT = 2000                 # spans kept in memory for the Admin page
+CAPTURES = 20                 # profiles listed in Admin (files stay on disk)
+
+
+class Span:
+    """One timed block; use via `span()` / `traced()`. `ms` is set when it ends."""
+    __slots__ = ("name", "trace_id", "span_id", "parent", "attrs", "start", "t0", "ms", "error",
+                 "thread", "_token")
+
+    def __init__(self, name: str, attrs: Dict[str, Any]) -> None:
+        parent = _current.get()
+        self.name = name
+        self.span_id = _new_id()
+        self.trace_id = parent.trace_id if parent else self.span_id
+        self.parent = parent
+        self.attrs = attrs
+        self.start = time.time()
+        self.t0 = time.perf_counter()
+        self.ms: Optional[float] = None
+        self.error = ""
+        self.thread = ""
+        self._token: Any = None
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        _current.reset(self._token)
+        if exc is not None and not _control_flow(exc):
+            self.error = f"{exc_type.__name__}: {exc}"[:300]
+        _close(self)
+
+    def record(self) -> Dict[str, Any]:
+        return {"name": self.name, "trace": self.trace_id, "span": self.span_id,
+                "parent": self.parent.span_id if self.parent else None, "ts": round(self.start, 4),
+                "ms": self.ms, "thread": self.thread, "attrs": self.attrs, "error": self.error}
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("presence_span", default=None)
+
+
+# Random per-process prefix + counter: unique across replicas, far cheaper than uuid4 per span.
+_ID_PREFIX = os.urandom(4).hex()
+_ids = itertools.count(1)
+
+
+def _new_id() -> str:
+    return f"{_ID_PREFIX}{next(_ids):08x}"
+
+
+def _close(sp: Span) -> None:
+    sp.ms = round((time.perf_counter() - sp.t0) * 1000, 3)
+    sp.thread = threading.current_thread().name
+    # A finished rerun, or a job outliving its rerun, is written out right away.
+    done = sp.parent.ms is not None if sp.parent else sp.name == "rerun"
+    (_tracer or get_tracer()).add(sp, flush=done)
+
+
+def span(name: str, **attrs: Any) -> Span:
+    """Time a `with` block as a child of the current span; `as sp` lets it add attrs (`sp.set(rows=n)`)."""
+    return Span(name, attrs)
+
+
+def _control_flow(e: BaseException) -> bool:
+    # st.rerun() / st.stop() unwind through spans by raising; they are not failures.
+    return type(e).__name__ in ("RerunException", "StopException")
+
+
+def traced(name: Optional[str] = None) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator form of `span`."""
+    def deco(fn: Callable[..., Any]) -> Callable[..., Any]:
+        label = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(label):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def current() -> Optional[Span]:
+    return _current.get()
+
+
+class Tracer:
+    """Buffered JSONL sink for finished spans plus an in-memory window for Admin."""
+
+    def __init__(self, path: str = TRACE_PATH) -> None:
+        self.path = Path(path) if path else None
+        self.recent: Deque[Span] = deque(maxlen=RECENT)
+        self._pending: List[Span] = []
+        self._written = time.monotonic()
+        self._lock = threading.Lock()
+        atexit.register(self.flush)
+
+    def add(self, sp: Span, flush: bool = False) -> None:
+        with self._lock:
+            self.recent.append(sp)
+            if self.path is None:
+                return
+            self._pending.append(sp)
+            now = time.monotonic()
+            if not (flush or len(self._pending) >= FLUSH_AT or now - self._written >= FLUSH_S):
+                return
+            batch, self._pending, self._written = self._pending, [], now
+        self._write(batch)
+
+    def flush(self) -> None:
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if batch:
+            self._write(batch)
+
+    def _write(self, batch: List[Span]) -> None:
+        lines = "".join(json.dumps(sp.record(), ensure_ascii=False, default=str) + "\n" for sp in batch)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > MAX_BYTES:
+                self.path.replace(self.path.with_name(self.path.name + ".1"))
+            with open(self.path, "a", encoding="utf-8") as fh:
+                fh.write(lines)
+        except OSError:
+            pass  # tracing must never break a page
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Per span name over the in-memory window: calls, p50/p95/max and total ms, errors."""
+        with self._lock:
+            recent = list(self.recent)
+        by_name: Dict[str, List[Span]] = defaultdict(list)
+        for sp in recent:
+            by_name[sp.name].append(sp)
+        rows = []
+        for name, spans in by_name.items():
+            ms = sorted(sp.ms or 0.0 for sp in spans)
+            rows.append({"span": name, "calls": len(ms), "p50_ms": ms[len(ms) // 2],
+                         "p95_ms": ms[min(len(ms) - 1, int(0.95 * len(ms)))], "max_ms": ms[-1],
+                         "total_ms": round(sum(ms), 1), "errors": sum(bool(sp.error) for sp in spans)})
+        return sorted(rows, key=lambda r: r["total_ms"], reverse=True)
+
+    def reruns(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Latest reruns, newest first, with the time spent in each top-level stage."""
+        with self._lock:
+            recent = list(self.recent)
+        stages: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        roots = []
+        for sp in recent:
+            if sp.name == "rerun":
+                roots.append(sp)
+            elif sp.parent is not None:
+                stages[sp.parent.span_id][sp.name] += sp.ms or 0.0
+        out = []
+        for r in reversed(roots[-limit:]):
+            top_stages = sorted(stages.get(r.span_id, {}).items(), key=lambda kv: kv[1], reverse=True)
+            out.append({"page": r.attrs.get("page", ""), "ms": r.ms, "status": r.attrs.get("status", ""),
+                        "stages": ", ".join(f"{n} {ms:.0f}ms" for n, ms in top_stages[:4]),
+                        "at": time.strftime("%H:%M:%S", time.localtime(r.start)), "trace": r.trace_id})
+        return out
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer()
+        return _tracer
+
+
+# --- per-rerun root span -----------------------------------------------------
+
+_run = threading.local()  # script thread -> root span / profiler / start of the current run
+_hooked: "weakref.WeakSet[Any]" = weakref.WeakSet()
+
+
+def _script_runner() -> Any:
+    # The script thread's target is ScriptRunner._run_script_thread; its on_event
+    # signal is the only notice of a run ending (there is no public hook).
+    target = getattr(threading.current_thread(), "_target", None)
+    runner = getattr(target, "__self__", None)
+    return runner if hasattr(getattr(runner, "on_event", None), "connect") else None
+
+
+def _hook() -> bool:
+    runner = _script_runner()
+    if runner is None:
+        return False
+    if runner not in _hooked:
+        runner.on_event.connect(_on_runner_event)
+        _hooked.add(runner)
+    return True
+
+
+def _on_runner_event(sender: Any, event: Any = None, **kwargs: Any) -> None:
+    name = getattr(event, "name", "")
+    if name == "SCRIPT_STARTED":
+        _end_run("superseded")
+        # Fragment reruns (job panels polling) never reach state.init().
+        _run.started = None if kwargs.get("fragment_ids_this_run") else (time.time(), time.perf_counter())
+    elif name.startswith("SCRIPT_STOPPED") or name == "SHUTDOWN":
+        _end_run({"SCRIPT_STOPPED_WITH_SUCCESS": "ok", "SCRIPT_STOPPED_FOR_RERUN": "rerun"}.get(name, "error"))
+
+
+def begin_rerun(page: str) -> Optional[Span]:
+    """
+    Open this run's root span (called by `state.init()`; a second call in the
+    same run is a no-op) and start a profiler if Admin asked for this page.
+    None when headless or when the end of the run cannot be observed.
+    """
+    root = getattr(_run, "root", None)
+    if root is not None:
+        return root
+    if not _hook():
+        return None
+    from .memprof import session_id
+
+    root = Span("rerun", {"page": page, "session": session_id()[:8]})
+    started, _run.started = getattr(_run, "started", None), None
+    if started:
+        root.start, root.t0 = started  # runner reused (st.rerun()): count from SCRIPT_STARTED, imports included
+    _current.set(root)
+    _run.root = root
+    if get_profiler().take(page):
+        prof = cProfile.Profile()
+        prof.enable()
+        _run.profile = (prof, page, time.perf_counter())
+    return root
+
+
+def _end_run(status: str) -> None:
+    prof = getattr(_run, "profile", None)
+    if prof is not None:
+        _run.profile = None
+        p, page, t0 = prof
+        p.disable()
+        get_profiler().save(page, p, (time.perf_counter() - t0) * 1000)
+    root = getattr(_run, "root", None)
+    if root is not None:
+        _run.root = None
+        if _current.get() is root:
+            _current.set(None)
+        root.attrs["status"] = status
+        _close(root)
+
+
+# --- cProfile captures -------------------------------------------------------
+
+class Profiler:
+    """Process-wide "profile the next N reruns of page P" requests and the captures they produced."""
+
+    def __init__(self, out_dir: Path = PROFILE_DIR) -> None:
+        self.out_dir = out_dir
+        self.pending: Dict[str, int] = {}
+        self.captures: Deque[Dict[str, Any]] = deque(maxlen=CAPTURES)
+        self._lock = threading.Lock()
+
+    def request(self, page: str, runs: int) -> None:
+        with self._lock:
+            if runs > 0:
+                self.pending[page] = int(runs)
+            else:
+                self.pending.pop(page, None)
+
+    def take(self, page: str) -> bool:
+        with self._lock:
+            left = self.pending.get(page, 0)
+            if left <= 0:
+                return False
+            if left == 1:
+                del self.pending[page]
+            else:
+                self.pending[page] = left - 1
+            return True
+
+    def save(self, page: str, prof: cProfile.Profile, ms: float) -> Optional[Dict[str, Any]]:
+        """Write `<page>-<time>.prof` (snakeviz / pstats) and `.folded` (flamegraph.pl, speedscope)."""
+        try:
+            stats = pstats.Stats(prof)
+            stem = self.out_dir / f"{page}-{time.strftime('%Y%m%d-%H%M%S')}-{_new_id()[-4:]}"
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+            stats.dump_stats(str(stem) + ".prof")
+            folded = fold(stats)
+            with open(str(stem) + ".folded", "w", encoding="utf-8") as fh:
+                fh.writelines(f"{k} {v}\n" for k, v in folded.items())
+        except Exception:
+            return None  # profiling is diagnostics; never fail the page over it
+        cap = {"page": page, "ts": time.time(), "ms": round(ms, 1), "prof": str(stem) + ".prof",
+               "folded": str(stem) + ".folded", "top": top(stats)}
+        with self._lock:
+            self.captures.append(cap)
+        return cap
+
+
+def top(stats: pstats.Stats, n: int = 15) -> List[Dict[str, Any]]:
+    """The `n` functions with the most cumulative time."""
+    rows = []
+    for (file, line, fn), (cc, nc, tt, ct, _) in stats.stats.items():
+        rows.append({"function": _label((file, line, fn)), "calls": nc,
+                     "self_ms": round(tt * 1000, 2), "cumulative_ms": round(ct * 1000, 2)})
+    return sorted(rows, key=lambda r: r["cumulative_ms"], reverse=True)[:n]
+
+
+def _label(func: Tuple[str, int, str]) -> str:
+    file, line, fn = func
+    return fn if file == "~" else f"{fn} ({Path(file).name}:{line})"
+
+
+def fold(stats: pstats.Stats, max_depth: int = 64, min_us: float = 10.0) -> Dict[str, int]:
+    """
+    Collapsed stacks ("a;b;c <microseconds>") rebuilt from cProfile's caller
+    graph: a callee's time is split across its callers by their share of its
+    cumulative time, so stacks are approximate where a function is called
+    from several places.
+    """
+    st = stats.stats
+    children: Dict[Any, List[Tuple[Any, float]]] = defaultdict(list)
+    for func, (_, _, _, _, callers) in st.items():
+        for caller, edge in callers.items():
+            if caller in st:
+                children[caller].append((func, edge[3]))
+    out: Dict[str, int] = defaultdict(int)
+
+    def walk(func: Any, frac: float, path: List[str], seen: frozenset) -> None:
+        _, _, tt, ct, _ = st[func]
+        path = path + [_label(func).replace(";", ",")]
+        us = tt * frac * 1e6
+        if us >= 1:
+            out[";".join(path)] += int(us)
+        if len(path) >= max_depth:
+            return
+        for child, edge_ct in children.get(func, ()):
+            cct = st[child][3]
+            if child in seen or cct <= 0 or edge_ct * frac * 1e6 < min_us:
+                continue
+            walk(child, frac * edge_ct / cct, path, seen | {child})
+
+    for func, (_, _, _, _, callers) in st.items():
+        if not any(c in st for c in callers):
+            walk(func, 1.0, [], frozenset((func,)))
+    return dict(out)
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler()
+        return _profiler
@@ -19,3 +19,86 @@ def page_title(title: str, subtitle: str = ""):
 
 def page_link(script_path: str, label: str):
     st.link_button(label, f"/{script_path.split('/')[-1].replace('.py','')}")
+
+
+def compliance_flags(report) -> None:
+    """Inline brand-rule flags for a `compliance.ComplianceReport` (no-op when clean)."""
+    if report.violations:
+        lines = [f"- “{v.term}” ×{v.count}: {v.snippet}" for v in report.violations]
+        st.warning("Brand rules: banned terms in this output\n" + "\n".join(lines))
+    if report.missing:
+        st.caption("Brand rules: required phrases not found — " + ", ".join(f"“{t}”" for t in report.missing))
+
+
+def similar_past(query: str, kinds=None, k: int = 3, label: str = "Similar earlier outputs") -> list:
+    """
+    Show up to `k` earlier history items close to `query` (local embeddings,
+    no LLM). The per-session index is kept in session_state and only embeds
+    items added since the last rerun.
+    """
+    from . import compliance, history, semantic
+
+    if not (query or "").strip():
+        return []
+    idx = st.session_state.get("_history_index")
+    if idx is None:
+        idx = st.session_state["_history_index"] = semantic.HistoryIndex()
+    found = idx.similar(history.get(), query, k=k, kinds=kinds)
+    if found:
+        with st.expander(f"{label} ({len(found)})"):
+            for score, item in found:
+                st.caption(f"{item.get('kind', '')} · similarity {score:.2f}")
+                st.markdown(compliance.item_text(item)[:600])
+    return found
+
+
+def job_panel(kind: str, render, run_every: float = 1.0, render_partial=None) -> None:
+    """
+    Show this session's latest `kind` job from `shared.jobs`: a progress bar
+    (refreshed as a fragment, without rerunning the page) while it runs, then
+    `render(job)` once done. Polling stops after the job finishes.
+    `render_partial(items)` shows what the job has emitted so far.
+    """
+    from . import jobs
+
+    poll_key = f"_job_poll_{kind}"
+    latest = jobs.my_jobs(kind)
+    active = bool(latest and latest[0].active)
+    st.session_state[poll_key] = active
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment")
+
+    @fragment(run_every=run_every if active else None)
+    def _panel() -> None:
+        found = jobs.my_jobs(kind)
+        if not found or found[0].id == st.session_state.get(f"_job_hidden_{kind}"):
+            return
+        job = found[0]
+        if job.active:
+            st.progress(job.progress, text=f"{job.label} — {job.message or job.status} · {job.elapsed:.0f}s")
+            if st.button("Cancel", key=f"_job_cancel_{job.id}"):
+                jobs.get_manager().cancel(job.id)
+            if render_partial is not None and job.partial:
+                render_partial(list(job.partial))
+            return
+        if st.session_state.get(poll_key):
+            # Finished since the page last ran: full rerun to stop polling and
+            # let state.init() deliver the result into history.
+            st.session_state[poll_key] = False
+            st.rerun()
+        if job.status == jobs.DONE:
+            render(job)
+        elif job.status == jobs.ERROR:
+            st.error(f"{job.label} failed: {job.error}")
+        else:
+            st.info(f"{job.label} was cancelled.")
+
+    _panel()
+
+
+def hide_job(kind: str) -> None:
+    """'Clear output' for a job panel: hide the latest `kind` job until a new one is submitted."""
+    from . import jobs
+
+    latest = jobs.my_jobs(kind)
+    if latest:
+        st.session_state[f"_job_hidden_{kind}"] = latest[0].id
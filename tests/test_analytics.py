@@ -0,0 +1,34 @@
+# tests/test_analytics.py
+from __future__ import annotations
+
+from shared import analytics
+
+HEADER = "date,channel,post_type,clicks,impressions\n"
+
+
+def _clicks(engine) -> dict:
+    return {r["channel"]: r["clicks"] for r in engine.summary().to_dict("records")}
+
+
+def test_refresh_folds_in_appended_rows(tmp_path):
+    path = tmp_path / "perf.csv"
+    path.write_text(HEADER + "2025-08-01,Email,post,1,100\n")
+    engine = analytics.PerformanceEngine(path)
+    engine.refresh()
+    with open(path, "a") as fh:
+        fh.write("2025-08-02,Email,post,2,100\n")
+    assert engine.refresh() == 1
+    assert _clicks(engine) == {"Email": 3}
+
+
+def test_rewrite_keeping_the_first_block_rebuilds(tmp_path):
+    # Regenerated export: same header and first rows (> one fingerprint block), later rows changed.
+    path = tmp_path / "perf.csv"
+    first = ["2025-08-01,Email,post,1,100\n"] * 300
+    path.write_text(HEADER + "".join(first + ["2025-08-01,Email,post,1,100\n"] * 100))
+    engine = analytics.PerformanceEngine(path)
+    engine.refresh()
+    path.write_text(HEADER + "".join(first + ["2025-08-01,LinkedIn,post,5,100\n"] * 110))
+    engine.refresh()
+    assert engine.rows == 410
+    assert _clicks(engine) == {"Email": 300, "LinkedIn": 550}
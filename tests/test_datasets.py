@@ -0,0 +1,27 @@
+# tests/test_datasets.py
+from __future__ import annotations
+import io
+
+from shared import datasets
+
+# Every percentage is a whole number, so the stripped values parse as integers.
+WHOLE_PCT = "date,channel,clicks,engagement_rate\n2025-08-01,Email,5%,5%\n2025-08-02,Email,200,4%\n"
+
+
+def test_whole_number_percentages_read_typed():
+    df = datasets.read_csv_typed(io.StringIO(WHOLE_PCT))
+    assert df["engagement_rate"].tolist() == [0.05, 0.04]
+    assert str(df["engagement_rate"].dtype) == "float64"
+    assert df["clicks"].tolist() == [0, 200]
+    assert str(df["clicks"].dtype) == "Int64"
+
+
+def test_whole_number_percentages_load_and_scan(tmp_path):
+    path = tmp_path / "perf.csv"
+    path.write_text(WHOLE_PCT, encoding="utf-8")
+    df = datasets.load_csv(str(path), use_sidecar=False)
+    assert df is not None and df["engagement_rate"].tolist() == [0.05, 0.04]
+    assert datasets.preview_csv(io.StringIO(WHOLE_PCT))["engagement_rate"].tolist() == [0.05, 0.04]
+    stats = datasets.scan_csv_stats(io.StringIO(WHOLE_PCT), chunksize=1)
+    assert stats["rows"] == 2
+    assert stats["columns"]["engagement_rate"]["max"] == 0.05
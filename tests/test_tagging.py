@@ -0,0 +1,33 @@
+# tests/test_tagging.py
+from __future__ import annotations
+
+from shared import tagging
+
+
+def _score(text: str) -> float:
+    return tagging.get_tagger().tag([text])[0].score
+
+
+def test_negator_flips_the_next_term():
+    assert _score("not good") < 0
+    assert _score("not very good") < 0
+    assert _score("never a failure") > 0
+
+
+def test_negation_ends_at_clause_punctuation():
+    tags = tagging.get_tagger().tag(["Globex is not good, lawsuit filed"])[0]
+    assert tags.score < 0
+    assert tags.label == tagging.NEGATIVE
+    assert _score("not bad. great quarter") > _score("not bad")
+
+
+def test_negator_applies_to_first_term_only():
+    # "lawsuit" must keep its own (negative) weight after "good" took the negation.
+    assert _score("not good lawsuit") < _score("lawsuit")
+    assert _score("no lawsuit") > 0
+
+
+def test_negation_does_not_cross_items():
+    neg, pos = tagging.get_tagger().tag(["Globex did not", "great quarter"])
+    assert pos.score > 0
+    assert neg.score == 0